@@ -0,0 +1,285 @@
+"""Check the BuoyRpcClient against an in-process stand-in for RabbitMQ
+
+A fake broker is passed to the client as its connection_factory, so no
+RabbitMQ server is needed. The check thread plays the microservice, answering
+the requests the broker received. It checks that replies arriving out of order
+resolve the request with the same correlation_id, that unanswered requests
+fail with TimeoutError once their timeout passes, that replies without an id
+on the legacy To_Main_Program queue resolve the oldest request, that a dropped
+connection fails every waiting request with ConnectionError, and that
+concurrent first requests all wait for the slow first connection. Exits with
+status 1 if any check fails.
+
+Run from the repository root: python benchmarks/bench_buoy_rpc.py [--clients 20]
+"""
+import argparse
+import os
+import queue
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from threading import Barrier, Lock
+import pika
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from buoy_rpc import LEGACY_REPLY_QUEUE, REQUEST_QUEUE, BuoyRpcClient  # noqa: E402
+
+# Seconds a check waits for a reply or a request before failing
+WAIT = 5.0
+# Seconds the fake broker takes to open a connection, long enough for first requests to overlap
+CONNECT_DELAY = 0.2
+POLL_INTERVAL = 0.02
+
+
+class FakeBroker:
+    """Named queues shared by FakeConnections, recording what is published to the request queue"""
+    def __init__(self, connect_delay=0.0):
+        self.connect_delay = connect_delay
+        self.connections = []
+        self.requests = []
+        self.consumers = {}
+        self.lock = Lock()
+
+    def connect(self):
+        time.sleep(self.connect_delay)
+        connection = FakeConnection(self)
+        with self.lock:
+            self.connections.append(connection)
+        return connection
+
+    def publish(self, routing_key, body, properties):
+        if routing_key == REQUEST_QUEUE:
+            with self.lock:
+                self.requests.append((body, properties))
+            return
+        with self.lock:
+            consumer = self.consumers.get(routing_key)
+        if consumer is not None:
+            connection, callback = consumer
+            connection.deliveries.put((callback, routing_key, properties, body))
+
+    def reply(self, request, body, legacy=False):
+        """Answer a received request as the microservice would, by reply_to or on the legacy queue"""
+        _, properties = request
+        if legacy:
+            self.publish(LEGACY_REPLY_QUEUE, body, pika.BasicProperties())
+        else:
+            self.publish(properties.reply_to, body, pika.BasicProperties(correlation_id=properties.correlation_id))
+
+    def wait_for_requests(self, count):
+        """Return the first count requests once they have been published, or None"""
+        deadline = time.monotonic() + WAIT
+        while time.monotonic() < deadline:
+            with self.lock:
+                if len(self.requests) >= count:
+                    return self.requests[:count]
+            time.sleep(0.005)
+        return None
+
+    def drop(self):
+        """Make every open connection fail as if the broker went away"""
+        with self.lock:
+            for connection in self.connections:
+                connection.dropped = True
+
+
+class FakeConnection:
+    """pika BlockingConnection stand-in running threadsafe callbacks and deliveries in process_data_events"""
+    def __init__(self, broker):
+        self.broker = broker
+        self.callbacks = queue.SimpleQueue()
+        self.deliveries = queue.SimpleQueue()
+        self.dropped = False
+        self.closed = False
+
+    def channel(self):
+        return FakeChannel(self)
+
+    def add_callback_threadsafe(self, callback):
+        if self.closed:
+            raise pika.exceptions.ConnectionWrongStateError("Connection is closed")
+        self.callbacks.put(callback)
+
+    def process_data_events(self, time_limit=0):
+        deadline = time.monotonic() + time_limit
+        while True:
+            if self.dropped:
+                raise pika.exceptions.StreamLostError("Stream connection lost")
+            busy = False
+            while not self.callbacks.empty():
+                self.callbacks.get()()
+                busy = True
+            while not self.deliveries.empty():
+                callback, routing_key, properties, body = self.deliveries.get()
+                callback(None, pika.spec.Basic.Deliver(routing_key=routing_key), properties, body)
+                busy = True
+            if busy or time.monotonic() >= deadline:
+                return
+            time.sleep(0.002)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeChannel:
+    def __init__(self, connection):
+        self.connection = connection
+        self.broker = connection.broker
+
+    def queue_declare(self, queue, exclusive=False):
+        if not queue:
+            queue = f"amq.gen-{id(self.connection):x}"
+        return pika.frame.Method(1, pika.spec.Queue.DeclareOk(queue=queue))
+
+    def basic_consume(self, queue, on_message_callback, auto_ack=False):
+        with self.broker.lock:
+            self.broker.consumers[queue] = (self.connection, on_message_callback)
+
+    def basic_publish(self, exchange, routing_key, body, properties=None):
+        self.broker.publish(routing_key, body, properties)
+
+
+def client_for(broker, **kwargs):
+    return BuoyRpcClient(connection_factory=broker.connect, poll_interval=POLL_INTERVAL, **kwargs)
+
+
+def outcome(future):
+    """Return a future's result, or the exception it failed with, waiting at most WAIT seconds"""
+    try:
+        return future.result(timeout=WAIT)
+    except Exception as error:
+        return error
+
+
+def check_routing():
+    """Replies arriving in reverse order must resolve the requests they answer"""
+    broker = FakeBroker()
+    client = client_for(broker)
+    buoy_ids = [f"4601{i}" for i in range(5)]
+    futures = [client.request(buoy_id) for buoy_id in buoy_ids]
+    requests = broker.wait_for_requests(len(buoy_ids))
+    failures = []
+    if requests is None:
+        failures.append(f"{len(buoy_ids)} requests were not all published")
+    else:
+        for request in reversed(requests):
+            broker.reply(request, f"reply to {request[0]}".encode())
+        replies = [outcome(future) for future in futures]
+        wrong = [buoy_id for buoy_id, reply in zip(buoy_ids, replies) if reply != f"reply to {buoy_id}".encode()]
+        if wrong:
+            failures.append(f"out of order replies reached the wrong requests for {', '.join(wrong)}")
+    client.close()
+    return failures, f"{len(buoy_ids)} requests answered in reverse order"
+
+
+def check_timeout():
+    """A request nobody answers must fail with TimeoutError soon after its timeout"""
+    broker = FakeBroker()
+    client = client_for(broker)
+    timeout = 0.2
+    start = time.monotonic()
+    result = outcome(client.request('41001', timeout=timeout))
+    elapsed = time.monotonic() - start
+    failures = []
+    if not isinstance(result, TimeoutError):
+        failures.append(f"an unanswered request returned {result!r} instead of raising TimeoutError")
+    elif elapsed > timeout + 10 * POLL_INTERVAL:
+        failures.append(f"an unanswered request failed after {elapsed:.2f} s, its timeout was {timeout} s")
+    if client.pending():
+        failures.append(f"{client.pending()} requests were left waiting after timing out")
+    client.close()
+    return failures, f"timed out after {elapsed:.2f} s for a {timeout} s timeout"
+
+
+def check_legacy():
+    """Replies without a correlation_id on To_Main_Program must resolve the oldest waiting request"""
+    broker = FakeBroker()
+    client = client_for(broker)
+    futures = [client.request(buoy_id) for buoy_id in ('51001', '51002')]
+    requests = broker.wait_for_requests(len(futures))
+    failures = []
+    if requests is None:
+        failures.append("the legacy requests were not published")
+    else:
+        for request in requests:
+            broker.reply(request, f"legacy {request[0]}".encode(), legacy=True)
+        replies = [outcome(future) for future in futures]
+        if replies != [b"legacy 51001", b"legacy 51002"]:
+            failures.append(f"legacy replies resolved the requests as {replies!r}")
+    client.close()
+    return failures, f"{len(futures)} legacy replies"
+
+
+def check_dropped():
+    """Losing the connection must fail every waiting request with ConnectionError"""
+    broker = FakeBroker()
+    client = client_for(broker)
+    futures = [client.request(buoy_id) for buoy_id in ('42001', '42002', '42003')]
+    broker.wait_for_requests(len(futures))
+    broker.drop()
+    results = [outcome(future) for future in futures]
+    failures = []
+    unfailed = [result for result in results if not isinstance(result, ConnectionError)]
+    if unfailed:
+        failures.append(f"after the connection dropped {len(unfailed)} requests returned {unfailed[0]!r}")
+    if client.pending():
+        failures.append(f"{client.pending()} requests were left waiting after the connection dropped")
+    client.close()
+    return failures, f"{len(futures) - len(unfailed)} of {len(futures)} requests failed with ConnectionError"
+
+
+def check_first_requests(clients):
+    """Concurrent first requests must all wait for the one slow connection and then be answered"""
+    broker = FakeBroker(connect_delay=CONNECT_DELAY)
+    client = client_for(broker)
+    barrier = Barrier(clients)
+
+    def first_request(i):
+        barrier.wait()
+        return client.request(f"race{i}")
+    failures = []
+    with ThreadPoolExecutor(clients) as pool:
+        calls = [pool.submit(first_request, i) for i in range(clients)]
+        wait(calls)
+    errors = [call.exception() for call in calls if call.exception() is not None]
+    if errors:
+        failures.append(f"{len(errors)} concurrent first requests raised, e.g. {errors[0]!r}")
+    futures = [call.result() for call in calls if call.exception() is None]
+    requests = broker.wait_for_requests(len(futures))
+    if requests is None:
+        failures.append(f"{len(futures)} concurrent first requests were not all published")
+    else:
+        for request in requests:
+            broker.reply(request, request[0].encode())
+        unanswered = [result for result in map(outcome, futures) if not isinstance(result, bytes)]
+        if unanswered:
+            failures.append(f"{len(unanswered)} concurrent first requests were not answered, "
+                            f"e.g. {unanswered[0]!r}")
+    if len(broker.connections) != 1:
+        failures.append(f"concurrent first requests opened {len(broker.connections)} connections, expected 1")
+    client.close()
+    return failures, f"{clients} concurrent first requests, {len(broker.connections)} connection"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=20, help="concurrent first requests")
+    args = parser.parse_args()
+
+    failures = []
+    for name, check in (('routing', check_routing),
+                        ('timeout', check_timeout),
+                        ('legacy', check_legacy),
+                        ('dropped', check_dropped),
+                        ('first', lambda: check_first_requests(args.clients))):
+        start = time.perf_counter()
+        check_failures, summary = check()
+        print(f"{name:>8}: {summary} ({time.perf_counter() - start:.2f} s)")
+        failures += check_failures
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
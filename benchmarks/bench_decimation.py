@@ -0,0 +1,70 @@
+"""Render time of the tide plot for growing ranges of 15 second DART readings, raw against decimated
+
+An auto refresh adding ten minutes of readings is also timed, extending the
+plotted series against replacing it.
+
+Run from the repository root: python benchmarks/bench_decimation.py
+"""
+import os
+import sys
+import time
+from datetime import timedelta
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from plot_panels import TidePlot  # noqa: E402
+
+# Readings an auto refresh adds, ten minutes of 15 second readings
+REFRESH_ROWS = 40
+
+
+def readings(days, seed=0):
+    """Return datetime64 times and heights of days of 15 second readings, oldest first"""
+    rows = days * 24 * 60 * 4
+    times = np.datetime64('2024-01-01T00:00:00') + np.arange(rows) * np.timedelta64(15, 's')
+    hours = np.arange(rows) / 240
+    heights = 5785 + 0.8 * np.sin(2 * np.pi * hours / 12.42) + np.random.default_rng(seed).normal(0, 0.01, rows)
+    return times, heights.astype(np.float32)
+
+
+def render(plot, canvas, times, heights, raw):
+    start = time.perf_counter()
+    plot.update_series(times, heights)
+    if raw:
+        plot.line.set_data(plot.series.x, plot.series.y)
+        plot.series = None      # keep every point when panning
+    canvas.draw()
+    return time.perf_counter() - start
+
+
+def main(ranges=(2, 30, 365), repeat=3):
+    for days in ranges:
+        times, heights = readings(days)
+        row = []
+        for raw in (True, False):
+            plot = TidePlot(window=timedelta(days=days))
+            canvas = FigureCanvasAgg(plot.figure)
+            first = render(plot, canvas, times, heights, raw)
+            again = min(render(plot, canvas, times, heights, raw) for _ in range(repeat))
+            pan = time.perf_counter()
+            plot.ax.set_xlim(*(np.array(plot.ax.get_xlim()) - days / 10))
+            canvas.draw()
+            row.append((first, again, time.perf_counter() - pan, len(plot.line.get_xdata())))
+        print(f"{days:>4} days, {len(times):>8} rows")
+        for name, (first, again, pan, points) in zip(('raw', 'decimated'), row):
+            print(f"    {name:>9}: first {first * 1e3:8.1f} ms, again {again * 1e3:8.1f} ms, "
+                  f"pan {pan * 1e3:8.1f} ms, {points} points drawn")
+        plot = TidePlot()
+        canvas = FigureCanvasAgg(plot.figure)
+        render(plot, canvas, times[:-REFRESH_ROWS], heights[:-REFRESH_ROWS], False)
+        start = time.perf_counter()
+        plot.extend_series(times[-REFRESH_ROWS:], heights[-REFRESH_ROWS:])
+        canvas.draw()
+        extend = time.perf_counter() - start
+        replace = render(plot, canvas, times, heights, False)
+        print(f"    {'refresh':>9}: extend {extend * 1e3:8.1f} ms, replace {replace * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
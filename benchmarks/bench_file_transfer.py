@@ -0,0 +1,52 @@
+"""Compare reply sizes and the cost of reading a buoy's files from a reply for each codec
+
+Run from the repository root: python benchmarks/bench_file_transfer.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from file_transfer import decode_reply, encode_files, zstandard  # noqa: E402
+from parse_worker import parse_file, parse_payload  # noqa: E402
+from ndbc_fixtures import write_dart, write_data_spec, write_realtime_txt, write_spec  # noqa: E402
+
+
+def best_of(run, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(repeat=5):
+    with tempfile.TemporaryDirectory() as directory:
+        paths = [os.path.join(directory, name) for name in
+                 ('46026.txt', '46026.dart', '46026.spec', '46026.data_spec')]
+        for write, path in zip((write_realtime_txt, write_dart, write_spec, write_data_spec), paths):
+            write(path)
+        files = {}
+        for path in paths:
+            with open(path, 'rb') as file:
+                files[os.path.basename(path)] = file.read()
+        raw = sum(len(data) for data in files.values())
+        from_disk = best_of(lambda: [parse_file(path) for path in paths], repeat)
+        print(f"{'files on disk':>14}: {raw / 1e3:8.0f} kB, parse {from_disk * 1e3:7.1f} ms")
+        codecs = ['none', 'gzip'] + (['zstd'] if zstandard is not None else [])
+        for codec in codecs:
+            start = time.perf_counter()
+            body = encode_files('46026', files, codec)
+            encoded = time.perf_counter() - start
+
+            def read():
+                reply = decode_reply(body)
+                return [parse_payload(name, payload, reply.codec) for name, payload in reply.files.items()]
+            print(f"{codec:>14}: {len(body) / 1e3:8.0f} kB, parse {best_of(read, repeat) * 1e3:7.1f} ms, "
+                  f"encode {encoded * 1e3:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Check the Geocoder against a local fake Nominatim server
+
+Serves Nominatim style JSON from a thread of this process and checks that
+concurrent identical queries (after normalization) are sent once, that distinct
+queries go out no faster than the configured rate, that cached results, in
+memory and from the cache file after a restart, send no request at all, and
+that unknown places raise LookupError. Exits with status 1 if any check fails.
+
+Run from the repository root: python benchmarks/bench_geocoding.py [--rate 1.0]
+"""
+import argparse
+import asyncio
+import http.server
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from geocoding import Geocoder  # noqa: E402
+
+PLACES = {'monterey, ca': ('-121.8947', '36.6002'),
+          'santa cruz': ('-122.0308', '36.9741'),
+          'half moon bay': ('-122.4286', '37.4636'),
+          'bodega bay': ('-123.0480', '38.3332')}
+# Seconds the fake server takes to answer, long enough for identical queries to overlap
+RESPONSE_DELAY = 0.2
+# Slack allowed on the spacing of rate limited requests for timer and scheduling jitter
+SPACING_TOLERANCE = 0.02
+
+
+class FakeNominatim(http.server.ThreadingHTTPServer):
+    """Answers /search?q= with the PLACES entry of the query, recording the arrival time of each request"""
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeNominatimHandler)
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}/search"
+
+
+class FakeNominatimHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query).get('q', [''])[0]
+        with self.server.lock:
+            self.server.requests.append((time.monotonic(), query, self.headers.get('User-Agent')))
+        time.sleep(RESPONSE_DELAY)
+        place = PLACES.get(query)
+        matches = [] if place is None else [{'lon': place[0], 'lat': place[1], 'display_name': query}]
+        body = json.dumps(matches).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+async def check_coalescing(geocoder, server):
+    """Concurrent spellings of one query must reach the server once"""
+    spellings = ['Monterey, CA', 'monterey, ca', '  MONTEREY,   ca ', 'Monterey,  Ca'] * 3
+    before = len(server.requests)
+    results = await asyncio.gather(*(geocoder.geocode(spelling) for spelling in spellings))
+    sent = len(server.requests) - before
+    failures = []
+    if sent != 1:
+        failures.append(f"{len(spellings)} concurrent identical queries sent {sent} requests, expected 1")
+    if len(set(results)) != 1:
+        failures.append(f"identical queries returned different results: {set(results)}")
+    return failures, f"{len(spellings)} concurrent identical queries, {sent} request"
+
+
+async def check_rate_limit(geocoder, server, rate):
+    """Distinct concurrent queries must reach the server at least 1 / rate seconds apart"""
+    queries = ['Santa Cruz', 'Half Moon Bay', 'Bodega Bay', 'Nowhere at all']
+    before = len(server.requests)
+    results = await asyncio.gather(*(geocoder.geocode(query) for query in queries), return_exceptions=True)
+    arrivals = [arrival for arrival, _, _ in server.requests[before:]]
+    gaps = [later - earlier for earlier, later in zip(arrivals, arrivals[1:])]
+    failures = []
+    if len(arrivals) != len(queries):
+        failures.append(f"{len(queries)} distinct queries sent {len(arrivals)} requests")
+    if gaps and min(gaps) < 1 / rate - SPACING_TOLERANCE:
+        failures.append(f"requests {min(gaps):.3f} s apart, the limit is {1 / rate:.3f} s")
+    if not isinstance(results[-1], LookupError):
+        failures.append(f"an unknown place returned {results[-1]!r} instead of raising LookupError")
+    spacing = f"min spacing {min(gaps):.3f} s" if gaps else "no spacing measured"
+    return failures, f"{len(queries)} distinct queries, {len(arrivals)} requests, {spacing}"
+
+
+async def check_cache(geocoder, server, cache_path):
+    """Repeated queries, including a failed one, must not reach the server, nor after a restart"""
+    queries = ['monterey, ca', 'SANTA CRUZ', 'Half  Moon Bay', 'bodega bay']
+    before = len(server.requests)
+    for query in queries:
+        await geocoder.geocode(query)
+    try:
+        await geocoder.geocode('nowhere at all')
+    except LookupError:
+        pass
+    restarted = Geocoder(base_url=server.url, cache_path=cache_path)
+    results = [await restarted.geocode(query) for query in queries]
+    sent = len(server.requests) - before
+    failures = []
+    if sent:
+        failures.append(f"cached queries sent {sent} requests, expected none")
+    if results[0] != tuple(PLACES['monterey, ca']):
+        failures.append(f"the cache file returned {results[0]!r} for monterey, ca")
+    return failures, f"{len(queries) * 2 + 1} cached queries, {sent} requests"
+
+
+async def run_checks(server, cache_path, rate):
+    geocoder = Geocoder(base_url=server.url, cache_path=cache_path, rate=rate)
+    failures = []
+    for name, check in (('coalescing', check_coalescing(geocoder, server)),
+                        ('rate limit', check_rate_limit(geocoder, server, rate)),
+                        ('cache', check_cache(geocoder, server, cache_path))):
+        start = time.perf_counter()
+        check_failures, summary = await check
+        print(f"{name:>10}: {summary} ({time.perf_counter() - start:.2f} s)")
+        failures += check_failures
+    if any(agent is None for _, _, agent in server.requests):
+        failures.append("a request was sent without a User-Agent")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rate', type=float, default=1.0, help="geocoder requests per second")
+    args = parser.parse_args()
+
+    server = FakeNominatim()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            failures = asyncio.run(run_checks(server, os.path.join(directory, 'geocode_cache.json'), args.rate))
+    finally:
+        server.shutdown()
+        server.server_close()
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Compare the string column weather parser with ndbc_parser on a 45 day realtime2 file
+
+Run from the repository root: python benchmarks/bench_ndbc_parser.py
+"""
+import os
+import sys
+import tempfile
+import timeit
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ndbc_parser import first_valid_rows, parse_realtime  # noqa: E402
+from ndbc_fixtures import write_realtime_txt  # noqa: E402
+
+CONDITION_COLUMNS = ('ATMP', 'WTMP', 'WSPD', 'WDIR')
+
+
+def legacy_parse(file):
+    """Station._create_weather_data before ndbc_parser"""
+    weather_data = pd.read_csv(file, header=0, delimiter=r"\s+", index_col=False)
+    weather_units = weather_data.loc[0].copy(deep=True)
+    weather_data.drop(0, inplace=True)
+    filtered_wave_data = weather_data[(weather_data["WVHT"] != 'MM') & (weather_data["DPD"] != 'MM') & (
+        weather_data["MWD"] != 'MM')]
+    return weather_data, weather_units, filtered_wave_data
+
+
+def legacy_conditions(weather_data, filtered_wave_data):
+    """The string comparison scans each Station accessor made"""
+    values = [weather_data[weather_data[column] != 'MM'][column].head(1).values[0] for column in CONDITION_COLUMNS]
+    values += [filtered_wave_data[column].head(1).values[0] for column in ('WVHT', 'DPD', 'MWD')]
+    return values
+
+
+def parse(file):
+    weather_data, weather_units = parse_realtime(file)
+    return weather_data, weather_units, weather_data.dropna(subset=["WVHT", "DPD", "MWD"]), \
+        first_valid_rows(weather_data)
+
+
+def conditions(weather_data, filtered_wave_data, latest_rows):
+    values = [weather_data[column].iat[latest_rows[column]] for column in CONDITION_COLUMNS]
+    values += [filtered_wave_data[column].iat[0] for column in ('WVHT', 'DPD', 'MWD')]
+    return values
+
+
+def best(func, number, repeat=5):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def main(rows=6480):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, '46026.txt')
+        write_realtime_txt(path, rows)
+        legacy = legacy_parse(path)
+        parsed = parse(path)
+        results = (('parse', best(lambda: legacy_parse(path), 5), best(lambda: parse(path), 5)),
+                   ('conditions', best(lambda: legacy_conditions(legacy[0], legacy[2]), 50),
+                    best(lambda: conditions(parsed[0], parsed[2], parsed[3]), 50)))
+        print(f"{rows} rows, legacy memory {legacy[0].memory_usage(deep=True).sum() / 1e6:.2f} MB, "
+              f"typed memory {parsed[0].memory_usage(deep=True).sum() / 1e6:.2f} MB")
+        for stage, before, after in results:
+            print(f"{stage:>10}: legacy {before * 1e3:8.3f} ms, typed {after * 1e3:8.3f} ms ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
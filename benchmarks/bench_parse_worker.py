@@ -0,0 +1,53 @@
+"""Compare the time the GUI process spends parsing a buoy's files in process and through parse_worker
+
+Run from the repository root: python benchmarks/bench_parse_worker.py
+"""
+import asyncio
+import os
+import pickle
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ndbc_parser import parse_realtime  # noqa: E402
+from parse_worker import parse_file, parse_files  # noqa: E402
+from ndbc_fixtures import write_dart, write_realtime_txt, write_spec  # noqa: E402
+
+
+def in_process(files):
+    return [parse_realtime(file) for file in files]
+
+
+async def through_pool(files, executor):
+    return await parse_files(files, executor)
+
+
+def main(repeat=5):
+    with tempfile.TemporaryDirectory() as directory:
+        files = [os.path.join(directory, name) for name in ('46026.txt', '46026.dart', '46026.spec')]
+        write_realtime_txt(files[0])
+        write_dart(files[1])
+        write_spec(files[2])
+        frame_bytes = sum(len(pickle.dumps(parsed)) for parsed in in_process(files))
+        array_bytes = sum(len(pickle.dumps(parse_file(file))) for file in files)
+        with ProcessPoolExecutor() as executor:
+            asyncio.run(through_pool(files, executor))     # start the workers
+            results = {}
+            for name, run in (('in process', lambda: in_process(files)),
+                              ('process pool', lambda: asyncio.run(through_pool(files, executor)))):
+                wall, cpu = [], []
+                for _ in range(repeat):
+                    start_wall, start_cpu = time.perf_counter(), time.process_time()
+                    run()
+                    wall.append(time.perf_counter() - start_wall)
+                    cpu.append(time.process_time() - start_cpu)
+                results[name] = min(wall), min(cpu)
+    print(f"pickled DataFrames {frame_bytes / 1e3:.0f} kB, pickled arrays {array_bytes / 1e3:.0f} kB")
+    for name, (wall, cpu) in results.items():
+        print(f"{name:>12}: wall {wall * 1e3:7.2f} ms, GUI process CPU {cpu * 1e3:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""End to end benchmarks of the search, fetch, parse and render pipeline, checked against stored baselines
+
+Every stage runs on synthetic NDBC fixtures: loading the station list, the
+buoy search, building a Station from .txt and .dart files of 1k to 100k rows
+(1M with --large), the condition accessors and drawing the tide plot through
+the Agg canvas. The best of --repeat runs of each benchmark is compared with
+benchmarks/baselines.json, and one slower than its baseline by more than
+--threshold is flagged and makes the script exit with status 1. Baselines
+depend on the machine, record them again with --save after moving to another.
+
+The stored baselines are the original pipeline of the baseline commit, timed
+with --original on a checkout of it. Its dashboard module parsed the station
+list with parse_xml for every search, so that stands in for each catalog
+benchmark. A search scanned every parsed station, Stations came from its own
+Station class and the tide plot was drawn with pandas on a new figure. It had
+no spatial index, so search.index_build has no baseline. The original Station
+fails on files pandas reads in more than one chunk, 100k rows and more, so the
+stations, conditions and plots of those files have no baseline either.
+
+Run from the repository root:
+    python benchmarks/bench_pipeline.py             compare with the stored baselines
+    python benchmarks/bench_pipeline.py --save      store the current times as the baselines
+    git worktree add /tmp/baseline 1255de1
+    python benchmarks/bench_pipeline.py --original /tmp/baseline --large --save
+                                                    store the original pipeline's times as the baselines
+    python benchmarks/bench_pipeline.py --large     also run the 1M row files
+    python benchmarks/bench_pipeline.py -k station  only run benchmarks whose name contains station
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from station_data import Station  # noqa: E402
+from plot_panels import TidePlot  # noqa: E402
+from station_catalog import parse_xml  # noqa: E402
+from station_index import StationIndex  # noqa: E402
+from station_table import StationTable, load_station_table  # noqa: E402
+from ndbc_fixtures import write_dart, write_realtime_txt, write_synthetic_catalog  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+ROW_COUNTS = (1_000, 10_000, 100_000)
+LARGE_ROW_COUNTS = (1_000_000,)
+CATALOG_SIZE = 20_000
+# (latitude, longitude, radius in miles) of the searches run by the search benchmark
+SEARCHES = ((36.6, -121.9, 100), (21.3, -157.8, 250), (64.8, -147.7, 500), (0.0, 179.9, 300))
+# Conversion between miles and latitude used by the original search
+MILES_TO_LATITUDE = 69
+
+
+def best_of(run, repeat, setup=None):
+    """Return the fastest of repeat runs in seconds, setup is called untimed before each run"""
+    best = float('inf')
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def read_conditions(station):
+    return (station.air_temperature(), station.air_temperature_unit(), station.water_temperature(),
+            station.water_temperature_unit(), station.significant_wave_height(), station.wave_height_unit(),
+            station.swell_period(), station.swell_direction(), station.wind_speed(), station.wind_speed_unit(),
+            station.wind_direction())
+
+
+def benchmarks(directory, row_counts):
+    """Yield (name, run, setup) for every benchmark, writing the fixtures they read as they are reached"""
+    catalog = os.path.join(directory, 'activestations.xml')
+    write_synthetic_catalog(catalog, CATALOG_SIZE)
+    yield f'catalog.parse_xml[{CATALOG_SIZE}]', lambda: parse_xml(catalog), None
+    yield f'catalog.load_station_table[{CATALOG_SIZE}]', lambda: load_station_table(catalog), None
+    table = load_station_table(catalog)
+    columns = os.path.join(directory, 'activestations.npz')
+    table.save(columns)
+    yield f'catalog.load_columns[{CATALOG_SIZE}]', lambda: StationTable.load(columns), None
+    yield f'search.index_build[{CATALOG_SIZE}]', lambda: StationIndex.from_table(table), None
+    index = StationIndex.from_table(table)
+    yield f'search.buoy_search[{CATALOG_SIZE}]', lambda: [index.search(*search) for search in SEARCHES], None
+
+    tide_plot = TidePlot()
+    canvas = FigureCanvasAgg(tide_plot.figure)
+    for rows in row_counts:
+        txt = os.path.join(directory, f'{rows}.txt')
+        dart = os.path.join(directory, f'{rows}.dart')
+        write_realtime_txt(txt, rows)
+        write_dart(dart, rows)
+        yield f'station.txt[{rows}]', lambda: Station([txt]), None
+        yield f'station.dart[{rows}]', lambda: Station([dart]), None
+        station = Station([txt, dart])
+        yield (f'conditions[{rows}]', lambda: read_conditions(station),
+               lambda: station.__dict__.pop('conditions', None))
+        yield (f'render.tide_plot[{rows}]', lambda: (tide_plot.update_plot(station.tide_data), canvas.draw()),
+               # Drop the decimation cache so every run draws a station for the first time
+               lambda: setattr(tide_plot, 'series', None))
+
+
+def original_search(stations, latitude, longitude, radius):
+    """The original dashboard's buoy search, a scan of every parsed station"""
+    radius = radius / MILES_TO_LATITUDE
+    result = []
+    for station in stations:
+        station_lat = float(station.get('lat'))
+        station_lon = float(station.get('lon'))
+        if (latitude - radius) <= station_lat <= (latitude + radius):
+            if (longitude - radius) <= station_lon <= (longitude + radius):
+                result.append(station)
+    return result
+
+
+def original_tide_plot(station):
+    """The original dashboard's tide plot, drawn on a new figure through the Agg canvas"""
+    figure = Figure(figsize=(4, 4), dpi=100)
+    ax = figure.add_subplot(111)
+    station.tide_data.plot(x='time', y='HEIGHT', kind='line', legend=None, ax=ax,
+                           ylabel='Height [m]', title='Tide', xlim=(0, 200))
+    FigureCanvasAgg(figure).draw()
+
+
+def original_benchmarks(directory, row_counts, checkout):
+    """Yield (name, run, setup) timing the original pipeline of the dashboard.py in checkout"""
+    spec = importlib.util.spec_from_file_location('original_dashboard', os.path.join(checkout, 'dashboard.py'))
+    original = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(original)
+    # Raised for every file the original Station reads in chunks, before it fails on them
+    warnings.simplefilter('ignore', pd.errors.DtypeWarning)
+    catalog = os.path.join(directory, 'activestations.xml')
+    write_synthetic_catalog(catalog, CATALOG_SIZE)
+    for name in ('parse_xml', 'load_station_table', 'load_columns'):
+        yield f'catalog.{name}[{CATALOG_SIZE}]', lambda: original.parse_xml(catalog), None
+    stations = original.parse_xml(catalog)
+    yield (f'search.buoy_search[{CATALOG_SIZE}]', lambda: [original_search(stations, *search) for search in SEARCHES],
+           None)
+
+    for rows in row_counts:
+        txt = os.path.join(directory, f'{rows}.txt')
+        dart = os.path.join(directory, f'{rows}.dart')
+        write_realtime_txt(txt, rows)
+        write_dart(dart, rows)
+        try:
+            station = original.Station([txt, dart])
+        except Exception as error:
+            print(f"The original Station fails on {rows} row files, not timed: {error!r}")
+            continue
+        yield f'station.txt[{rows}]', lambda: original.Station([txt]), None
+        yield f'station.dart[{rows}]', lambda: original.Station([dart]), None
+        yield f'conditions[{rows}]', lambda: read_conditions(station), None
+        yield f'render.tide_plot[{rows}]', lambda: original_tide_plot(station), None
+
+
+def source(checkout):
+    """Return the commit the benchmarked code was checked out at"""
+    result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=checkout, capture_output=True, text=True)
+    return result.stdout.strip() or checkout
+
+
+def environment():
+    return {'python': platform.python_version(), 'machine': platform.machine(), 'processor': platform.processor(),
+            'numpy': np.__version__, 'pandas': pd.__version__}
+
+
+def load_baselines(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'environment': {}, 'results': {}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--save', action='store_true', help="store the results as the new baselines")
+    parser.add_argument('--large', action='store_true', help="also run the 1M row files")
+    parser.add_argument('-k', dest='pattern', default='', help="only run benchmarks whose name contains this")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="fraction slower than the baseline that counts as a regression")
+    parser.add_argument('--baselines', default=BASELINE_PATH)
+    parser.add_argument('--output', help="also write the results to this JSON file")
+    parser.add_argument('--original', metavar='CHECKOUT',
+                        help="time the original pipeline of a checkout of the baseline commit instead")
+    args = parser.parse_args()
+
+    baselines = load_baselines(args.baselines)
+    if baselines['environment'] and baselines['environment'] != environment():
+        print(f"Baselines were recorded on {baselines['environment']}, times may not compare")
+    if baselines.get('source'):
+        print(f"Baselines are the times of {baselines['source']}")
+    row_counts = ROW_COUNTS + (LARGE_ROW_COUNTS if args.large else ())
+    results = {}
+    regressions = []
+    with tempfile.TemporaryDirectory() as directory:
+        if args.original:
+            pipeline = original_benchmarks(directory, row_counts, args.original)
+        else:
+            pipeline = benchmarks(directory, row_counts)
+        for name, run, setup in pipeline:
+            if args.pattern not in name:
+                continue
+            results[name] = best_of(run, args.repeat, setup)
+            baseline = baselines['results'].get(name)
+            line = f"{name:<40} {results[name] * 1e3:10.2f} ms"
+            if baseline is not None:
+                ratio = results[name] / baseline
+                line += f"  baseline {baseline * 1e3:10.2f} ms  {ratio:5.2f}x"
+                if ratio > 1 + args.threshold:
+                    line += "  REGRESSION"
+                    regressions.append(name)
+            print(line, flush=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2, sort_keys=True)
+    if args.save:
+        recorded = source(args.original or os.path.dirname(os.path.dirname(BASELINE_PATH)))
+        # Benchmarks not run this time, e.g. the large files, keep their old baselines of the same code
+        kept = baselines['results'] if baselines.get('source') == recorded else {}
+        baselines = {'environment': environment(), 'source': recorded, 'results': {**kept, **results}}
+        with open(args.baselines, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Saved {len(results)} baselines to {args.baselines}")
+    elif regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""Show that reusing one TidePlot keeps memory flat across many buoy switches
+
+The old tide_plot packed a new FigureCanvasTkAgg for every station and never
+destroyed it, so every figure stayed alive. Here the legacy path keeps its
+figures referenced the same way, while TidePlot updates one line in place.
+Both render through the Agg canvas so no display is needed.
+
+The switches are then checked to reuse their widgets: TidePlot keeps one
+figure, axes and line, and when a display is available ConditionsPanel and
+TidePanel keep the same labels and canvas widget without adding children.
+The script exits with status 1 if anything was recreated.
+
+Run from the repository root: python benchmarks/bench_plot_panel.py
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+import tkinter as tk
+import tracemalloc
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from conditions import Conditions  # noqa: E402
+from ndbc_parser import parse_realtime  # noqa: E402
+from plot_panels import ConditionsPanel, TidePanel, TidePlot  # noqa: E402
+from ndbc_fixtures import write_dart, write_realtime_txt  # noqa: E402
+
+
+def legacy_render(tide_data, kept):
+    figure = Figure(figsize=(4, 4), dpi=100)
+    ax = figure.add_subplot(111)
+    tide_data.plot(y='HEIGHT', kind='line', legend=None, ax=ax, ylabel='Height [m]', title='Tide')
+    canvas = FigureCanvasAgg(figure)
+    canvas.draw()
+    kept.append(canvas)
+
+
+def plot_artists(tide_plot):
+    """Return the ids of the figure, its axes and the artists drawn on them"""
+    return ([id(tide_plot.figure)] + [id(ax) for ax in tide_plot.figure.axes]
+            + [id(artist) for ax in tide_plot.figure.axes for artist in ax.get_children()])
+
+
+def check_tide_plot(stations, switches):
+    """Return a list of failures if switching stations adds or replaces any artist of a TidePlot"""
+    tide_plot = TidePlot()
+    canvas = FigureCanvasAgg(tide_plot.figure)
+    tide_plot.update_plot(stations[0])
+    canvas.draw()
+    before = plot_artists(tide_plot)
+    for i in range(switches):
+        tide_plot.update_plot(stations[i % len(stations)])
+        canvas.draw()
+    if plot_artists(tide_plot) != before:
+        return ["TidePlot replaced its figure, axes or artists"]
+    return []
+
+
+def widget_tree(widget):
+    """Return the Tk path names of widget and all of its descendants"""
+    names = [str(widget)]
+    for child in widget.winfo_children():
+        names.extend(widget_tree(child))
+    return names
+
+
+def check_panels(stations, snapshots, switches):
+    """Return a list of failures if the Tk panels recreate widgets, or None without a display"""
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return None
+    try:
+        root.withdraw()
+        conditions_panel = ConditionsPanel(root, title="Buoy")
+        tide_panel = TidePanel(root)
+        conditions_panel.update_conditions(snapshots[0])
+        tide_panel.update_plot(stations[0])
+        root.update()
+        labels = {name: str(label) for name, label in conditions_panel.value_labels.items()}
+        canvas_widget = str(tide_panel.canvas.get_tk_widget())
+        before = widget_tree(root)
+        for i in range(switches):
+            conditions_panel.update_conditions(snapshots[i % len(snapshots)])
+            tide_panel.update_plot(stations[i % len(stations)])
+            root.update()
+        failures = []
+        if {name: str(label) for name, label in conditions_panel.value_labels.items()} != labels:
+            failures.append("ConditionsPanel replaced its value labels")
+        if str(tide_panel.canvas.get_tk_widget()) != canvas_widget:
+            failures.append("TidePanel replaced its canvas widget")
+        if widget_tree(root) != before:
+            failures.append(f"widgets went from {len(before)} to {len(widget_tree(root))}")
+        return failures
+    finally:
+        root.destroy()
+
+
+def main(switches=200, report_every=40):
+    with tempfile.TemporaryDirectory() as directory:
+        stations = []
+        snapshots = []
+        for seed in range(5):
+            path = os.path.join(directory, f'{seed}.dart')
+            write_dart(path, seed=seed)
+            stations.append(parse_realtime(path)[0])
+            path = os.path.join(directory, f'{seed}.txt')
+            write_realtime_txt(path, rows=1000, seed=seed)
+            weather_data, units = parse_realtime(path)
+            snapshots.append(Conditions.from_weather_data(weather_data, units,
+                                                          weather_data.dropna(subset=["WVHT", "DPD", "MWD"])))
+
+        tide_plot = TidePlot()
+        canvas = FigureCanvasAgg(tide_plot.figure)
+        kept = []
+        renderers = (('legacy', lambda data: legacy_render(data, kept)),
+                     ('reused', lambda data: (tide_plot.update_plot(data), canvas.draw())))
+        for name, render in renderers:
+            gc.collect()
+            tracemalloc.start()
+            start = time.perf_counter()
+            samples = []
+            for i in range(switches):
+                render(stations[i % len(stations)])
+                if (i + 1) % report_every == 0:
+                    gc.collect()
+                    samples.append(tracemalloc.get_traced_memory()[0] / 1e6)
+            elapsed = time.perf_counter() - start
+            tracemalloc.stop()
+            print(f"{name:>6}: {elapsed / switches * 1e3:6.1f} ms per switch, traced MB every {report_every}: "
+                  + ', '.join(f"{sample:.1f}" for sample in samples))
+            kept.clear()
+
+        failures = check_tide_plot(stations, switches)
+        panel_failures = check_panels(stations, snapshots, switches)
+    if panel_failures is None:
+        print("No display, ConditionsPanel and TidePanel widgets not checked")
+    else:
+        failures += panel_failures
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print(f"Widgets reused across {switches} switches")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Open ten years of wave height from the SeriesStore against loading it into a DataFrame
+
+Run from the repository root on Linux: python benchmarks/bench_series_store.py
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from series_store import SeriesStore  # noqa: E402
+
+
+def resident_bytes():
+    """Return this process's private resident memory, read from /proc
+
+    Mapped file pages are left out: they are shared page cache the kernel can
+    drop at any time, and it maps them in larger chunks than are read.
+    """
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('RssAnon:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def open_store(directory, variables):
+    """Open every series and average one month of wave height, run in a fresh process"""
+    before = resident_bytes()
+    start = time.perf_counter()
+    store = SeriesStore(directory)
+    series = {variable: store.open('46026', variable) for variable in variables}
+    opened = time.perf_counter() - start
+    month_times, month_values = series['WVHT'].between('2020-03-01', '2020-03-31T23:59')
+    float(month_values.mean())
+    return opened, time.perf_counter() - start, resident_bytes() - before
+
+
+def load_frame(directory, variables):
+    """Load the same history as a DataFrame and average one month, run in a fresh process"""
+    before = resident_bytes()
+    start = time.perf_counter()
+    frame = pd.read_pickle(os.path.join(directory, 'frame.pkl'))
+    opened = time.perf_counter() - start
+    float(frame.loc['2020-03', 'WVHT'].mean())
+    return opened, time.perf_counter() - start, resident_bytes() - before
+
+
+def main(years=10, variables=('WVHT', 'DPD', 'MWD', 'WSPD', 'WDIR', 'ATMP', 'WTMP')):
+    rows = years * 365 * 24 * 6
+    first = np.datetime64('2014-01-01T00:00', 's')
+    times = first + np.arange(rows, dtype=np.int64) * np.timedelta64(600, 's')
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as directory:
+        store = SeriesStore(directory)
+        frame = pd.DataFrame({variable: rng.uniform(0, 10, rows).astype(np.float32) for variable in variables},
+                             index=pd.DatetimeIndex(times))
+        for variable in variables:
+            store.append('46026', variable, times, frame[variable].to_numpy())
+        frame.to_pickle(os.path.join(directory, 'frame.pkl'))
+        # Each measurement runs in a new process so memory freed earlier does not hide its footprint
+        with multiprocessing.get_context('spawn').Pool(1, maxtasksperchild=1) as pool:
+            results = {name: pool.apply(func, (directory, variables))
+                       for name, func in (('SeriesStore', open_store), ('DataFrame', load_frame))}
+    print(f"{years} years, {rows} rows x {len(variables)} variables")
+    for name, (opened, month, memory) in results.items():
+        print(f"{name:>12}: open {opened * 1e3:8.2f} ms, open + one month mean {month * 1e3:8.2f} ms, "
+              f"+{memory / 1e6:7.2f} MB private")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Time parsing and partitioning a year of hourly spectra against a per row loop
+
+Run from the repository root: python benchmarks/bench_spectral.py
+"""
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from spectral import DEFAULT_SEPARATION, frequency_bandwidths, parse_data_spec  # noqa: E402
+from ndbc_fixtures import write_data_spec  # noqa: E402
+
+
+def per_row(file):
+    """Parse and partition one spectrum at a time, the straightforward approach"""
+    results = []
+    with open(file) as f:
+        for line in f:
+            if line.startswith('#'):
+                continue
+            tokens = line.replace('(', ' ').replace(')', ' ').split()
+            separation = float(tokens[5])
+            if separation >= 9.999:
+                separation = DEFAULT_SEPARATION
+            density = np.array([float(value) for value in tokens[6::2]])
+            frequencies = np.array([float(value) for value in tokens[7::2]])
+            energy = density * frequency_bandwidths(frequencies)
+            swell = frequencies < separation
+            row = []
+            for mask in (swell, ~swell):
+                m0 = energy[mask].sum()
+                row += [4 * np.sqrt(m0), 1 / frequencies[mask][np.argmax(density[mask])] if m0 > 0 else np.nan]
+            results.append(row)
+    return results
+
+
+def main(rows=8760):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, '46026.data_spec')
+        write_data_spec(path, rows)
+        start = time.perf_counter()
+        spectra = parse_data_spec(path)
+        parsed = time.perf_counter()
+        spectra.partitions()
+        spectra.band_energy()
+        vectorized = time.perf_counter()
+        per_row(path)
+        looped = time.perf_counter()
+    print(f"{rows} spectra x {len(spectra.frequencies)} bins")
+    print(f"  vectorized: parse {parsed - start:.3f} s, partitions {vectorized - parsed:.3f} s")
+    print(f"     per row: {looped - vectorized:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Check the dashboard's startup against a time budget
+
+Measures the import of dashboard, and of the older tkinter_classes GUI, with
+python -X importtime in a fresh interpreter and fails when either exceeds
+--budget milliseconds or imports any of the modules deferred until after the
+first frame (pandas, matplotlib, pika, tkintermapview, requests, pyarrow).
+When a display is available the time to the first painted window and to the
+finished startup are measured too, and a first window later than
+--window-budget milliseconds fails the check.
+
+Run from the repository root: python benchmarks/bench_startup.py [--budget 250] [--window-budget 500] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# GUI modules whose import is checked
+GUI_MODULES = ('dashboard', 'tkinter_classes')
+# Modules that must not be imported before the window is shown
+DEFERRED_MODULES = ('pandas', 'matplotlib', 'pika', 'tkintermapview', 'requests', 'pyarrow')
+DEFAULT_BUDGET_MS = 250
+# Time from starting the interpreter to the first exposed and painted window
+DEFAULT_WINDOW_BUDGET_MS = 500
+WINDOW_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import dashboard
+
+
+class TimedApp(dashboard.App):
+    def __init__(self):
+        super().__init__()
+        self.exposed = None
+        # Bound to the Tk class, so it sees the root window's Expose beside the App's own binding
+        self.bind_class('Tk', '<Expose>', self.first_expose, add='+')
+
+    def first_expose(self, event):
+        if self.exposed is None:
+            self.exposed = time.perf_counter()
+
+    def finish_startup(self):
+        self.update_idletasks()     # the redraw Tk scheduled for the expose
+        self.painted = time.perf_counter()
+        super().finish_startup()
+        self.ready = time.perf_counter()
+        self.report()
+
+    def report(self):
+        # The window is shown once it has been both exposed and painted, in whichever order
+        if self.exposed is None:
+            self.after(10, self.report)
+            return
+        shown = max(self.exposed, self.painted)
+        print(json.dumps({'window_ms': (shown - start) * 1e3, 'ready_ms': (self.ready - start) * 1e3}))
+        self.after(0, self.destroy)
+
+
+TimedApp().mainloop()
+"""
+
+
+def import_times(module):
+    """Return {module: (self us, cumulative us)} of module and the modules its import loaded"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        entries.append((name.strip(), len(name) - len(name.lstrip()), int(own), int(cumulative)))
+    # importtime lists a module after the modules it imported, indented deeper
+    end = next(i for i, entry in enumerate(entries) if entry[0] == module)
+    start = end
+    while start > 0 and entries[start - 1][1] > entries[end][1]:
+        start -= 1
+    return {name: (own, cumulative) for name, _, own, cumulative in entries[start:end + 1]}
+
+
+def window_times():
+    """Return the window and ready times in ms, or None without a display
+
+    The window time is taken at the first Expose of the mapped window once Tk
+    has run the redraw it scheduled, not merely when Tk is first idle.
+    """
+    result = subprocess.run([sys.executable, '-c', WINDOW_SCRIPT], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET_MS, help="import budget in ms")
+    parser.add_argument('--window-budget', type=float, default=DEFAULT_WINDOW_BUDGET_MS,
+                        help="time to first window budget in ms")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help="slowest imports to list")
+    args = parser.parse_args()
+
+    failures = []
+    for module in GUI_MODULES:
+        runs = [import_times(module) for _ in range(args.repeat)]
+        best = min(runs, key=lambda times: times[module][1])
+        total_ms = best[module][1] / 1e3
+        print(f"import {module}: {total_ms:.1f} ms (best of {args.repeat}), budget {args.budget:.0f} ms")
+        for name, (_, cumulative) in sorted(best.items(), key=lambda item: -item[1][1])[1:args.top + 1]:
+            print(f"  {cumulative / 1e3:8.1f} ms  {name}")
+        eager = sorted({name.split('.')[0] for name in best} & set(DEFERRED_MODULES))
+        if eager:
+            failures.append(f"import {module} loaded modules meant for after the window is shown: "
+                            f"{', '.join(eager)}")
+        if total_ms > args.budget:
+            failures.append(f"import {module} took {total_ms:.1f} ms, over the {args.budget:.0f} ms budget")
+    window = window_times()
+    if window is None:
+        print("No display, time to first window not measured")
+    else:
+        print(f"first window {window['window_ms']:.1f} ms, budget {args.window_budget:.0f} ms, "
+              f"startup finished {window['ready_ms']:.1f} ms")
+        if window['window_ms'] > args.window_budget:
+            failures.append(f"the first window took {window['window_ms']:.1f} ms, over the "
+                            f"{args.window_budget:.0f} ms budget")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
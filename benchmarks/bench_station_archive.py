@@ -0,0 +1,41 @@
+"""Read a year of wave height from the Parquet archive against re-parsing realtime2 text
+
+Run from the repository root: python benchmarks/bench_station_archive.py
+"""
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ndbc_parser import parse_realtime  # noqa: E402
+from station_archive import StationArchive  # noqa: E402
+from ndbc_fixtures import write_realtime_txt  # noqa: E402
+
+
+def best(func, number=3, repeat=5):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def main(rows=52560):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, '46026.txt')
+        write_realtime_txt(path, rows)
+        data, units = parse_realtime(path)
+        archive = StationArchive(os.path.join(directory, 'archive'))
+        appended = timeit.timeit(lambda: archive.append('46026', 'weather', data, units), number=1)
+        newest = data.iloc[:6].copy()
+        newest.index = newest.index + (data.index[0] - data.index[6])
+        incremental = timeit.timeit(lambda: archive.append('46026', 'weather', newest, units), number=1)
+        results = (('text parse', best(lambda: parse_realtime(path))),
+                   ('archive, all columns', best(lambda: archive.read('46026', 'weather'))),
+                   ('archive, WVHT', best(lambda: archive.read('46026', 'weather', columns=['WVHT']))),
+                   ('archive, WVHT one month', best(lambda: archive.read('46026', 'weather', '2024-03-01',
+                                                                         '2024-03-31', columns=['WVHT']))))
+    print(f"{rows} rows: first append {appended * 1e3:.1f} ms, appending 6 new rows {incremental * 1e3:.1f} ms")
+    for name, seconds in results:
+        print(f"{name:>24}: {seconds * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
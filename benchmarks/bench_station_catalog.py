@@ -0,0 +1,165 @@
+"""Check the StationCatalog against a local stand-in for the NOAA station list
+
+Serves a synthetic activestations.xml from a thread of this process, counting
+the requests and the conditional ones answered 304, and checks that a fresh
+copy sends no request, that an expired one is revalidated with one 304, that
+after a restart the disk copy and its saved .npz columns are reused without
+parsing the xml, and that a stale copy is served when the server is down.
+Exits with status 1 if any check fails.
+
+Run from the repository root: python benchmarks/bench_station_catalog.py [--stations 5000] [--ttl 0.5]
+"""
+import argparse
+import http.server
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import station_catalog  # noqa: E402
+from station_catalog import StationCatalog  # noqa: E402
+from ndbc_fixtures import write_synthetic_catalog  # noqa: E402
+
+ETAG = '"activestations-1"'
+LAST_MODIFIED = 'Mon, 01 Jul 2024 00:00:00 GMT'
+# Calls made within the TTL, none of which may reach the server
+FRESH_CALLS = 20
+
+
+class FakeStationList(http.server.ThreadingHTTPServer):
+    """Serves body at any path, answering 304 to a request whose validators match"""
+    def __init__(self, body):
+        super().__init__(('127.0.0.1', 0), FakeStationListHandler)
+        self.body = body
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}/activestations.xml"
+
+    def count(self, status=None):
+        """Return how many requests were answered, or how many were answered with status"""
+        with self.lock:
+            return sum(1 for answered, _ in self.requests if status is None or answered == status)
+
+
+class FakeStationListHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        validators = (self.headers.get('If-None-Match'), self.headers.get('If-Modified-Since'))
+        status = 304 if validators == (ETAG, LAST_MODIFIED) else 200
+        with self.server.lock:
+            self.server.requests.append((status, validators))
+        self.send_response(status)
+        self.send_header('ETag', ETAG)
+        self.send_header('Last-Modified', LAST_MODIFIED)
+        if status == 304:
+            self.end_headers()
+            return
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(self.server.body)))
+        self.end_headers()
+        self.wfile.write(self.server.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def count_parses():
+    """Wrap the catalog's xml parser, returning the list each parse appends to"""
+    parses = []
+    parse = station_catalog.load_station_table
+
+    def counted(path):
+        parses.append(path)
+        return parse(path)
+    station_catalog.load_station_table = counted
+    return parses
+
+
+def run_checks(server, cache_path, ttl, count):
+    parses = count_parses()
+    failures = []
+    catalog = StationCatalog(url=server.url, cache_path=cache_path, ttl=ttl)
+    stations = catalog.stations()
+    if len(stations) != count or server.count(200) != 1:
+        failures.append(f"the first load returned {len(stations)} stations with {server.count(200)} "
+                        f"downloads, expected {count} with 1")
+    print(f"     first: {len(stations)} stations, {server.count()} request, {len(parses)} parse")
+
+    before = server.count()
+    if any(catalog.stations() is not stations for _ in range(FRESH_CALLS)):
+        failures.append("a call within the TTL returned a different table")
+    sent = server.count() - before
+    if sent:
+        failures.append(f"{FRESH_CALLS} calls within the TTL sent {sent} requests, expected none")
+    print(f"     fresh: {FRESH_CALLS} calls, {sent} requests")
+
+    time.sleep(ttl)
+    before, not_modified = server.count(), server.count(304)
+    revalidated = catalog.stations()
+    sent, not_modified = server.count() - before, server.count(304) - not_modified
+    if (sent, not_modified) != (1, 1):
+        failures.append(f"revalidating sent {sent} requests with {not_modified} 304s, expected 1 and 1")
+    if revalidated is not stations:
+        failures.append("a 304 replaced the table instead of keeping it")
+    print(f"   expired: {sent} request, {not_modified} answered 304")
+
+    before, parsed = server.count(), len(parses)
+    restarted = StationCatalog(url=server.url, cache_path=cache_path, ttl=ttl)
+    reloaded = restarted.stations()
+    sent, parsed = server.count() - before, len(parses) - parsed
+    if sent or parsed:
+        failures.append(f"a restart within the TTL sent {sent} requests and parsed the xml {parsed} times, "
+                        f"expected neither")
+    if list(reloaded.ids) != list(stations.ids):
+        failures.append("the saved columns hold different stations from the download")
+    print(f"   restart: {sent} requests, {parsed} parses, {len(reloaded)} stations from the saved columns")
+
+    time.sleep(ttl)
+    server.shutdown()
+    server.server_close()
+    stale = StationCatalog(url=server.url, cache_path=cache_path, ttl=ttl)
+    try:
+        served = stale.stations()
+    except Exception as error:
+        failures.append(f"with the server down the stale copy was not served: {error!r}")
+    else:
+        if list(served.ids) != list(stations.ids):
+            failures.append("with the server down a different table was served")
+        print(f"      down: {len(served)} stale stations served")
+    missing = StationCatalog(url=server.url, cache_path=os.path.join(os.path.dirname(cache_path), 'none.xml'))
+    try:
+        missing.stations()
+        failures.append("with the server down and no copy on disk stations() did not raise")
+    except station_catalog.requests.RequestException:
+        pass
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--stations', type=int, default=5000)
+    parser.add_argument('--ttl', type=float, default=0.5, help="catalog TTL in seconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'source.xml')
+        write_synthetic_catalog(source, args.stations)
+        with open(source, 'rb') as f:
+            server = FakeStationList(f.read())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            failures = run_checks(server, os.path.join(directory, 'activestations.xml'), args.ttl, args.stations)
+        finally:
+            server.shutdown()
+            server.server_close()
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""Compare the grid station index against the original linear buoy search loop
+
+Run from the repository root: python benchmarks/bench_station_index.py
+"""
+import os
+import sys
+import timeit
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from station_index import StationIndex  # noqa: E402
+
+
+def synthetic_stations(count, seed=0):
+    """Return station dicts shaped like parse_xml output, spread uniformly over the globe"""
+    rng = np.random.default_rng(seed)
+    latitudes = np.degrees(np.arcsin(rng.uniform(-1, 1, count)))
+    longitudes = rng.uniform(-180, 180, count)
+    return [{'id': f"{i:06d}", 'lat': f"{lat:.3f}", 'lon': f"{lon:.3f}"}
+            for i, (lat, lon) in enumerate(zip(latitudes, longitudes))]
+
+
+def linear_search(stations, latitude_num, longitude_num, radius_miles):
+    """The square lat/lon box scan BuoySearch.buoy_search used before the index"""
+    result = []
+    radius_num = radius_miles / 69
+    for station in stations:
+        station_lat = float(station.get('lat'))
+        station_lon = float(station.get('lon'))
+        if (latitude_num - radius_num) <= station_lat <= (latitude_num + radius_num):
+            if (longitude_num - radius_num) <= station_lon <= (longitude_num + radius_num):
+                result.append(station)
+    return result
+
+
+def main(count=100_000, repeat=5):
+    stations = synthetic_stations(count)
+    queries = [(36.6, -121.9, 100), (21.3, -157.8, 250), (64.8, -147.7, 500), (0.0, 179.9, 300)]
+
+    build = min(timeit.repeat(lambda: StationIndex.from_stations(stations), number=1, repeat=repeat))
+    index = StationIndex.from_stations(stations)
+    print(f"{count} stations, index build {build * 1e3:.1f} ms")
+    for lat, lon, radius in queries:
+        loop = min(timeit.repeat(lambda: linear_search(stations, lat, lon, radius), number=1, repeat=repeat))
+        number = 200
+        indexed = min(timeit.repeat(lambda: index.radius(lat, lon, radius), number=number, repeat=repeat)) / number
+        hits = len(index.radius(lat, lon, radius)[0])
+        print(f"radius {radius:>4} mi at ({lat:6.1f}, {lon:7.1f}): loop {loop * 1e3:8.2f} ms, "
+              f"index {indexed * 1e3:6.3f} ms ({hits} stations, {loop / indexed:,.0f}x)")
+    number = 200
+    nearest = min(timeit.repeat(lambda: index.nearest(36.6, -121.9, 10), number=number, repeat=repeat)) / number
+    print(f"10 nearest: {nearest * 1e3:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
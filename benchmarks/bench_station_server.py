@@ -0,0 +1,182 @@
+"""Load test the headless station server against local fixtures
+
+Starts station_server in a child process, answering from synthetic fixture
+files through the in-process stand-in microservice, then runs --clients
+concurrent keep-alive clients that each send --requests requests spread over
+the conditions, tide and station search routes. Clients accept gzip and
+revalidate URLs they have seen with If-None-Match. Reports throughput, latency
+percentiles and the server's counters, which show how many microservice
+requests the coalescing and caches left. Also checks that importing
+station_server loads no GUI module, and exits with status 1 if one is loaded.
+
+Run from the repository root: python benchmarks/bench_station_server.py [--clients 200] [--requests 50]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from tracing import percentile  # noqa: E402
+from ndbc_fixtures import write_dart, write_realtime_txt, write_synthetic_catalog  # noqa: E402
+
+CATALOG_SIZE = 2000
+# Modules the headless server must not import
+GUI_MODULES = ('tkinter', 'tkintermapview', 'matplotlib')
+
+
+def gui_imports():
+    """Return the GUI modules that importing station_server loads in a fresh interpreter"""
+    script = f"import sys, station_server; print(' '.join(m for m in {GUI_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, check=True)
+    return result.stdout.split()
+
+
+def write_fixtures(directory, buoys):
+    """Write a station list and .txt/.dart files for the first buoys stations, returning their ids"""
+    catalog = os.path.join(directory, 'activestations.xml')
+    write_synthetic_catalog(catalog, CATALOG_SIZE)
+    with open(os.path.join(directory, 'activestations.meta.json'), 'w') as f:
+        json.dump({'checked_at': time.time()}, f)
+    fixtures = os.path.join(directory, 'fixtures')
+    os.makedirs(fixtures)
+    buoy_ids = [f"{i:06d}" for i in range(buoys)]
+    for seed, buoy_id in enumerate(buoy_ids):
+        write_realtime_txt(os.path.join(fixtures, buoy_id + '.txt'), seed=seed)
+        write_dart(os.path.join(fixtures, buoy_id + '.dart'), seed=seed)
+    return catalog, fixtures, buoy_ids
+
+
+def run_server(catalog_path, fixtures, delay, port_queue):
+    """Child process: serve the fixtures on an ephemeral port and report the port"""
+    from parse_worker import worker_pool
+    from stand_in_service import StandInClient, StandInService
+    from station_catalog import StationCatalog
+    from station_server import StationServer, StationService
+
+    async def serve():
+        with worker_pool() as parse_pool:
+            service = StationService(StandInClient(StandInService(fixtures, connection_factory=lambda: None,
+                                                                  delay=delay)),
+                                     parse_pool, catalog=StationCatalog(cache_path=catalog_path, ttl=24 * 60 * 60))
+            server = StationServer(service, port=0)
+            await server.start()
+            port_queue.put(server.port)
+            await server.serve_forever()
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+async def http_get(reader, writer, path, headers):
+    """Send a GET on an open keep-alive connection, returning (status, headers, body)"""
+    lines = [f"GET {path} HTTP/1.1", "Host: localhost", *(f"{name}: {value}" for name, value in headers.items())]
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode())
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+    status = int(head[0].split(' ')[1])
+    response_headers = {}
+    for line in head[1:]:
+        name, _, value = line.partition(':')
+        if name:
+            response_headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(response_headers.get('content-length', 0)))
+    return status, response_headers, body
+
+
+def random_path(rng, buoy_ids):
+    kind = rng.random()
+    buoy_id = rng.choice(buoy_ids)
+    if kind < 0.4:
+        return f"/buoys/{buoy_id}/conditions"
+    if kind < 0.7:
+        day = rng.randint(20, 28)
+        return f"/buoys/{buoy_id}/tide?from=2024-06-{day}&to=2024-06-{day + 2}"
+    latitude, longitude = rng.choice(((36.6, -121.9), (21.3, -157.8), (44.6, -124.5), (-33.9, 151.2)))
+    return f"/stations?lat={latitude}&lon={longitude}&radius={rng.choice((100, 250, 500))}"
+
+
+async def client(port, buoy_ids, requests, seed, results):
+    rng = random.Random(seed)
+    etags = {}
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        for _ in range(requests):
+            path = random_path(rng, buoy_ids)
+            headers = {'Accept-Encoding': 'gzip'}
+            if path in etags:
+                headers['If-None-Match'] = etags[path]
+            start = time.perf_counter()
+            status, response_headers, body = await http_get(reader, writer, path, headers)
+            results.append((path.split('?')[0].rsplit('/', 1)[-1], status, time.perf_counter() - start, len(body)))
+            if 'etag' in response_headers:
+                etags[path] = response_headers['etag']
+    finally:
+        writer.close()
+
+
+async def load(port, buoy_ids, clients, requests):
+    results = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, buoy_ids, requests, seed, results) for seed in range(clients)))
+    elapsed = time.perf_counter() - start
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    _, _, body = await http_get(reader, writer, '/stats', {})
+    writer.close()
+    return results, elapsed, json.loads(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=50, help="requests per client")
+    parser.add_argument('--buoys', type=int, default=20)
+    parser.add_argument('--delay', type=float, default=0.5, help="stand-in microservice reply delay in seconds")
+    args = parser.parse_args()
+
+    loaded = gui_imports()
+    with tempfile.TemporaryDirectory() as directory:
+        catalog, fixtures, buoy_ids = write_fixtures(directory, args.buoys)
+        port_queue = multiprocessing.Queue()
+        # Not a daemon, the server starts its own parse worker processes
+        server = multiprocessing.Process(target=run_server, args=(catalog, fixtures, args.delay, port_queue))
+        server.start()
+        try:
+            port = port_queue.get(timeout=60)
+            results, elapsed, stats = asyncio.run(load(port, buoy_ids, args.clients, args.requests))
+        finally:
+            # SIGINT rather than SIGTERM so the server shuts its parse pool down on the way out
+            os.kill(server.pid, signal.SIGINT)
+            server.join()
+
+    latencies = sorted(latency * 1e3 for _, _, latency, _ in results)
+    statuses = {}
+    for _, status, _, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    print(f"{len(results)} requests from {args.clients} clients in {elapsed:.2f} s, "
+          f"{len(results) / elapsed:,.0f} requests/s, {sum(size for *_, size in results) / 1e6:.1f} MB received")
+    print(f"latency p50 {percentile(latencies, 0.5):.1f} ms, p95 {percentile(latencies, 0.95):.1f} ms, "
+          f"p99 {percentile(latencies, 0.99):.1f} ms, max {latencies[-1]:.1f} ms")
+    print("status counts: " + ', '.join(f"{status}: {count}" for status, count in sorted(statuses.items())))
+    for route in ('conditions', 'tide', 'stations'):
+        route_latencies = sorted(latency * 1e3 for name, _, latency, _ in results if name == route)
+        print(f"  {route:>10}: {len(route_latencies):6d} requests, p50 {percentile(route_latencies, 0.5):7.1f} ms, "
+              f"p95 {percentile(route_latencies, 0.95):7.1f} ms")
+    print(f"microservice requests {stats['fetches']} for {args.buoys} buoys ({stats['coalesced']} coalesced), "
+          f"response cache {stats['response_hits']} hits / {stats['response_misses']} misses")
+    if loaded:
+        print(f"FAIL: importing station_server loads GUI modules: {', '.join(loaded)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""Compare parse time and peak memory of parse_xml, the streaming StationTable loader and saved columns
+
+Run from the repository root: python benchmarks/bench_station_table.py
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from station_catalog import parse_xml  # noqa: E402
+from station_index import StationIndex  # noqa: E402
+from station_table import StationTable, load_station_table  # noqa: E402
+from ndbc_fixtures import write_synthetic_catalog  # noqa: E402
+
+
+def measure(loader, path):
+    """Return (best of three seconds, peak traced bytes) of loader, timed separately from tracing"""
+    elapsed = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        loader(path)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    tracemalloc.start()
+    loader(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main(count=100_000):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'activestations.xml')
+        write_synthetic_catalog(path, count)
+        print(f"{count} stations, {os.path.getsize(path) / 1e6:.1f} MB of xml")
+        columns = os.path.join(directory, 'activestations.npz')
+        load_station_table(path).save(columns)
+        loaders = (('parse_xml', parse_xml),
+                   ('load_station_table', load_station_table),
+                   ('saved columns', lambda p: StationTable.load(columns)),
+                   ('parse_xml + index', lambda p: StationIndex.from_stations(parse_xml(p))),
+                   ('table + index', lambda p: StationIndex.from_table(load_station_table(p))))
+        for name, loader in loaders:
+            elapsed, peak = measure(loader, path)
+            print(f"{name:>18}: {elapsed * 1e3:8.1f} ms, peak {peak / 1e6:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
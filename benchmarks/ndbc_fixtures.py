@@ -0,0 +1,121 @@
+"""Synthetic NDBC realtime2 files for the benchmarks"""
+import numpy as np
+import pandas as pd
+
+REALTIME_HEADER = ("#YY  MM DD hh mm WDIR WSPD GST  WVHT   DPD   APD MWD   PRES  ATMP  WTMP  DEWP  VIS PTDY  TIDE\n"
+                   "#yr  mo dy hr mn degT m/s  m/s     m   sec   sec degT   hPa  degC  degC  degC  nmi  hPa    ft\n")
+DART_HEADER = ("#YY  MM DD hh mm ss T   HEIGHT\n"
+               "#yr  mo dy hr mn  s -      m\n")
+SPEC_HEADER = ("#YY  MM DD hh mm WVHT  SwH  SwP  WWH  WWP SwD WWD  STEEPNESS  APD MWD\n"
+               "#yr  mo dy hr mn    m    m  sec    m  sec  -  degT     -      sec degT\n")
+COMPASS_POINTS = np.array(['N', 'NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE', 'S', 'SSW', 'SW', 'WSW', 'W', 'WNW',
+                           'NW', 'NNW'])
+STEEPNESS = np.array(['SWELL', 'AVERAGE', 'STEEP', 'VERY_STEEP'])
+STATION_TYPES = ('buoy', 'fixed', 'dart', 'other', 'tao', 'oilrig')
+
+
+def _times(rows, step, end='2024-06-30 23:50'):
+    """Return rows timestamps ending at end, newest first as NDBC writes them"""
+    return pd.date_range(end=end, periods=rows, freq=step)[::-1]
+
+
+def _column(values, missing, decimals):
+    text = np.char.mod(f'%.{decimals}f', values)
+    return np.where(missing, 'MM', text)
+
+
+def write_realtime_txt(path, rows=6480, step='10min', missing_fraction=0.3, seed=0):
+    """Write a realtime2 .txt file, 6480 rows is 45 days of 10 minute observations"""
+    rng = np.random.default_rng(seed)
+    times = _times(rows, step)
+    # Waves are reported hourly, the other rows carry MM like the real files
+    no_waves = (times.minute != 40) | (rng.random(rows) < 0.05)
+    columns = [
+        _column(rng.integers(0, 360, rows), rng.random(rows) < 0.02, 0),
+        _column(rng.uniform(0, 15, rows), rng.random(rows) < 0.02, 1),
+        _column(rng.uniform(0, 20, rows), rng.random(rows) < 0.02, 1),
+        _column(rng.uniform(0.2, 6, rows), no_waves, 1),
+        _column(rng.integers(4, 20, rows), no_waves, 0),
+        _column(rng.uniform(3, 12, rows), no_waves, 1),
+        _column(rng.integers(0, 360, rows), no_waves, 0),
+        _column(rng.uniform(990, 1030, rows), rng.random(rows) < 0.02, 1),
+        _column(rng.uniform(5, 25, rows), rng.random(rows) < missing_fraction, 1),
+        _column(rng.uniform(8, 22, rows), rng.random(rows) < missing_fraction, 1),
+        np.full(rows, 'MM'), np.full(rows, 'MM'), np.full(rows, 'MM'), np.full(rows, 'MM'),
+    ]
+    with open(path, 'w') as f:
+        f.write(REALTIME_HEADER)
+        for i, time in enumerate(times):
+            f.write(f"{time:%Y %m %d %H %M} " + ' '.join(column[i] for column in columns) + '\n')
+
+
+def write_dart(path, rows=4320, step='15min', seed=0):
+    """Write a realtime2 .dart water column height file"""
+    rng = np.random.default_rng(seed)
+    times = _times(rows, step)
+    hours = (times - times[-1]).total_seconds().to_numpy() / 3600
+    heights = 5785 + 0.8 * np.sin(2 * np.pi * hours / 12.42) + rng.normal(0, 0.01, rows)
+    with open(path, 'w') as f:
+        f.write(DART_HEADER)
+        for time, height in zip(times, heights):
+            f.write(f"{time:%Y %m %d %H %M %S} 1 {height:8.3f}\n")
+
+
+def write_spec(path, rows=1080, step='1h', seed=0):
+    """Write a realtime2 .spec wave summary file, 1080 rows is 45 days of hourly observations"""
+    rng = np.random.default_rng(seed)
+    times = _times(rows, step, end='2024-06-30 23:40')
+    swell = rng.uniform(0.2, 4, rows)
+    wind_sea = rng.uniform(0.1, 2, rows)
+    missing = rng.random(rows) < 0.02
+    columns = [
+        _column(np.hypot(swell, wind_sea), missing, 1),
+        _column(swell, missing, 1),
+        _column(rng.uniform(8, 20, rows), missing, 1),
+        _column(wind_sea, missing, 1),
+        _column(rng.uniform(3, 8, rows), missing, 1),
+        np.where(missing, 'MM', rng.choice(COMPASS_POINTS, rows)),
+        np.where(missing, 'MM', rng.choice(COMPASS_POINTS, rows)),
+        np.where(missing, 'MM', rng.choice(STEEPNESS, rows)),
+        _column(rng.uniform(3, 12, rows), missing, 1),
+        _column(rng.integers(0, 360, rows), missing, 0),
+    ]
+    with open(path, 'w') as f:
+        f.write(SPEC_HEADER)
+        for i, time in enumerate(times):
+            f.write(f"{time:%Y %m %d %H %M} " + ' '.join(column[i] for column in columns) + '\n')
+
+
+def write_data_spec(path, rows=8760, step='1h', seed=0):
+    """Write a realtime2 .data_spec spectral density file, 8760 rows is a year of hourly spectra"""
+    rng = np.random.default_rng(seed)
+    times = _times(rows, step, end='2024-06-30 23:40')
+    frequencies = np.round(np.linspace(0.02, 0.485, 47), 4)
+    # A swell peak and a wind sea peak per row, each a gaussian in frequency
+    swell_peak = rng.uniform(0.05, 0.09, (rows, 1))
+    wind_peak = rng.uniform(0.15, 0.3, (rows, 1))
+    density = (rng.uniform(0.5, 8, (rows, 1)) * np.exp(-((frequencies - swell_peak) / 0.01) ** 2)
+               + rng.uniform(0.1, 2, (rows, 1)) * np.exp(-((frequencies - wind_peak) / 0.04) ** 2))
+    separation = (swell_peak + wind_peak).ravel() / 2
+    bins = ' '.join(f"{{:.3f}} ({frequency:.4f})" for frequency in frequencies)
+    with open(path, 'w') as f:
+        f.write("#YY  MM DD hh mm Sep_Freq  < spec_1 (freq_1) spec_2 (freq_2) spec_3 (freq_3) ... >\n")
+        for time, row_separation, row in zip(times, separation, density):
+            f.write(f"{time:%Y %m %d %H %M} {row_separation:6.3f} " + bins.format(*row) + '\n')
+
+
+def write_synthetic_catalog(path, count, seed=0):
+    """Write an activestations style xml file with count random stations"""
+    rng = np.random.default_rng(seed)
+    latitudes = np.degrees(np.arcsin(rng.uniform(-1, 1, count)))
+    longitudes = rng.uniform(-180, 180, count)
+    flags = rng.integers(0, 2, (count, 4))
+    yes_no = np.array(['n', 'y'])[flags]
+    with open(path, 'w') as f:
+        f.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<stations created="now" count="{count}">\n')
+        for i in range(count):
+            f.write(f'<station id="{i:06d}" lat="{latitudes[i]:.3f}" lon="{longitudes[i]:.3f}" '
+                    f'elev="0" name="Synthetic station {i}" owner="NDBC" pgm="NDBC Meteorological/Ocean" '
+                    f'type="{STATION_TYPES[i % len(STATION_TYPES)]}" met="{yes_no[i, 0]}" '
+                    f'currents="{yes_no[i, 1]}" waterquality="{yes_no[i, 2]}" dart="{yes_no[i, 3]}"/>\n')
+        f.write('</stations>\n')
@@ -0,0 +1,181 @@
+import functools
+import time
+import uuid
+from concurrent.futures import Future
+from threading import Event, Lock, Thread
+import pika
+from file_transfer import CONTENT_TYPE
+
+REQUEST_QUEUE = 'To_Microservice'
+LEGACY_REPLY_QUEUE = 'To_Main_Program'
+
+
+class BuoyRpcClient:
+    """Long lived RabbitMQ connection for buoy data requests to the NOAA microservice
+
+    One background thread owns the connection and consumes an exclusive reply
+    queue. Every request is published with a correlation_id and reply_to, and the
+    caller gets a Future that is resolved by the matching reply or failed with a
+    TimeoutError once its deadline passes, so any number of requests can be in
+    flight at once. Replies without a correlation_id on the old shared
+    To_Main_Program queue are handed to the oldest waiting request. Requests
+    accept file_transfer replies that carry the files themselves; the reply
+    body is returned as is, file_transfer.decode_reply reads either format.
+    """
+    def __init__(self, host='localhost', connection_factory=None, timeout=60, legacy_replies=True,
+                 poll_interval=0.25):
+        if connection_factory is None:
+            connection_factory = functools.partial(pika.BlockingConnection, pika.ConnectionParameters(host=host))
+        self.connection_factory = connection_factory
+        self.timeout = timeout
+        self.legacy_replies = legacy_replies
+        self.poll_interval = poll_interval
+        self._connection = None
+        self._channel = None
+        self._reply_queue = None
+        self._thread = None
+        self._ready = Event()
+        self._start_error = None
+        self._closing = False
+        self._pending = {}
+        self._lock = Lock()
+
+    def start(self):
+        """Open the connection in the background thread and wait until it is consuming
+
+        Every caller waits, including ones arriving while another caller's start
+        is still connecting, and raises ConnectionError if the connection failed.
+        """
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._closing = False
+                self._ready.clear()
+                self._start_error = None
+                self._thread = Thread(target=self._run, name='buoy-rpc', daemon=True)
+                self._thread.start()
+        self._ready.wait()
+        if self._start_error is not None:
+            raise ConnectionError(f"Could not connect to RabbitMQ: {self._start_error}")
+
+    def request(self, buoy_id, timeout=None):
+        """Send a data request for buoy_id and return a Future of the reply body"""
+        self.start()
+        correlation_id = uuid.uuid4().hex
+        future = Future()
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        with self._lock:
+            if self._channel is None:
+                # The connection thread stopped after start() returned
+                raise ConnectionError("RabbitMQ connection is closed")
+            self._pending[correlation_id] = (future, deadline)
+        try:
+            self._connection.add_callback_threadsafe(functools.partial(self._publish, correlation_id, buoy_id))
+        except Exception:
+            with self._lock:
+                self._pending.pop(correlation_id, None)
+            raise
+        return future
+
+    def pending(self):
+        """Return the number of requests waiting for a reply"""
+        with self._lock:
+            return len(self._pending)
+
+    def close(self):
+        """Stop the background thread and fail any requests still waiting"""
+        self._closing = True
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        self._connection = self._channel = None
+        try:
+            self._connection = self.connection_factory()
+            channel = self._connection.channel()
+            channel.queue_declare(queue=REQUEST_QUEUE)
+            result = channel.queue_declare(queue='', exclusive=True)
+            self._reply_queue = result.method.queue
+            channel.basic_consume(queue=self._reply_queue, auto_ack=True, on_message_callback=self._on_reply)
+            if self.legacy_replies:
+                channel.queue_declare(queue=LEGACY_REPLY_QUEUE)
+                channel.basic_consume(queue=LEGACY_REPLY_QUEUE, auto_ack=True, on_message_callback=self._on_reply)
+            self._channel = channel
+        except Exception as error:
+            self._start_error = error
+            if self._connection is not None:
+                try:
+                    self._connection.close()
+                except Exception:
+                    pass
+            self._ready.set()
+            return
+        self._ready.set()
+        error = ConnectionError("RPC client closed")
+        try:
+            while not self._closing:
+                self._connection.process_data_events(time_limit=self.poll_interval)
+                self._expire_requests()
+        except Exception as connection_error:
+            print(f"RabbitMQ connection lost: {connection_error}")
+            error = ConnectionError(f"RabbitMQ connection lost: {connection_error}")
+        finally:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._fail_pending(error)
+
+    def _publish(self, correlation_id, buoy_id):
+        """Publish a request, called on the connection thread"""
+        with self._lock:
+            if correlation_id not in self._pending:
+                return
+        try:
+            self._channel.basic_publish(exchange='', routing_key=REQUEST_QUEUE, body=buoy_id,
+                                        properties=pika.BasicProperties(reply_to=self._reply_queue,
+                                                                        correlation_id=correlation_id,
+                                                                        headers={'accept': CONTENT_TYPE}))
+        except Exception as error:
+            with self._lock:
+                waiter = self._pending.pop(correlation_id, None)
+            if waiter is not None and not waiter[0].done():
+                waiter[0].set_exception(ConnectionError(f"Could not send the request for {buoy_id}: {error}"))
+            return
+        print(f"Sent {buoy_id}")
+
+    def _on_reply(self, ch, method, properties, body):
+        """Resolve the Future waiting on a reply"""
+        correlation_id = properties.correlation_id if properties is not None else None
+        with self._lock:
+            if correlation_id is not None:
+                waiter = self._pending.pop(correlation_id, None)
+            elif self._pending:
+                # Legacy reply without an id, the microservice answers in order
+                waiter = self._pending.pop(next(iter(self._pending)))
+            else:
+                waiter = None
+        if waiter is None:
+            print("Dropped reply with no waiting request")
+            return
+        future, _ = waiter
+        if not future.done():
+            future.set_result(body)
+
+    def _expire_requests(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [correlation_id for correlation_id, (_, deadline) in self._pending.items() if deadline <= now]
+            waiters = [self._pending.pop(correlation_id) for correlation_id in expired]
+        for future, _ in waiters:
+            if not future.done():
+                future.set_exception(TimeoutError("No reply from the NOAA microservice"))
+
+    def _fail_pending(self, error):
+        with self._lock:
+            self._channel = None
+            waiters = list(self._pending.values())
+            self._pending.clear()
+        for future, _ in waiters:
+            if not future.done():
+                future.set_exception(error)
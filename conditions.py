@@ -0,0 +1,97 @@
+from types import MappingProxyType
+from ndbc_parser import first_valid_rows
+
+# Snapshot field name to the realtime2 column it is read from
+WEATHER_FIELDS = {'air_temperature': 'ATMP',
+                  'water_temperature': 'WTMP',
+                  'wind_speed': 'WSPD',
+                  'wind_direction': 'WDIR'}
+# Wave fields are taken together from the newest row where all three were reported
+WAVE_FIELDS = {'wave_height': 'WVHT',
+               'swell_period': 'DPD',
+               'swell_direction': 'MWD'}
+# Every realtime2 column a snapshot reads
+SUMMARY_COLUMNS = (*WEATHER_FIELDS.values(), *WAVE_FIELDS.values())
+DIRECTION_COLUMNS = ('WDIR', 'MWD')
+MISSING_TEXT = "N/A"
+
+
+def _plain(column, value):
+    """Convert a float32 reading to a plain Python number for display"""
+    if column in DIRECTION_COLUMNS:
+        return int(round(float(value)))
+    return round(float(value), 2)
+
+
+class Conditions:
+    """Immutable snapshot of the most recent observations of a station
+
+    Holds the newest value of each summary field, its unit and the time it was
+    observed. Missing values are None and are shown as N/A.
+    """
+    __slots__ = ('air_temperature', 'water_temperature', 'wind_speed', 'wind_direction',
+                 'wave_height', 'swell_period', 'swell_direction', 'units', 'observed_at')
+
+    def __init__(self, values, units, observed_at):
+        for name in (*WEATHER_FIELDS, *WAVE_FIELDS):
+            object.__setattr__(self, name, values.get(name))
+        object.__setattr__(self, 'units', MappingProxyType(dict(units)))
+        object.__setattr__(self, 'observed_at', MappingProxyType(dict(observed_at)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Conditions is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Conditions is immutable")
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in (*WEATHER_FIELDS, *WAVE_FIELDS))
+        return f"Conditions({fields})"
+
+    def get(self, name):
+        """Return the value of a field, or N/A if it was not reported"""
+        value = getattr(self, name)
+        return MISSING_TEXT if value is None else value
+
+    def text(self, name):
+        """Return a field formatted with its unit, or N/A if it was not reported"""
+        value = getattr(self, name)
+        if value is None:
+            return MISSING_TEXT
+        return f"{value} {self.units.get(name, '')}".rstrip()
+
+    def as_dict(self):
+        """Return the snapshot as plain values for JSON, observation times as ISO 8601 strings"""
+        return {'values': {name: getattr(self, name) for name in (*WEATHER_FIELDS, *WAVE_FIELDS)},
+                'units': dict(self.units),
+                'observed_at': {name: time.isoformat() for name, time in self.observed_at.items()}}
+
+    def combine(self, older):
+        """Return a snapshot of this one's values, taking the fields it lacks from an older snapshot"""
+        values = {}
+        observed_at = {}
+        for name in (*WEATHER_FIELDS, *WAVE_FIELDS):
+            source = self if getattr(self, name) is not None else older
+            values[name] = getattr(source, name)
+            if name in source.observed_at:
+                observed_at[name] = source.observed_at[name]
+        units = {name: self.units.get(name) or older.units.get(name, '') for name in (*WEATHER_FIELDS, *WAVE_FIELDS)}
+        return Conditions(values, units, observed_at)
+
+    @classmethod
+    def from_weather_data(cls, weather_data, weather_units, filtered_wave_data):
+        """Build a snapshot from the parsed realtime2 frames of a Station"""
+        values = {}
+        observed_at = {}
+        latest_rows = first_valid_rows(weather_data[list(WEATHER_FIELDS.values())])
+        for name, column in WEATHER_FIELDS.items():
+            row = latest_rows[column]
+            if row is not None:
+                values[name] = _plain(column, weather_data[column].iat[row])
+                observed_at[name] = weather_data.index[row].to_pydatetime()
+        if len(filtered_wave_data):
+            for name, column in WAVE_FIELDS.items():
+                values[name] = _plain(column, filtered_wave_data[column].iat[0])
+                observed_at[name] = filtered_wave_data.index[0].to_pydatetime()
+        units = {name: weather_units.get(column, '') for name, column in {**WEATHER_FIELDS, **WAVE_FIELDS}.items()}
+        return cls(values, units, observed_at)
@@ -1,108 +1,53 @@
-import requests
-import urllib.parse
-import xml.etree.ElementTree as eT
+import asyncio
+import functools
+import os
+from datetime import timedelta
 import tkinter as tk
 from tkinter import ttk
-from tkintermapview import TkinterMapView
-import pika
-from threading import Thread
-import pandas as pd
-import matplotlib
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-matplotlib.use('agg')   # required for use with tkinter
-
-
-class Station:
-    """Contains parsed data from a NOAA buoy station"""
-    def __init__(self, file_list):
-        self.tide_data = None
-        self.weather_data = None
-        self.weather_units = None
-        self.filtered_wave_data = None
-        self.swell_data = None
-        for file in file_list:
-            if '.dart' in file:
-                self._create_tide_data(file)
-            if '.txt' in file:
-                self._create_weather_data(file)
-
-    def _create_tide_data(self, file):
-        """Process dart data into format for plotting the tide"""
-        self.tide_data = pd.read_csv(file, header=0, delimiter=r"\s+")
-        self.tide_data.drop(columns=['T', 'ss'], inplace=True)
-        self.tide_data.drop(0, inplace=True)
-        self.tide_data['date'] = self.tide_data[['#YY', 'MM', 'DD']].agg('-'.join, axis=1)
-        self.tide_data['time'] = self.tide_data[['hh', 'mm']].agg(':'.join, axis=1)
-        self.tide_data['datetime'] = self.tide_data['date'] + ' ' + self.tide_data['time']
-        self.tide_data['HEIGHT'] = self.tide_data['HEIGHT'].astype(float)
-
-    def _create_weather_data(self, file):
-        """Process weather summary data into usable formats"""
-        self.weather_data = pd.read_csv(file, header=0, delimiter=r"\s+", index_col=False)
-        self.weather_units = self.weather_data.loc[0].copy(deep=True)
-        self.weather_data.drop(0, inplace=True)
-        self.filtered_wave_data = self.weather_data[
-            (self.weather_data["WVHT"] != 'MM') & (self.weather_data["DPD"] != 'MM') & (
-                    self.weather_data["MWD"] != 'MM')]
-
-    def air_temperature(self):
-        """Return current air temperature"""
-        search_air_temp = self.weather_data[self.weather_data["ATMP"] != "MM"]
-        if len(search_air_temp) == 0:
-            air_temperature = "N/A"
-        else:
-            air_temperature = search_air_temp['ATMP'].head(1).values[0]
-        return air_temperature
-
-    def air_temperature_unit(self):
-        """Return air temperature unit"""
-        return self.weather_units.loc['ATMP']
-
-    def water_temperature(self):
-        """Return current water temperature"""
-        search_water_temp = self.weather_data[self.weather_data["WTMP"] != 'MM']
-        if len(search_water_temp) == 0:
-            water_temperature = "N/A"
-        else:
-            water_temperature = search_water_temp['WTMP'].head(1).values[0]
-        return water_temperature
-
-    def water_temperature_unit(self):
-        """Return water temperature unit"""
-        return self.weather_units.loc['WTMP']
-
-    def significant_wave_height(self):
-        """Return current significant wave height"""
-        return self.filtered_wave_data["WVHT"].head(1).values[0]
-
-    def wave_height_unit(self):
-        """Return wave height unit"""
-        return self.weather_units.loc["WVHT"]
-
-    def swell_period(self):
-        """Return current dominant swell period"""
-        return self.filtered_wave_data["DPD"].head(1).values[0]
-
-    def swell_direction(self):
-        """Return current dominant swell direction"""
-        return self.filtered_wave_data["MWD"].head(1).values[0]
-
-    def wind_speed(self):
-        """Return current wind speed"""
-        return self.weather_data.loc[1, "WSPD"]
-
-    def wind_speed_unit(self):
-        """Return wind speed unit"""
-        return self.weather_units.loc["WSPD"]
-
-    def wind_direction(self):
-        """Return wind direction"""
-        return self.weather_data.loc[1, "WDIR"]
+from fetch_engine import FetchEngine
+from lazy_import import lazy_import
+from station_cache import StationCache
+from station_data import Station, request_station
+from tracing import NULL_SPAN, Tracer
+
+# Imported on first use, after the window is shown, see App.finish_startup
+pd = lazy_import('pandas')
+matplotlib = lazy_import('matplotlib')
+tkintermapview = lazy_import('tkintermapview')
+buoy_rpc = lazy_import('buoy_rpc')
+conditions = lazy_import('conditions')
+geocoding = lazy_import('geocoding')
+marker_layer = lazy_import('marker_layer')
+parse_worker = lazy_import('parse_worker')
+plot_panels = lazy_import('plot_panels')
+realtime_tail = lazy_import('realtime_tail')
+series_store = lazy_import('series_store')
+station_archive = lazy_import('station_archive')
+station_catalog = lazy_import('station_catalog')
+station_index = lazy_import('station_index')
+tile_cache = lazy_import('tile_cache')
+
+# Most buoys one "Fetch All" requests from the microservice at a time
+BATCH_CONCURRENCY = 20
+# Milliseconds between auto refreshes. realtime2 files are published about once an hour (see
+# station_cache.UPDATE_INTERVAL), checking every 10 minutes shows each update within 10 minutes of it
+REFRESH_INTERVAL = 10 * 60 * 1000
+# Archived observations shown while a buoy missing from the cache is requested, before its newest one
+ARCHIVE_PREVIEW = timedelta(days=2)
+# Setting this to a file path traces the request steps and writes the trace there on exit
+TRACE_ENV = 'BUOY_TRACE'
+# Milliseconds between refreshes of the latency panel shown while tracing
+LATENCY_REFRESH = 1000
 
 
 class App(tk.Tk):
-    """NOAA Data Dashboard Tkinter application"""
+    """NOAA Data Dashboard Tkinter application
+
+    Only the search bars are built before the window is first shown. The
+    services, map and plot panels, and the pandas, matplotlib, pika and
+    tkintermapview imports they need, follow in finish_startup once the window
+    has been mapped and exposed and the first frame has been painted.
+    """
     def __init__(self):
         super().__init__()
         self.title("Buoy Data Dashboard")
@@ -112,21 +57,59 @@ class App(tk.Tk):
                          "search_radius": tk.StringVar(),
                          "searched_buoys": tk.StringVar(),
                          "buoy_id": tk.StringVar(),
-                         "buoy_data": None}
+                         "buoy_data": None,
+                         "station_cache": StationCache(),
+                         "fetch_engine": FetchEngine(self),
+                         "tracer": Tracer(enabled=bool(os.environ.get(TRACE_ENV)))}
         self.location_frame = ttk.Frame(self)
         self.location_frame.grid(column=0, row=0, sticky='W')
         self.location_search_bar = LocationSearchBar(self.location_frame, self.app_data)
         self.search_bar_frame = ttk.Frame(self)
         self.search_bar_frame.grid(column=0, row=1, sticky='W')
         self.buoy_search_bar = BuoySearch(self.search_bar_frame, self.app_data)
+        self.latency_panel = None
+        self.bind('<Expose>', self._exposed)
+
+    def _exposed(self, event):
+        """Schedule finish_startup at the first Expose of the window, after the redraw it causes"""
+        if event.widget is self:
+            self.unbind('<Expose>')
+            self.after_idle(self.finish_startup)
+
+    def finish_startup(self):
+        """Create the services and the map and plot panels, called once the window is shown"""
+        with self.app_data["tracer"].span('startup'):
+            self.update_idletasks()     # paint the first frame before the slow imports
+            matplotlib.use('agg')   # required for use with tkinter
+            self.app_data.update({"station_catalog": station_catalog.StationCatalog(),
+                                  "rpc_client": buoy_rpc.BuoyRpcClient(),
+                                  "station_archive": station_archive.StationArchive(),
+                                  "series_store": series_store.SeriesStore(),
+                                  "tile_cache": tile_cache.TileCache(),
+                                  "realtime_tail": realtime_tail.RealtimeTail(),
+                                  "parse_pool": parse_worker.worker_pool(),
+                                  "geocoder": geocoding.Geocoder()})
+            self.buoy_search_bar.create_panels()
+            if self.app_data["tracer"].enabled:
+                self.latency_panel = plot_panels.LatencyPanel(self)
+                self.latency_panel.grid(column=0, row=2, sticky='W')
+                self.refresh_latencies()
+
+    def refresh_latencies(self):
+        """Show the latest p50 and p95 step latencies, then schedule the next refresh"""
+        self.latency_panel.update_latencies(self.app_data["tracer"].latencies())
+        self.after(LATENCY_REFRESH, self.refresh_latencies)
 
 
 class LocationSearchBar(ttk.Frame):
     """Tkinter frame for location search functionality"""
-    def __init__(self, parent, controller):
+    def __init__(self, parent, controller, debounce_delay=400):
         super().__init__()
         self.controller = controller
         self.parent = parent
+        self.debounce_delay = debounce_delay
+        self._search_job = None
+        self._query = None
         self.create_widgets()
 
     def create_widgets(self):
@@ -137,45 +120,43 @@ class LocationSearchBar(ttk.Frame):
         location_field = tk.Entry(self.parent, width=50,
                                   textvariable=self.controller["location_entry"])
         location_field.grid(column=1, row=0, sticky="W")
+        location_field.bind('<Return>', lambda event: self.location_search())
         location_field.focus_set()
         # Create Button for location search
         ttk.Button(self.parent, text="Search", width=15,
                    command=self.location_search).grid(column=2, row=0)
 
     def location_search(self):
-        """Return latitude and longitude of location_entry search query"""
+        """Look up the location_entry query once presses of Search or Return have settled"""
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(self.debounce_delay, self._start_search)
+
+    def _start_search(self):
+        self._search_job = None
         address = self.controller["location_entry"].get()
         print(address)
-        url = 'https://nominatim.openstreetmap.org/search?q=' + urllib.parse.quote(address) + '&format=json'
-        try:
-            response = requests.get(url).json()
-            result = response[0]["lon"], response[0]["lat"]
-            self.controller["latitude"].set(result[1])
-            self.controller["longitude"].set(result[0])
-            print(result)
-            return result
-        except Exception as error:
-            print(error)
-            return None, None
-
-
-def load_stations():
-    """Load an xml of the active NOAA stations"""
-    station_list_url = "http://www.ndbc.noaa.gov/activestations.xml"
-    response = requests.get(station_list_url)
-    with open('activestations.xml', 'wb') as f:
-        f.write(response.content)
-
-
-def parse_xml(xml_file):
-    """Parse input xml file"""
-    tree = eT.parse(xml_file)
-    root = tree.getroot()
-    station_list = []
-    for child in root:
-        station = child.attrib
-        station_list.append(station)
-    return station_list
+        self._query = address
+        self.controller["fetch_engine"].submit(self.geocode(address),
+                                               callback=functools.partial(self.set_location, query=address),
+                                               errback=self.search_failed)
+
+    async def geocode(self, address):
+        """Geocode an address on the fetch engine"""
+        with self.controller["tracer"].span('geocode', query=address):
+            return await self.controller["geocoder"].geocode(address)
+
+    def set_location(self, result, query=None):
+        """Fill the latitude and longitude entries with a geocoding result"""
+        if query is not None and query != self._query:
+            return      # a newer search was started while this one was in flight
+        self.controller["latitude"].set(result[1])
+        self.controller["longitude"].set(result[0])
+        print(result)
+
+    def search_failed(self, error):
+        """Report a location search that found nothing or could not reach the geocoder"""
+        print(f"Location search failed: {error}")
 
 
 class BuoySearch(ttk.Frame):
@@ -184,9 +165,15 @@ class BuoySearch(ttk.Frame):
         super().__init__(parent)
         self.parent = parent
         self.controller = controller
-        self.buoy_map = TkinterMapView(self.parent, width=400, height=400)
-        self.weather_frame = ttk.Frame(self.parent)
-        self.tide_frame = ttk.Frame(self.parent)
+        self.buoy_map = None
+        self.marker_layer = None
+        self.location_marker = None
+        self.weather_frame = None
+        self.tide_frame = None
+        self.comparison_table = None
+        self.batch_limit = asyncio.Semaphore(BATCH_CONCURRENCY)
+        self.auto_refresh = tk.BooleanVar(value=False)
+        self._refresh_job = None
         self.create_widgets()
 
     def create_widgets(self):
@@ -204,78 +191,225 @@ class BuoySearch(ttk.Frame):
         tk.Label(self.parent, text="Buoy ID:").grid(column=0, row=3)
         tk.Entry(self.parent, textvariable=self.controller['buoy_id']).grid(column=1, row=3)
         ttk.Button(self.parent, text="Get Data", width=15,
-                   command=self.microservice_thread).grid(column=2, row=3)
+                   command=self.microservice_request).grid(column=2, row=3)
+        ttk.Button(self.parent, text="Fetch All", width=15,
+                   command=self.fetch_all).grid(column=3, row=3)
+        ttk.Checkbutton(self.parent, text="Auto Refresh", variable=self.auto_refresh,
+                        command=self.toggle_auto_refresh).grid(column=4, row=3)
+
+    def create_panels(self):
+        """Create the map and the data panels, once the tile cache exists"""
+        self.buoy_map = tkintermapview.TkinterMapView(self.parent, width=400, height=400,
+                                                      database_path=self.controller['tile_cache'].path)
+        self.marker_layer = marker_layer.MarkerLayer(self.buoy_map, self.click_buoy_event)
+        self.weather_frame = plot_panels.ConditionsPanel(self.parent, title="Conditions Summary")
+        self.tide_frame = plot_panels.TidePanel(self.parent)
+        self.comparison_table = plot_panels.ComparisonTable(self.parent, command=self.select_buoy)
         self.buoy_map.grid(column=1, row=4, columnspan=5)
 
     def buoy_search(self):
         """Search for buoys within a given radius of a given latitude and longitude"""
         print("Buoy Search")
-        load_stations()
-        parsed_stations = parse_xml('activestations.xml')
-        result = []
         latitude_num = float(self.controller['latitude'].get())
         longitude_num = float(self.controller['longitude'].get())
-        miles_to_latitude = 69  # Conversion between miles and latitude
-        radius_num = float(self.controller['search_radius'].get()) / miles_to_latitude
-        for station in parsed_stations:
-            station_lat = float(station.get('lat'))
-            station_lon = float(station.get('lon'))
-            if (latitude_num - radius_num) <= station_lat <= (latitude_num + radius_num):
-                if (longitude_num - radius_num) <= station_lon <= (longitude_num + radius_num):
-                    result.append(station)
-        self.mark_buoys(result)
-
-    def mark_buoys(self, buoy_list):
+        radius_num = float(self.controller['search_radius'].get())
+        self.controller['fetch_engine'].submit(
+            self.search_stations(latitude_num, longitude_num, radius_num),
+            callback=functools.partial(self.mark_buoys, latitude_num=latitude_num, longitude_num=longitude_num,
+                                       radius_num=radius_num))
+
+    async def search_stations(self, latitude_num, longitude_num, radius_num):
+        """Return the active stations within radius_num miles, run on the fetch engine"""
+        loop = asyncio.get_running_loop()
+        tracer = self.controller['tracer']
+        with tracer.span('catalog'):
+            station_index = await loop.run_in_executor(None, self.controller['station_catalog'].index)
+        with tracer.span('search', radius=radius_num):
+            return station_index.search(latitude_num, longitude_num, radius_num)
+
+    def mark_buoys(self, buoy_list, latitude_num, longitude_num, radius_num):
         """Place markers on map at the location of active buoys within search radius"""
-        self.controller['searched_buoys'].set(buoy_list)
-        miles_to_latitude = 69  # Conversion between miles and latitude
-        radius_num = float(self.controller['search_radius'].get()) / miles_to_latitude
-        self.buoy_map.delete_all_marker()
-        self.buoy_map.fit_bounding_box((float(self.controller['latitude'].get()) + radius_num,
-                                        float(self.controller['longitude'].get()) - radius_num),
-                                       (float(self.controller['latitude'].get()) - radius_num,
-                                        float(self.controller['longitude'].get()) + radius_num))
-        location_marker = self.buoy_map.set_position(round(float(self.controller['latitude'].get()), 5),
-                                                     round(float(self.controller['longitude'].get()), 5),
-                                                     marker=True)
-        location_marker.set_text("Search Location")
-        markers = []
-        for buoy in buoy_list:
-            markers.append(self.buoy_map.set_marker(float(buoy.get("lat")), float(buoy.get("lon")),
-                                                    text=buoy.get("id"), command=self.click_buoy_event))
+        self.controller['searched_buoys'].set([buoy.get('id') for buoy in buoy_list])
+        search_box = station_index.bounding_box(latitude_num, longitude_num, radius_num)
+        self.buoy_map.fit_bounding_box(*search_box)
+        zoom = tile_cache.fitting_zoom(*search_box, self.buoy_map.width, self.buoy_map.height)
+        self.controller['tile_cache'].prefetch(*search_box, zoom)
+        if self.location_marker is not None:
+            self.location_marker.delete()
+        self.location_marker = self.buoy_map.set_position(round(latitude_num, 5), round(longitude_num, 5),
+                                                          marker=True)
+        self.location_marker.set_text("Search Location")
+        self.marker_layer.set_stations(buoy_list)
 
     def click_buoy_event(self, marker):
-        """Initialize a thread to get buoy data from clicked buoy, add buoy id to entry field"""
-        self.controller['buoy_id'].set(marker.text)
-        self.microservice_thread()
-
-    def microservice_thread(self):
-        """Initialize a thread with target buoy_request"""
-        ms_thread = Thread(target=self.buoy_request)
-        ms_thread.start()
-
-    def microservice_response(self, ch, method, properties, body):
-        """Received message from NOAA microservice with path(s) to downloaded file(s)"""
-        message = body.decode('utf-8')
-        if message != 'No files downloaded':
-            message_list = message.split(', ')
-            print(f"Received Files: {message_list}")
-            self.controller['buoy_data'] = Station(message_list)
+        """Request data for the clicked buoy, add buoy id to entry field"""
+        self.select_buoy(marker.text)
+
+    def select_buoy(self, buoy_id):
+        """Make buoy_id the selected buoy and show its data"""
+        self.controller['buoy_id'].set(buoy_id)
+        self.microservice_request()
+
+    def microservice_request(self):
+        """Show cached data for the entered buoy id, requesting it from the NOAA microservice if needed"""
+        buoy_id = self.controller['buoy_id'].get()
+        station_cache = self.controller['station_cache']
+        station, fresh = station_cache.get(buoy_id)
+        if station is not None:
+            self.show_station(buoy_id, station)
+            if fresh or not station_cache.revalidate:
+                return
+        request_span = self.controller['tracer'].span('request', request=buoy_id)
+        request = self.controller['fetch_engine'].submit(self.fetch_station(buoy_id),
+                                                         callback=functools.partial(self.show_station, buoy_id,
+                                                                                    request_span=request_span))
+        if station is None:
+            self.controller['fetch_engine'].call(self.read_archive, buoy_id,
+                                                 callback=functools.partial(self.show_archived, buoy_id, request))
+
+    def read_archive(self, buoy_id):
+        """Return a Station of the buoy's newest archived conditions and tide, or None, run in a worker thread
+
+        Only the columns the conditions summary and the tide plot show are
+        read, from the last ARCHIVE_PREVIEW of the archive.
+        """
+        archive = self.controller['station_archive']
+        newest = archive.last_timestamp(buoy_id, 'weather')
+        if newest is None:
+            return None
+        station = Station.from_archive(archive, buoy_id, start=newest - ARCHIVE_PREVIEW,
+                                       columns={'weather': conditions.SUMMARY_COLUMNS, 'tide': ('HEIGHT',)})
+        station.conditions     # compute the snapshot here, not on the Tk thread
+        return station
+
+    def show_archived(self, buoy_id, request, station):
+        """Show archived observations unless the microservice request already returned the buoy's data
+
+        They are shown while the request is in flight and stay shown if it
+        fails or the microservice has no data for the buoy.
+        """
+        fetched = request.done() and not request.cancelled() and request.exception() is None
+        if station is not None and not (fetched and request.result() is not None):
+            self.show_station(buoy_id, station)
+
+    async def fetch_station(self, buoy_id):
+        """Request buoy data from the NOAA microservice and archive its new readings"""
+        station = await request_station(self.controller, buoy_id)
+        if station is not None:
+            # Only readings newer than the newest stored ones are written
+            self.controller['fetch_engine'].call(self.controller['station_archive'].append_station, buoy_id, station)
+            self.controller['fetch_engine'].call(self.controller['series_store'].append_station, buoy_id, station,
+                                                 callback=functools.partial(self.station_stored, buoy_id, station))
+        return station
+
+    def fetch_all(self):
+        """Fetch every buoy found by the last radius search and compare their current conditions"""
+        buoy_ids = self.tk.splitlist(self.controller['searched_buoys'].get())
+        self.comparison_table.set_buoys(buoy_ids)
+        self.comparison_table.grid(column=1, row=5, columnspan=8, sticky='EW')
+        station_cache = self.controller['station_cache']
+        for buoy_id in buoy_ids:
+            station, fresh = station_cache.get(buoy_id)
+            if station is not None and (fresh or not station_cache.revalidate):
+                self.comparison_table.update_station(buoy_id, station)
+                continue
+            self.controller['fetch_engine'].submit(
+                self.fetch_limited(buoy_id),
+                callback=functools.partial(self.comparison_table.update_station, buoy_id),
+                errback=functools.partial(self.comparison_table.mark_failed, buoy_id))
+
+    async def fetch_limited(self, buoy_id):
+        """fetch_station, holding one of the BATCH_CONCURRENCY slots while it runs"""
+        async with self.batch_limit:
+            return await self.fetch_station(buoy_id)
+
+    def toggle_auto_refresh(self):
+        """Start or stop refreshing the selected and compared buoys every REFRESH_INTERVAL"""
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+            self._refresh_job = None
+        if self.auto_refresh.get():
+            self.refresh_stations()
+
+    def refresh_stations(self):
+        """Tail new observations of every displayed buoy that has cached data, then schedule the next refresh"""
+        buoy_ids = dict.fromkeys([self.controller['buoy_id'].get(), *self.comparison_table.buoy_ids()])
+        for buoy_id in buoy_ids:
+            station, _ = self.controller['station_cache'].get(buoy_id)
+            if station is not None:
+                self.controller['fetch_engine'].submit(self.tail_station(buoy_id, station),
+                                                       callback=functools.partial(self.station_refreshed, buoy_id))
+        self._refresh_job = self.after(REFRESH_INTERVAL, self.refresh_stations)
+
+    async def tail_station(self, buoy_id, station):
+        """Merge the observations newer than a Station's into it
+
+        Returns the station and the new rows of each kind of data, or None if
+        there were none. Only the new rows are archived and stored.
+        """
+        loop = asyncio.get_running_loop()
+        tail = self.controller['realtime_tail']
+        new_rows = {}
+        with self.controller['tracer'].span('tail', request=buoy_id):
+            for kind in realtime_tail.TAIL_SUFFIXES:
+                since = station.newest_time(kind)
+                if since is None:
+                    continue
+                new_data, units = await loop.run_in_executor(None, tail.fetch_new, buoy_id, kind, since)
+                rows = station.append_observations(kind, new_data, units)
+                if rows is not None:
+                    new_rows[kind] = (rows, units)
+        if not new_rows:
+            return None
+        self.controller['station_cache'].put(buoy_id, station)
+        self.controller['fetch_engine'].call(self.store_rows, buoy_id, new_rows)
+        return station, new_rows
+
+    def store_rows(self, buoy_id, new_rows):
+        """Append tailed rows to the archive and the series store, run in a worker thread"""
+        for kind, (rows, units) in new_rows.items():
+            self.controller['station_archive'].append(buoy_id, kind, rows, units if kind == 'weather' else None)
+            self.controller['series_store'].append_frame(buoy_id, kind, rows)
+
+    def station_stored(self, buoy_id, station, added):
+        """Replot the tide of a shown station from its history once its new heights are in the series store"""
+        if (added.get('HEIGHT') and station is self.controller['buoy_data']
+                and buoy_id == self.controller['buoy_id'].get()):
+            self.tide_plot(station)
+
+    def station_refreshed(self, buoy_id, refreshed):
+        """Show newly merged observations, called on the Tk thread
+
+        The panels of a shown station are updated from the new rows alone: the
+        conditions from the merged snapshot and the tide plot by extending its
+        line, so the work does not grow with the station's history.
+        """
+        if refreshed is None:
+            return
+        station, new_rows = refreshed
+        self.comparison_table.update_station(buoy_id, station)
+        if station is not self.controller['buoy_data'] or buoy_id != self.controller['buoy_id'].get():
+            self.show_station(buoy_id, station)
+            return
+        if 'weather' in new_rows:
+            self.summary_weather(station)
+        if 'tide' in new_rows:
+            rows, _ = new_rows['tide']
+            self.tide_frame.extend_series(rows.index.tz_convert(None).to_numpy(), rows['HEIGHT'].to_numpy())
+
+    def show_station(self, buoy_id, station, request_span=NULL_SPAN):
+        """Display a parsed station if it is still the selected buoy, called on the Tk thread"""
+        if station is None or buoy_id != self.controller['buoy_id'].get():
+            request_span.end()
+            return
+        self.controller['buoy_data'] = station
+        tracer = self.controller['tracer']
+        with tracer.span('render', request=buoy_id):
             self.display_data()
-
-    def buoy_request(self):
-        """Opens RabbitMQ channel to NOAA microservice to make and receive buoy data requests"""
-        connection = pika.BlockingConnection(pika.ConnectionParameters(host='localhost'))
-        channel = connection.channel()
-        channel.queue_declare(queue='To_Microservice')
-        channel.queue_declare(queue='To_Main_Program')
-        channel.basic_publish(exchange='', routing_key='To_Microservice',
-                              body=self.controller['buoy_id'].get())
-        print(f"Sent {self.controller['buoy_id'].get()}")
-        channel.basic_consume(queue="To_Main_Program", auto_ack=True,
-                              on_message_callback=self.microservice_response)
-        channel.start_consuming()
-        connection.close()
+        if tracer.enabled:
+            # Tk paints the widgets, and the plot scheduled with draw_idle, once it is idle
+            self.after_idle(tracer.span('paint', request=buoy_id).end)
+            self.after_idle(request_span.end)
 
     def display_data(self):
         """Refreshes buoy data widgets"""
@@ -291,42 +425,32 @@ class BuoySearch(ttk.Frame):
                 self.tide_plot(self.controller['buoy_data'])
 
     def tide_plot(self, station):
-        """Plots tide data"""
-        fig = Figure(figsize=(4, 4), dpi=100)
-        ax = fig.add_subplot(111)
-        station.tide_data.plot(x='time', y='HEIGHT', kind='line', legend=None, ax=ax,
-                               ylabel='Height [m]', title='Tide', xlim=(0, 200))
-        canvas = FigureCanvasTkAgg(fig, master=self.tide_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack()
+        """Plots the selected buoy's tide history from the series store, or the station's tide data
+
+        The station's own data is plotted until the series store holds its
+        newest height, which is written in the background after a fetch.
+        """
+        tide_data = station.tide_data
+        history = self.controller['series_store'].open(self.controller['buoy_id'].get(), 'HEIGHT')
+        stored = history.last_time()
+        if len(tide_data) == 0 or stored is None or pd.Timestamp(stored) < tide_data.index[0].tz_convert(None):
+            self.tide_frame.update_plot(tide_data)
+            return
+        oldest = pd.Timestamp(stored) - max(plot_panels.TIDE_PLOT_RANGES.values())
+        self.tide_frame.update_series(*history.between(start=oldest))
 
     def summary_weather(self, station):
         """Displays summary weather data"""
-        tk.Label(master=self.weather_frame, justify='center', text="Conditions Summary").grid(column=0, row=0)
-        tk.Label(master=self.weather_frame, justify='right', text="Air").grid(column=0, row=1, sticky='W')
-        tk.Label(master=self.weather_frame, justify='right',
-                 text=f"{station.air_temperature()} "
-                      f"{station.air_temperature_unit()}").grid(column=1, row=1, sticky='W')
-
-        tk.Label(master=self.weather_frame, justify='right', text="Water").grid(column=0, row=2, sticky='W')
-        tk.Label(master=self.weather_frame, justify='right',
-                 text=f"{station.water_temperature()} "
-                      f"{station.water_temperature_unit()}").grid(column=1, row=2, sticky='W')
-
-        tk.Label(master=self.weather_frame, justify='right', text="Waves").grid(column=0, row=3, sticky='W')
-        tk.Label(master=self.weather_frame, justify='right',
-                 text=f"{station.significant_wave_height()} {station.wave_height_unit()} @ {station.swell_period()}"
-                      f" s {station.swell_direction()} \N{DEGREE SIGN}").grid(column=1, row=3, sticky='W')
-
-        tk.Label(master=self.weather_frame, justify='right', text="Wind").grid(column=0, row=4, sticky='W')
-        tk.Label(master=self.weather_frame, justify='right',
-                 text=f"{station.wind_speed()} {station.wind_speed_unit()} "
-                      f"{station.wind_direction()} \N{DEGREE SIGN}").grid(column=1, row=4, sticky='W')
+        self.weather_frame.update_conditions(station.conditions)
 
 
 def main():
     myapp = App()
     myapp.mainloop()
+    trace_path = os.environ.get(TRACE_ENV)
+    if trace_path:
+        myapp.app_data["tracer"].export(trace_path)
+        print(f"Wrote trace to {trace_path}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,163 @@
+import math
+from collections import OrderedDict
+import numpy as np
+
+# Decimated levels kept per series, each level doubles the bucket count
+CACHED_LEVELS = 8
+# Points added by DecimatedSeries.extend are merged into the levels once they are this fraction of the series
+MERGE_FRACTION = 0.25
+
+
+def minmax_decimate(x, y, buckets):
+    """Reduce sorted x, y to the minimum and maximum point of each of buckets equal width x ranges
+
+    Points are returned in x order, at most two per bucket, so a line drawn
+    through them covers the same vertical extent in every pixel column as a
+    line through all points. NaN readings are dropped.
+    """
+    valid = ~np.isnan(y)
+    if not valid.all():
+        x, y = x[valid], y[valid]
+    if len(x) <= 2 * buckets:
+        return x, y
+    span = float(x[-1] - x[0]) or 1.0
+    bucket_of = np.minimum(((x - x[0]) / span * buckets).astype(np.int64), buckets - 1)
+    starts = np.flatnonzero(np.diff(bucket_of, prepend=-1))
+    counts = np.diff(np.append(starts, len(x)))
+    segment = np.repeat(np.arange(len(starts)), counts)
+    lows = np.repeat(np.minimum.reduceat(y, starts), counts)
+    highs = np.repeat(np.maximum.reduceat(y, starts), counts)
+    # First position in each bucket holding its minimum and its maximum
+    _, low_first = np.unique(segment[y == lows], return_index=True)
+    _, high_first = np.unique(segment[y == highs], return_index=True)
+    keep = np.union1d(np.flatnonzero(y == lows)[low_first], np.flatnonzero(y == highs)[high_first])
+    return x[keep], y[keep]
+
+
+def lttb(x, y, threshold):
+    """Largest Triangle Three Buckets downsampling of sorted x, y to threshold points
+
+    The first and last points are kept; from every bucket in between the point
+    forming the largest triangle with the point kept before it and the mean of
+    the next bucket is kept. Buckets are scored with array operations, only the
+    walk from bucket to bucket is a loop.
+    """
+    valid = ~np.isnan(y)
+    if not valid.all():
+        x, y = x[valid], y[valid]
+    if threshold >= len(x) or threshold < 3:
+        return x, y
+    edges = np.linspace(1, len(x) - 1, threshold - 1).astype(np.int64)
+    sums_x = np.add.reduceat(x[:-1], edges[:-1])
+    sums_y = np.add.reduceat(y[:-1], edges[:-1])
+    sizes = np.diff(edges)
+    means_x = np.append(sums_x / sizes, x[-1])
+    means_y = np.append(sums_y / sizes, y[-1])
+    keep = np.empty(threshold, np.int64)
+    keep[0], keep[-1] = 0, len(x) - 1
+    chosen = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        ax, ay = x[chosen], y[chosen]
+        cx, cy = means_x[bucket + 1], means_y[bucket + 1]
+        area = np.abs((ax - cx) * (y[start:end] - ay) - (ax - x[start:end]) * (cy - ay))
+        chosen = start + int(np.argmax(area))
+        keep[bucket + 1] = chosen
+    return x[keep], y[keep]
+
+
+class DecimatedSeries:
+    """A long x, y series that hands out about two points per pixel for any visible x range
+
+    The whole series is decimated at power of two bucket counts and each level
+    is cached, so zooming back to a level, or panning within it, only slices
+    a cached array. The level is chosen so the visible range spans at least
+    pixels buckets; when the raw points are fewer than that they are used as is.
+    Points appended with extend are kept in a raw tail beside the levels.
+    """
+    def __init__(self, x, y, method=minmax_decimate):
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y)
+        self.method = method
+        self._levels = OrderedDict()
+        self._tail_x = np.empty(0)
+        self._tail_y = np.empty(0, self.y.dtype)
+        self._tail_length = 0
+
+    def __len__(self):
+        return len(self.x) + self._tail_length
+
+    def bounds(self):
+        """Return the first and last x of the series, extended points included"""
+        last = self._tail_x[self._tail_length - 1] if self._tail_length else self.x[-1]
+        return self.x[0], last
+
+    def extend(self, x, y):
+        """Append the points of sorted x, y beyond the last x, returning how many were added
+
+        The points go into a tail buffer that doubles when full and are merged
+        into the series, clearing the cached levels, once they reach
+        MERGE_FRACTION of it. Extending therefore costs amortized time
+        proportional to the points added, not to the length of the series.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y)
+        if len(self):
+            keep = x > self.bounds()[1]
+            x, y = x[keep], y[keep]
+        if len(x) == 0:
+            return 0
+        start, end = self._tail_length, self._tail_length + len(x)
+        if end > len(self._tail_x):
+            tail_x = np.empty(max(2 * end, 64))
+            tail_y = np.empty(len(tail_x), self._tail_y.dtype)
+            tail_x[:start], tail_y[:start] = self._tail_x[:start], self._tail_y[:start]
+            self._tail_x, self._tail_y = tail_x, tail_y
+        self._tail_x[start:end], self._tail_y[start:end] = x, y
+        self._tail_length = end
+        if end >= MERGE_FRACTION * len(self.x):
+            self.x = np.concatenate([self.x, self._tail_x[:end]])
+            self.y = np.concatenate([self.y, self._tail_y[:end]])
+            self._tail_length = 0
+            self._levels.clear()
+        return len(x)
+
+    def level(self, xmin, xmax, pixels):
+        """Return the decimation level used to draw xmin..xmax across pixels, or None for raw points"""
+        span = float(self.x[-1] - self.x[0]) if len(self.x) > 1 else 0.0
+        visible = max(float(xmax - xmin), 1e-12)
+        buckets = pixels * max(span / visible, 1.0)
+        if len(self.x) <= 2 * buckets:
+            return None
+        return max(int(math.ceil(math.log2(buckets))), 0)
+
+    def decimated(self, level):
+        """Return the whole series decimated to 2 ** level buckets, computed once per level"""
+        if level in self._levels:
+            self._levels.move_to_end(level)
+            return self._levels[level]
+        points = self.method(self.x, self.y, 2 ** level)
+        self._levels[level] = points
+        while len(self._levels) > CACHED_LEVELS:
+            self._levels.popitem(last=False)
+        return points
+
+    def view(self, xmin, xmax, pixels):
+        """Return x, y to draw for xmin..xmax, one point beyond each edge so the line reaches the axes"""
+        level = self.level(xmin, xmax, pixels)
+        x, y = (self.x, self.y) if level is None else self.decimated(level)
+        x, y = _visible(x, y, xmin, xmax)
+        if not self._tail_length:
+            return x, y
+        tail_x, tail_y = _visible(self._tail_x[:self._tail_length], self._tail_y[:self._tail_length], xmin, xmax)
+        if len(tail_x) > 2 * pixels:
+            visible = max(float(xmax - xmin), 1e-12)
+            tail_x, tail_y = self.method(tail_x, tail_y, max(int(pixels * (tail_x[-1] - tail_x[0]) / visible), 1))
+        return np.concatenate([x, tail_x]), np.concatenate([y, tail_y])
+
+
+def _visible(x, y, xmin, xmax):
+    """Return the points of sorted x, y within xmin..xmax and one beyond each edge"""
+    first = max(int(np.searchsorted(x, xmin, side='left')) - 1, 0)
+    last = min(int(np.searchsorted(x, xmax, side='right')) + 1, len(x))
+    return x[first:last], y[first:last]
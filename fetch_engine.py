@@ -0,0 +1,86 @@
+import asyncio
+import functools
+import queue
+import traceback
+from threading import Thread
+
+
+class FetchEngine:
+    """Asyncio event loop in a background thread that runs the dashboard's network I/O
+
+    Coroutines are submitted from the Tk thread and run on the engine loop. When one
+    finishes its callback is put on a thread-safe queue that the Tk loop drains with
+    after(), so callbacks that touch widgets always run on the Tk thread.
+    """
+    def __init__(self, widget=None, poll_interval=50):
+        self.poll_interval = poll_interval
+        self.loop = asyncio.new_event_loop()
+        self._results = queue.SimpleQueue()
+        self._widget = None
+        self._thread = Thread(target=self._run, name='fetch-engine', daemon=True)
+        self._thread.start()
+        if widget is not None:
+            self.attach(widget)
+
+    def attach(self, widget):
+        """Start delivering results to callbacks on the Tk thread of widget"""
+        self._widget = widget
+        widget.after(self.poll_interval, self._poll)
+
+    def submit(self, coroutine, callback=None, errback=None):
+        """Run a coroutine on the engine loop, then callback(result) or errback(error) on the Tk thread"""
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        future.add_done_callback(lambda done: self._results.put((done, callback, errback)))
+        return future
+
+    def call(self, func, *args, callback=None, errback=None):
+        """Run a blocking function in the engine's executor, with the same callbacks as submit"""
+        return self.submit(self.run_blocking(func, *args), callback, errback)
+
+    async def run_blocking(self, func, *args):
+        """Await a blocking function run in the loop's default thread pool"""
+        return await self.loop.run_in_executor(None, functools.partial(func, *args))
+
+    def process_results(self):
+        """Run the callbacks of every finished submission, must be called on the Tk thread
+
+        An exception raised by one callback is printed and the remaining
+        results are still delivered.
+        """
+        while True:
+            try:
+                future, callback, errback = self._results.get_nowait()
+            except queue.Empty:
+                return
+            if future.cancelled():
+                continue
+            try:
+                error = future.exception()
+                if error is not None:
+                    if errback is not None:
+                        errback(error)
+                    else:
+                        print(f"Background request failed: {error!r}")
+                elif callback is not None:
+                    callback(future.result())
+            except Exception:
+                print("Handling a background request result failed:")
+                traceback.print_exc()
+
+    def close(self):
+        """Stop the engine loop and wait for its thread to exit"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self._widget = None
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def _poll(self):
+        if self._widget is None:
+            return
+        try:
+            self.process_results()
+        finally:
+            self._widget.after(self.poll_interval, self._poll)
@@ -0,0 +1,113 @@
+import gzip
+import json
+import struct
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Content type of replies carrying files, requests send it as their accept header
+CONTENT_TYPE = 'application/x-buoy-files'
+MAGIC = b'BUOY'
+VERSION = 1
+# Magic, version and the length of the JSON header that follows
+PREFIX = struct.Struct('>4sBI')
+LEGACY_NO_FILES = 'No files downloaded'
+STATUS_OK = 'ok'
+STATUS_NO_FILES = 'no_files'
+STATUS_ERROR = 'error'
+
+
+def default_codec():
+    """Return 'zstd' when the zstandard package is installed, otherwise 'gzip'"""
+    return 'zstd' if zstandard is not None else 'gzip'
+
+
+def compress(data, codec):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if codec == 'gzip':
+        return gzip.compress(data, compresslevel=6)
+    if codec == 'none':
+        return data
+    raise ValueError(f"Unknown codec {codec!r}")
+
+
+def decompress(data, codec):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError("Reply is zstd compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == 'gzip':
+        return gzip.decompress(data)
+    if codec == 'none':
+        return data
+    raise ValueError(f"Unknown codec {codec!r}")
+
+
+class Reply:
+    """A decoded microservice reply
+
+    status is 'ok', 'no_files' or 'error'. files maps each file name to its
+    still compressed payload and codec names the compression; payload(name)
+    decompresses one. Replies from the old microservice come back with codec
+    None and the local paths it downloaded to in paths.
+    """
+    def __init__(self, status, buoy_id=None, codec=None, files=None, sizes=None, message='', paths=()):
+        self.status = status
+        self.buoy_id = buoy_id
+        self.codec = codec
+        self.files = files or {}
+        self.sizes = sizes or {}
+        self.message = message
+        self.paths = list(paths)
+
+    def __repr__(self):
+        return f"Reply({self.status!r}, buoy_id={self.buoy_id!r}, files={list(self.files) or self.paths})"
+
+    def payload(self, name):
+        """Return the decompressed bytes of one file"""
+        return decompress(self.files[name], self.codec)
+
+
+def encode_files(buoy_id, files, codec=None):
+    """Return a reply message carrying files, a dict of file name to bytes, compressed with codec"""
+    codec = codec or default_codec()
+    entries = []
+    blobs = []
+    offset = 0
+    for name, data in files.items():
+        blob = compress(data, codec)
+        entries.append({'name': name, 'offset': offset, 'length': len(blob), 'size': len(data)})
+        blobs.append(blob)
+        offset += len(blob)
+    status = STATUS_OK if files else STATUS_NO_FILES
+    return _encode({'status': status, 'buoy_id': buoy_id, 'codec': codec, 'files': entries}, blobs)
+
+
+def encode_status(buoy_id, status, message=''):
+    """Return a reply message without files, for 'no_files' or 'error' replies"""
+    return _encode({'status': status, 'buoy_id': buoy_id, 'codec': 'none', 'files': [], 'message': message}, [])
+
+
+def _encode(header, blobs):
+    header = json.dumps(header, separators=(',', ':')).encode()
+    return b''.join([PREFIX.pack(MAGIC, VERSION, len(header)), header, *blobs])
+
+
+def decode_reply(body):
+    """Decode a reply body, either this protocol or the old comma separated list of paths"""
+    if body[:len(MAGIC)] != MAGIC:
+        message = body.decode('utf-8')
+        if message == LEGACY_NO_FILES:
+            return Reply(STATUS_NO_FILES, message=message)
+        return Reply(STATUS_OK, paths=message.split(', '))
+    _, version, header_length = PREFIX.unpack_from(body)
+    if version != VERSION:
+        raise ValueError(f"Unsupported reply version {version}")
+    start = PREFIX.size + header_length
+    header = json.loads(body[PREFIX.size:start])
+    files = {entry['name']: body[start + entry['offset']:start + entry['offset'] + entry['length']]
+             for entry in header['files']}
+    sizes = {entry['name']: entry['size'] for entry in header['files']}
+    return Reply(header['status'], header.get('buoy_id'), header['codec'], files, sizes, header.get('message', ''))
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import os
+import time
+from threading import Lock
+import requests
+
+NOMINATIM_URL = 'https://nominatim.openstreetmap.org/search'
+USER_AGENT = 'Buoy-Dashboard geocoder'
+
+
+def normalize_query(address):
+    """Return the cache key of a search query: lower case with runs of whitespace collapsed"""
+    return ' '.join(address.lower().split())
+
+
+class TokenBucket:
+    """Asyncio rate limiter handing out rate tokens per second with bursts of up to capacity"""
+    def __init__(self, rate=1.0, capacity=1, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = None
+
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = self.clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class Geocoder:
+    """Nominatim client with a persistent result cache, run on the FetchEngine loop
+
+    Results are cached on disk by normalized query, so repeated searches never
+    reach the server. Identical queries that arrive while a lookup is in flight
+    wait for that lookup instead of sending their own, and the lookups that do
+    go out are spaced by a token bucket to stay within Nominatim's one request
+    per second usage policy. base_url can point at a local fake geocoder.
+    """
+    def __init__(self, base_url=NOMINATIM_URL, cache_path='geocode_cache.json', rate=1.0, session=None,
+                 timeout=10):
+        self.base_url = base_url
+        self.cache_path = cache_path
+        self.timeout = timeout
+        if session is None:
+            session = requests.Session()
+            session.headers['User-Agent'] = USER_AGENT
+        self.session = session
+        self.bucket = TokenBucket(rate)
+        self.requests_sent = 0
+        self._cache = self._load_cache()
+        self._in_flight = {}
+        self._save_lock = Lock()
+
+    async def geocode(self, address):
+        """Return (longitude, latitude) of the first match for address, raising LookupError if none"""
+        key = normalize_query(address)
+        if not key:
+            raise LookupError("Empty location search")
+        if key in self._cache:
+            return self._result(key)
+        lookup = self._in_flight.get(key)
+        if lookup is None:
+            lookup = asyncio.ensure_future(self._lookup(key))
+            self._in_flight[key] = lookup
+            lookup.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        await asyncio.shield(lookup)
+        return self._result(key)
+
+    def _result(self, key):
+        result = self._cache[key]
+        if result is None:
+            raise LookupError(f"No location found for {key!r}")
+        return tuple(result)
+
+    async def _lookup(self, key):
+        await self.bucket.acquire()
+        loop = asyncio.get_running_loop()
+        self._cache[key] = await loop.run_in_executor(None, self._request, key)
+        await loop.run_in_executor(None, self._save_cache, dict(self._cache))
+
+    def _request(self, key):
+        """Query the geocoder, returning [lon, lat] of the first match or None"""
+        self.requests_sent += 1
+        response = self.session.get(self.base_url, params={'q': key, 'format': 'json', 'limit': 1},
+                                    timeout=self.timeout)
+        response.raise_for_status()
+        matches = response.json()
+        if not matches:
+            return None
+        return [matches[0]["lon"], matches[0]["lat"]]
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self, cache):
+        temporary = self.cache_path + '.tmp'
+        with self._save_lock:
+            with open(temporary, 'w') as file:
+                json.dump(cache, file)
+            os.replace(temporary, self.cache_path)
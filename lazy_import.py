@@ -0,0 +1,28 @@
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Placeholder for a module that is imported the first time one of its attributes is read
+
+    The real module's attributes are then copied onto the placeholder, so later
+    reads are plain attribute lookups. Submodules such as 'matplotlib.pyplot'
+    do not import their package until first use either.
+    """
+    def __getattr__(self, attribute):
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attribute)
+
+    def __repr__(self):
+        loaded = self.__name__ in sys.modules
+        return f"<lazy module {self.__name__!r} ({'loaded' if loaded else 'not loaded'})>"
+
+
+def lazy_import(name):
+    """Return module name if it is already imported, otherwise a LazyModule that imports it on first use"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
@@ -0,0 +1,135 @@
+import math
+import numpy as np
+from tkintermapview.utility_functions import osm_to_decimal
+
+CLUSTER_PIXELS = 48
+CLUSTER_ZOOM_STEP = 2
+
+
+def tile_coordinates(latitudes, longitudes, zoom):
+    """Vectorized decimal_to_osm: map coordinates in degrees to OSM tile coordinates"""
+    n = 2.0 ** zoom
+    lat_rad = np.radians(np.clip(latitudes, -85.0511, 85.0511))
+    x = (np.asarray(longitudes, dtype=np.float64) + 180.0) / 360.0 * n
+    y = (1.0 - np.log(np.tan(lat_rad) + 1 / np.cos(lat_rad)) / math.pi) / 2.0 * n
+    return x, y
+
+
+class MarkerLayer:
+    """Station markers on a TkinterMapView, drawn only inside the viewport and clustered by zoom
+
+    Stations are bucketed into cells of cluster_pixels at the current zoom level;
+    a cell holding one station gets a station marker and a cell holding several
+    gets one cluster marker that zooms in when clicked. Each refresh only deletes
+    markers that are no longer wanted and creates the ones that are new, so
+    panning, zooming and repeating a search leave unchanged markers alone.
+    """
+    def __init__(self, map_widget, command, cluster_pixels=CLUSTER_PIXELS, refresh_delay=200):
+        self.map_widget = map_widget
+        self.command = command
+        self.cluster_pixels = cluster_pixels
+        self.refresh_delay = refresh_delay
+        self.stations = []
+        self._latitudes = np.empty(0)
+        self._longitudes = np.empty(0)
+        self._markers = {}
+        self._refresh_job = None
+        for sequence in ("<ButtonRelease-1>", "<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.map_widget.canvas.bind(sequence, self.schedule_refresh, add='+')
+        self.map_widget.bind('<Configure>', self.schedule_refresh, add='+')
+
+    def set_stations(self, stations):
+        """Replace the stations shown by the layer"""
+        self.stations = list(stations)
+        self._latitudes = np.fromiter((float(station.get('lat')) for station in self.stations), np.float64,
+                                      len(self.stations))
+        self._longitudes = np.fromiter((float(station.get('lon')) for station in self.stations), np.float64,
+                                       len(self.stations))
+        self.schedule_refresh()
+
+    def clear(self):
+        """Remove every station and cluster marker"""
+        self.set_stations([])
+
+    def schedule_refresh(self, event=None):
+        """Refresh once the map has settled, coalescing bursts of pan and zoom events"""
+        if self._refresh_job is not None:
+            self.map_widget.after_cancel(self._refresh_job)
+        self._refresh_job = self.map_widget.after(self.refresh_delay, self.refresh)
+
+    def refresh(self):
+        """Bring the drawn markers in line with the stations inside the current viewport"""
+        self._refresh_job = None
+        wanted = self._wanted_markers()
+        stale = [key for key in self._markers if key not in wanted]
+        self._delete_markers([self._markers.pop(key) for key in stale])
+        for key, (lat, lon, text, payload) in wanted.items():
+            if key in self._markers:
+                continue
+            if key[0] == 'station':
+                marker = self.map_widget.set_marker(lat, lon, text=text, command=self.command, data=payload)
+            else:
+                marker = self.map_widget.set_marker(lat, lon, text=text, command=self._zoom_to_cluster, data=payload,
+                                                    marker_color_circle="#1E5A9B", marker_color_outside="#2D7FC5")
+            self._markers[key] = marker
+
+    def _viewport(self):
+        """Return the zoom level and the tile coordinates of the visible map corners"""
+        zoom = round(self.map_widget.zoom)
+        upper_left = self.map_widget.upper_left_tile_pos
+        lower_right = self.map_widget.lower_right_tile_pos
+        return zoom, upper_left, lower_right
+
+    def _wanted_markers(self):
+        """Return key -> (lat, lon, text, data) of every marker the viewport should show"""
+        if not self.stations:
+            return {}
+        zoom, (left, top), (right, bottom) = self._viewport()
+        x, y = tile_coordinates(self._latitudes, self._longitudes, zoom)
+        visible = np.flatnonzero((x >= left) & (x <= right) & (y >= top) & (y <= bottom))
+        if len(visible) == 0:
+            return {}
+        tiles_per_cell = self.cluster_pixels / self.map_widget.tile_size
+        cell_x = (x[visible] // tiles_per_cell).astype(np.int64)
+        cell_y = (y[visible] // tiles_per_cell).astype(np.int64)
+        cells, cell_of, counts = np.unique(np.stack([cell_x, cell_y], axis=1), axis=0, return_inverse=True,
+                                           return_counts=True)
+        cell_of = cell_of.ravel()
+        order = np.argsort(cell_of, kind='stable')
+        starts = np.concatenate([[0], np.cumsum(counts)])
+        wanted = {}
+        for cell, count in enumerate(counts):
+            members = visible[order[starts[cell]:starts[cell + 1]]]
+            if count == 1:
+                i = members[0]
+                station = self.stations[i]
+                wanted[('station', station.get('id'))] = (float(self._latitudes[i]), float(self._longitudes[i]),
+                                                          station.get('id'), station)
+            else:
+                center = osm_to_decimal(float(x[members].mean()), float(y[members].mean()), zoom)
+                key = ('cluster', zoom, int(cells[cell][0]), int(cells[cell][1]))
+                wanted[key] = (center[0], center[1], f"{count} buoys", (zoom, center))
+        return wanted
+
+    def _zoom_to_cluster(self, marker):
+        """Zoom in on a clicked cluster marker"""
+        zoom, (lat, lon) = marker.data
+        self.map_widget.set_zoom(zoom + CLUSTER_ZOOM_STEP)
+        self.map_widget.set_position(lat, lon)
+        self.schedule_refresh()
+
+    def _delete_markers(self, markers):
+        """Delete markers in one batch; marker.delete() forces a canvas update per marker"""
+        if not markers:
+            return
+        canvas = self.map_widget.canvas
+        removed = set(map(id, markers))
+        self.map_widget.canvas_marker_list = [marker for marker in self.map_widget.canvas_marker_list
+                                              if id(marker) not in removed]
+        for marker in markers:
+            items = [item for item in (marker.polygon, marker.big_circle, marker.canvas_text, marker.canvas_icon,
+                                       marker.canvas_image) if item is not None]
+            if items:
+                canvas.delete(*items)
+            marker.polygon = marker.big_circle = marker.canvas_text = marker.canvas_icon = marker.canvas_image = None
+            marker.deleted = True
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+# Column names NDBC uses for the observation time, mapped to the date part they hold
+DATE_COLUMNS = {'#YY': 'year', 'YY': 'year', 'YYYY': 'year', 'MM': 'month', 'DD': 'day',
+                'hh': 'hour', 'mm': 'minute', 'ss': 'second'}
+MISSING = 'MM'
+# Columns that hold text, like the compass points and steepness class of the .spec wave summary
+TEXT_COLUMNS = ('SwD', 'WWD', 'STEEPNESS')
+
+
+def read_header(file):
+    """Return the column names and the units of an NDBC realtime2 file"""
+    with open(file) as f:
+        return _read_header(f)
+
+
+def _read_header(f):
+    columns = f.readline().split()
+    units = f.readline().lstrip('#').split()
+    return columns, dict(zip(columns, units))
+
+
+def observation_times(data, date_columns):
+    """Return a UTC DatetimeIndex built with array arithmetic from the integer date columns"""
+    parts = {DATE_COLUMNS[column]: data[column].to_numpy(np.int64) for column in date_columns}
+    months = (parts['year'] - 1970) * 12 + parts['month'] - 1
+    times = months.astype('datetime64[M]').astype('datetime64[s]')
+    times = times + ((parts['day'] - 1) * 86400 + parts.get('hour', 0) * 3600 + parts.get('minute', 0) * 60
+                     + parts.get('second', 0)).astype('timedelta64[s]')
+    return pd.DatetimeIndex(times.astype('datetime64[ns]'), name='datetime').tz_localize('UTC')
+
+
+def parse_realtime(file):
+    """Parse an NDBC realtime2 text file into (DataFrame, units)
+
+    file is a path or a text buffer positioned at the header. The units row
+    is skipped, 'MM' is read as missing and every measurement column is
+    float32, indexed by a datetime index built from the date columns. Text
+    columns are categorical. Rows keep NDBC's newest first order.
+    """
+    if hasattr(file, 'readline'):
+        return _parse_realtime(file)
+    with open(file) as f:
+        return _parse_realtime(f)
+
+
+def _parse_realtime(f):
+    columns, units = _read_header(f)
+    date_columns = [column for column in columns if column in DATE_COLUMNS]
+    dtypes = {column: np.int16 if column in date_columns else 'category' if column in TEXT_COLUMNS else np.float32
+              for column in columns}
+    data = pd.read_csv(f, sep=r'\s+', header=None, names=columns, dtype=dtypes, na_values=[MISSING],
+                       keep_default_na=False)
+    data.index = observation_times(data, date_columns)
+    data.drop(columns=date_columns, inplace=True)
+    return data, {column: unit for column, unit in units.items() if column not in DATE_COLUMNS}
+
+
+def first_valid_rows(data):
+    """Return a dict of column name to the position of its newest non-missing row, or None"""
+    if len(data) == 0:
+        return dict.fromkeys(data.columns)
+    valid = data.notna().to_numpy()
+    first = valid.argmax(axis=0)
+    has_value = valid[first, np.arange(valid.shape[1])]
+    return {column: int(row) if found else None for column, row, found in zip(data.columns, first, has_value)}
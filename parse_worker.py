@@ -0,0 +1,121 @@
+import asyncio
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from file_transfer import decompress
+from ndbc_parser import parse_realtime
+from spectral import Spectra, parse_data_spec
+
+# Downloaded file extension to the Station data it holds
+FILE_KINDS = {'.txt': 'weather', '.dart': 'tide', '.spec': 'swell', '.data_spec': 'spectra'}
+
+
+def file_kind(file):
+    """Return 'weather', 'tide', 'swell' or 'spectra' for a downloaded NDBC file, or None if it is not parsed"""
+    return FILE_KINDS.get(os.path.splitext(file)[1])
+
+
+def parse_file(file):
+    """Parse one NDBC realtime2 file into plain arrays, run in a ProcessPoolExecutor worker
+
+    Returns a dict with the file's kind, its observation times as int64
+    nanoseconds, one numpy array per column (categorical columns as a pair of
+    codes and categories) and the column units. Plain arrays pickle as raw
+    buffers, so sending them back is far cheaper than pickling a DataFrame.
+    Spectral files return their times, frequencies, density and separation.
+    """
+    return _parse(file, file)
+
+
+def parse_payload(name, payload, codec):
+    """parse_file for a compressed file received inside a microservice reply
+
+    The payload is decompressed and parsed from memory in the worker, so the
+    GUI process only passes the compressed bytes along.
+    """
+    return _parse(name, io.StringIO(decompress(payload, codec).decode('ascii')))
+
+
+def _parse(name, file):
+    if file_kind(name) == 'spectra':
+        spectra = parse_data_spec(file)
+        return {'kind': 'spectra', 'file': name, 'times': spectra.times.asi8, 'frequencies': spectra.frequencies,
+                'density': spectra.density, 'separation': spectra.separation}
+    data, units = parse_realtime(file)
+    columns = {}
+    for column_name in data.columns:
+        column = data[column_name]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            columns[column_name] = (column.cat.codes.to_numpy(), column.cat.categories.to_numpy(dtype=object))
+        else:
+            columns[column_name] = column.to_numpy()
+    return {'kind': file_kind(name), 'file': name, 'times': data.index.asi8, 'columns': columns, 'units': units}
+
+
+def _times_from_arrays(parsed):
+    return pd.DatetimeIndex(parsed['times'].view('datetime64[ns]'), name='datetime').tz_localize('UTC')
+
+
+def frame_from_arrays(parsed):
+    """Rebuild the DataFrame parse_realtime returned from the arrays of parse_file"""
+    index = _times_from_arrays(parsed)
+    columns = {name: pd.Categorical.from_codes(*column) if isinstance(column, tuple) else column
+               for name, column in parsed['columns'].items()}
+    return pd.DataFrame(columns, index=index, copy=False)
+
+
+def spectra_from_arrays(parsed):
+    """Rebuild the Spectra parse_data_spec returned from the arrays of parse_file"""
+    return Spectra(_times_from_arrays(parsed), parsed['frequencies'], parsed['density'], parsed['separation'])
+
+
+def worker_pool(max_workers=None):
+    """Return a ProcessPoolExecutor for parse_file and parse_payload that never forks the calling process
+
+    Forking a process that already runs Tk, an asyncio loop and pika threads
+    can leave a worker holding a lock no thread will ever release. Workers are
+    started by a forkserver that has imported this module, so they begin with
+    pandas loaded, or spawned where there is no forkserver.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__])
+    else:
+        context = multiprocessing.get_context('spawn')
+    return ProcessPoolExecutor(max_workers, mp_context=context)
+
+
+def _skip_failed(names, results):
+    """Return the results that parsed, printing the files that could not be parsed"""
+    parsed = []
+    for name, result in zip(names, results):
+        if isinstance(result, Exception):
+            print(f"Skipping {os.path.basename(name)}, it could not be parsed: {result!r}")
+        else:
+            parsed.append(result)
+    return parsed
+
+
+async def parse_files(files, executor):
+    """Parse every supported file in parallel on executor, returning the parse_file results
+
+    A file that fails to parse is skipped, so one malformed file does not
+    lose the station's other data.
+    """
+    loop = asyncio.get_running_loop()
+    files = [file for file in files if file_kind(file) is not None]
+    results = await asyncio.gather(*(loop.run_in_executor(executor, parse_file, file) for file in files),
+                                   return_exceptions=True)
+    return _skip_failed(files, results)
+
+
+async def parse_reply(reply, executor):
+    """Parse every supported file carried by a file_transfer Reply in parallel on executor, skipping failures"""
+    loop = asyncio.get_running_loop()
+    names = [name for name in reply.files if file_kind(name) is not None]
+    results = await asyncio.gather(*(loop.run_in_executor(executor, parse_payload, name, reply.files[name],
+                                                          reply.codec) for name in names),
+                                   return_exceptions=True)
+    return _skip_failed(names, results)
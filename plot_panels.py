@@ -0,0 +1,227 @@
+from datetime import timedelta
+import tkinter as tk
+from tkinter import ttk
+import numpy as np
+import matplotlib.dates as mdates
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from decimation import DecimatedSeries
+
+TIDE_PLOT_WINDOW = timedelta(days=2)
+# Newest time ranges the tide panel offers, a realtime2 file holds 45 days
+TIDE_PLOT_RANGES = {'2 days': TIDE_PLOT_WINDOW, '45 days': timedelta(days=45), '1 year': timedelta(days=365)}
+CONDITION_ROWS = ("Air", "Water", "Waves", "Wind")
+LATENCY_COLUMNS = ("Count", "p50 ms", "p95 ms")
+
+
+def conditions_text(conditions):
+    """Return the summary text of each conditions row"""
+    return {"Air": conditions.text('air_temperature'),
+            "Water": conditions.text('water_temperature'),
+            "Waves": f"{conditions.text('wave_height')} @ {conditions.get('swell_period')}"
+                     f" s {conditions.get('swell_direction')} \N{DEGREE SIGN}",
+            "Wind": f"{conditions.text('wind_speed')} {conditions.get('wind_direction')} \N{DEGREE SIGN}"}
+
+
+class TidePlot:
+    """Tide figure with a single line whose data is replaced for each station
+
+    The line is drawn from a DecimatedSeries, so whatever the number of rows it
+    holds about two points per pixel of the visible range, and is re-decimated
+    whenever the x limits change.
+    """
+    def __init__(self, figsize=(4, 4), window=TIDE_PLOT_WINDOW):
+        self.window = window
+        self.series = None
+        self.figure = Figure(figsize=figsize, dpi=100)
+        self.ax = self.figure.add_subplot(111)
+        self.ax.set_title('Tide')
+        self.ax.set_ylabel('Height [m]')
+        self.ax.xaxis_date()
+        self.ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(self.ax.xaxis.get_major_locator()))
+        self.line, = self.ax.plot([], [])
+        self.ax.callbacks.connect('xlim_changed', self._xlim_changed)
+
+    def update_plot(self, tide_data):
+        """Show the newest window of a station's tide data"""
+        self.update_series(tide_data.index.tz_convert(None).to_numpy(), tide_data['HEIGHT'].to_numpy())
+
+    def update_series(self, times, heights):
+        """Show the newest window of datetime64 times and heights, such as SeriesStore views"""
+        times = mdates.date2num(times)
+        if len(times) == 0:
+            self.series = None
+            self.line.set_data([], [])
+            return
+        if times[0] > times[-1]:
+            times, heights = times[::-1], heights[::-1]     # realtime2 frames are newest first
+        self.series = DecimatedSeries(times, heights)
+        self._show_newest()
+
+    def extend_series(self, times, heights):
+        """Add datetime64 times and heights newer than the plotted ones, keeping the newest window in view
+
+        Only the new points are converted and appended to the DecimatedSeries,
+        the older ones are not decimated again.
+        """
+        if self.series is None:
+            self.update_series(times, heights)
+            return
+        times = mdates.date2num(times)
+        if len(times) and times[0] > times[-1]:
+            times, heights = times[::-1], heights[::-1]
+        if self.series.extend(times, heights):
+            self._show_newest()
+
+    def set_window(self, window):
+        """Show the newest window of the plotted data, None for all of it"""
+        self.window = window
+        if self.series is not None:
+            self._show_newest()
+
+    def _show_newest(self):
+        first, newest = self.series.bounds()
+        oldest = first if self.window is None else newest - self.window / timedelta(days=1)
+        self.ax.set_xlim(oldest, newest)
+        shown_times, shown_heights = self.line.get_data()
+        visible = shown_heights[(shown_times >= oldest) & (shown_times <= newest)]
+        visible = visible[~np.isnan(visible)]
+        if len(visible):
+            low, high = float(visible.min()), float(visible.max())
+            margin = (high - low) * 0.05 or 0.5
+            self.ax.set_ylim(low - margin, high + margin)
+
+    def _xlim_changed(self, ax):
+        if self.series is None:
+            return
+        xmin, xmax = ax.get_xlim()
+        self.line.set_data(*self.series.view(xmin, xmax, max(int(ax.bbox.width), 1)))
+
+
+class TidePanel(ttk.Frame):
+    """Tkinter frame holding one TidePlot canvas that is redrawn in place, and a choice of its time range"""
+    def __init__(self, parent, figsize=(4, 4), **kwargs):
+        super().__init__(parent, **kwargs)
+        self.plot = TidePlot(figsize=figsize)
+        self.canvas = FigureCanvasTkAgg(self.plot.figure, master=self)
+        self.canvas.get_tk_widget().pack()
+        self.time_range = tk.StringVar(value=next(iter(TIDE_PLOT_RANGES)))
+        range_box = ttk.Combobox(self, textvariable=self.time_range, values=list(TIDE_PLOT_RANGES),
+                                 state='readonly', width=8)
+        range_box.bind('<<ComboboxSelected>>', self._range_selected)
+        range_box.pack(anchor='e')
+
+    def update_plot(self, tide_data):
+        """Replace the plotted tide data and schedule a redraw"""
+        self.plot.update_plot(tide_data)
+        self.canvas.draw_idle()
+
+    def update_series(self, times, heights):
+        """Replace the plotted tide data with datetime64 times and heights and schedule a redraw"""
+        self.plot.update_series(times, heights)
+        self.canvas.draw_idle()
+
+    def extend_series(self, times, heights):
+        """Add datetime64 times and heights newer than the plotted ones and schedule a redraw"""
+        self.plot.extend_series(times, heights)
+        self.canvas.draw_idle()
+
+    def _range_selected(self, event):
+        self.plot.set_window(TIDE_PLOT_RANGES[self.time_range.get()])
+        self.canvas.draw_idle()
+
+
+class ConditionsPanel(ttk.Frame):
+    """Tkinter frame of condition summary labels that are created once and updated in place"""
+    def __init__(self, parent, title=None, **kwargs):
+        super().__init__(parent, **kwargs)
+        first_row = 0
+        if title is not None:
+            tk.Label(master=self, justify='center', text=title).grid(column=0, row=0)
+            first_row = 1
+        self.value_labels = {}
+        for row, name in enumerate(CONDITION_ROWS, start=first_row):
+            tk.Label(master=self, justify='right', text=name).grid(column=0, row=row, sticky='W')
+            self.value_labels[name] = tk.Label(master=self, justify='right')
+            self.value_labels[name].grid(column=1, row=row, sticky='W')
+
+    def update_conditions(self, conditions):
+        """Show a Conditions snapshot, only touching labels whose text changed"""
+        for name, text in conditions_text(conditions).items():
+            label = self.value_labels[name]
+            if label.cget('text') != text:
+                label.configure(text=text)
+
+
+class ComparisonTable(ttk.Frame):
+    """Treeview comparing the current conditions of several buoys, one row per buoy"""
+    def __init__(self, parent, command=None, height=8, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.command = command
+        self.tree = ttk.Treeview(self, columns=CONDITION_ROWS + ("Observed",), height=height)
+        self.tree.heading('#0', text="Buoy")
+        self.tree.column('#0', width=80, stretch=False)
+        for name in CONDITION_ROWS + ("Observed",):
+            self.tree.heading(name, text=name)
+            self.tree.column(name, width=130)
+        scrollbar = ttk.Scrollbar(self, orient='vertical', command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.grid(column=0, row=0, sticky='NSEW')
+        scrollbar.grid(column=1, row=0, sticky='NS')
+        self.tree.bind('<Double-1>', self._row_activated)
+
+    def set_buoys(self, buoy_ids):
+        """Replace the rows with placeholder rows for buoy_ids"""
+        self.tree.delete(*self.tree.get_children())
+        for buoy_id in buoy_ids:
+            self.tree.insert('', 'end', iid=buoy_id, text=buoy_id, values=("...",) * len(CONDITION_ROWS))
+
+    def buoy_ids(self):
+        """Return the ids of the listed buoys"""
+        return self.tree.get_children()
+
+    def update_station(self, buoy_id, station):
+        """Fill a buoy's row from a parsed Station, ignoring buoys that are no longer listed"""
+        if not self.tree.exists(buoy_id):
+            return
+        conditions = None if station is None else station.conditions
+        if conditions is None:
+            self.tree.item(buoy_id, values=("No data",))
+            return
+        texts = conditions_text(conditions)
+        observed = max(conditions.observed_at.values(), default=None)
+        observed = "N/A" if observed is None else observed.strftime('%Y-%m-%d %H:%M UTC')
+        self.tree.item(buoy_id, values=[texts[name] for name in CONDITION_ROWS] + [observed])
+
+    def mark_failed(self, buoy_id, error):
+        """Show that fetching a buoy failed"""
+        if self.tree.exists(buoy_id):
+            self.tree.item(buoy_id, values=("Request failed",))
+        print(f"Request for {buoy_id} failed: {error}")
+
+    def _row_activated(self, event):
+        buoy_id = self.tree.identify_row(event.y)
+        if buoy_id and self.command is not None:
+            self.command(buoy_id)
+
+
+class LatencyPanel(ttk.Frame):
+    """Treeview of the p50 and p95 latency of each traced step, one row per step"""
+    def __init__(self, parent, height=8, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.tree = ttk.Treeview(self, columns=LATENCY_COLUMNS, height=height)
+        self.tree.heading('#0', text="Step")
+        self.tree.column('#0', width=100, stretch=False)
+        for name in LATENCY_COLUMNS:
+            self.tree.heading(name, text=name)
+            self.tree.column(name, width=80, anchor='e')
+        self.tree.grid(column=0, row=0, sticky='NSEW')
+
+    def update_latencies(self, latencies):
+        """Show a Tracer.latencies() summary, adding rows for steps seen for the first time"""
+        for name, (count, p50, p95) in sorted(latencies.items()):
+            values = (count, f"{p50:.1f}", f"{p95:.1f}")
+            if self.tree.exists(name):
+                self.tree.item(name, values=values)
+            else:
+                self.tree.insert('', 'end', iid=name, text=name, values=values)
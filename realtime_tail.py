@@ -0,0 +1,42 @@
+import io
+import requests
+from ndbc_parser import parse_realtime
+
+REALTIME_URL = 'https://www.ndbc.noaa.gov/data/realtime2/{buoy_id}{suffix}'
+# Station data refreshed by tailing, and the realtime2 file it comes from
+TAIL_SUFFIXES = {'weather': '.txt', 'tide': '.dart', 'swell': '.spec'}
+
+
+class RealtimeTail:
+    """Fetches only the observations of a realtime2 file newer than a given time
+
+    realtime2 files list the newest rows first, so new rows are at the start of
+    the file. A Range request reads the first chunk_size bytes; if every row in
+    it is newer than the last known one, the range grows until it reaches a
+    known row or the end of the file. A refresh therefore downloads and parses
+    about as many bytes as the new rows take.
+    """
+    def __init__(self, base_url=REALTIME_URL, session=None, chunk_size=8192, timeout=30):
+        self.base_url = base_url
+        self.session = session if session is not None else requests.Session()
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.bytes_received = 0
+
+    def fetch_new(self, buoy_id, kind, since):
+        """Return (rows newer than since, units) of a buoy's realtime2 file, newest first"""
+        url = self.base_url.format(buoy_id=buoy_id, suffix=TAIL_SUFFIXES[kind])
+        size = self.chunk_size
+        while True:
+            response = self.session.get(url, headers={'Range': f'bytes=0-{size - 1}'}, timeout=self.timeout)
+            response.raise_for_status()
+            self.bytes_received += len(response.content)
+            text = response.text
+            # 200 means the server sent the whole file, 206 a partial one that may end mid row
+            complete = response.status_code != 206 or len(response.content) < size
+            if not complete:
+                text = text[:text.rfind('\n') + 1]
+            data, units = parse_realtime(io.StringIO(text))
+            if complete or (len(data) and data.index[-1] <= since):
+                return data[data.index > since], units
+            size *= 4
@@ -0,0 +1,123 @@
+import os
+from threading import Lock
+import numpy as np
+
+# Kind of station data and the columns of it kept as series
+SERIES_COLUMNS = {'weather': ('WVHT', 'DPD', 'MWD', 'WSPD', 'WDIR', 'ATMP', 'WTMP'),
+                  'tide': ('HEIGHT',)}
+# Station attribute holding each kind of data
+SERIES_FRAMES = {'weather': 'weather_data', 'tide': 'tide_data'}
+TIME_DTYPE = np.dtype('datetime64[s]')
+VALUE_DTYPE = np.dtype(np.float32)
+
+
+class Series:
+    """Memory-mapped observations of one variable of one buoy, oldest first
+
+    times and values are read-only np.memmap arrays, so slicing them returns
+    views whose pages are only read from disk when they are touched.
+    """
+    def __init__(self, times, values):
+        self.times = times
+        self.values = values
+
+    def __len__(self):
+        return len(self.times)
+
+    def between(self, start=None, end=None):
+        """Return (times, values) views of the observations with start <= time <= end"""
+        first = 0 if start is None else int(np.searchsorted(self.times, np.datetime64(start, 's'), side='left'))
+        last = len(self.times) if end is None else int(np.searchsorted(self.times, np.datetime64(end, 's'),
+                                                                       side='right'))
+        return self.times[first:last], self.values[first:last]
+
+    def last_time(self):
+        """Return the newest observation time, or None if the series is empty"""
+        return self.times[-1] if len(self.times) else None
+
+
+def _memmap(path, dtype):
+    size = os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0
+    if size == 0:
+        return np.empty(0, dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(size,))
+
+
+class SeriesStore:
+    """Append-only store of fixed dtype series, two flat files per buoy and variable
+
+    root/<buoy id>/<variable>.times holds datetime64[s] observation times and
+    <variable>.values the float32 readings, both oldest first. Opening a series
+    maps the files without reading them. Appends add only the readings newer
+    than the last stored one, skipping missing values.
+    """
+    def __init__(self, root='series'):
+        self.root = root
+        self._lock = Lock()
+
+    def _paths(self, buoy_id, variable):
+        base = os.path.join(self.root, str(buoy_id), variable)
+        return base + '.times', base + '.values'
+
+    def variables(self, buoy_id):
+        """Return the names of the variables stored for a buoy"""
+        try:
+            names = os.listdir(os.path.join(self.root, str(buoy_id)))
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-len('.times')] for name in names if name.endswith('.times'))
+
+    def open(self, buoy_id, variable):
+        """Map a stored series; reopen it after appending to see the new readings"""
+        times_path, values_path = self._paths(buoy_id, variable)
+        times = _memmap(times_path, TIME_DTYPE)
+        values = _memmap(values_path, VALUE_DTYPE)
+        # values are written before times, so a torn append leaves extra values that are ignored
+        length = min(len(times), len(values))
+        return Series(times[:length], values[:length])
+
+    def append(self, buoy_id, variable, times, values):
+        """Store the readings newer than the last stored one, returning how many were added"""
+        times = np.asarray(times).astype(TIME_DTYPE)
+        values = np.asarray(values, dtype=VALUE_DTYPE)
+        order = np.argsort(times, kind='stable')
+        times, values = times[order], values[order]
+        keep = ~np.isnan(values)
+        with self._lock:
+            series = self.open(buoy_id, variable)
+            last = series.last_time()
+            if last is not None:
+                keep &= times > last
+            times, values = times[keep], values[keep]
+            if len(times) == 0:
+                return 0
+            times_path, values_path = self._paths(buoy_id, variable)
+            os.makedirs(os.path.dirname(times_path), exist_ok=True)
+            self._truncate(times_path, values_path, len(series))
+            with open(values_path, 'ab') as file:
+                file.write(values.tobytes())
+            with open(times_path, 'ab') as file:
+                file.write(times.tobytes())
+            return len(times)
+
+    def append_frame(self, buoy_id, kind, data):
+        """Store the new readings of the series columns of one kind of data, returning counts per variable"""
+        times = data.index.tz_convert(None).to_numpy()
+        return {column: self.append(buoy_id, column, times, data[column].to_numpy())
+                for column in SERIES_COLUMNS.get(kind, ()) if column in data.columns}
+
+    def append_station(self, buoy_id, station):
+        """Store the new readings of every series column a Station holds, returning counts per variable"""
+        added = {}
+        for kind, attribute in SERIES_FRAMES.items():
+            data = getattr(station, attribute, None)
+            if data is not None:
+                added.update(self.append_frame(buoy_id, kind, data))
+        return added
+
+    @staticmethod
+    def _truncate(times_path, values_path, length):
+        """Drop readings beyond length left behind by an interrupted append"""
+        for path, dtype in ((times_path, TIME_DTYPE), (values_path, VALUE_DTYPE)):
+            if os.path.exists(path) and os.path.getsize(path) != length * dtype.itemsize:
+                os.truncate(path, length * dtype.itemsize)
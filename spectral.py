@@ -0,0 +1,136 @@
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+from ndbc_parser import observation_times
+
+SPEC_DATE_COLUMNS = ('YY', 'MM', 'DD', 'hh', 'mm')
+MISSING_SEPARATION = 9.999
+MISSING_DENSITY = 999.0
+# Token NDBC writes for a value that was not reported, alongside the 9.999 / 999.00 sentinels
+MISSING_TOKEN = 'MM'
+# Swell / wind sea split used when a row has no separation frequency, 10 seconds
+DEFAULT_SEPARATION = 0.1
+# Period band edges in seconds for band_energy, longest first
+PERIOD_BANDS = (22, 16, 12, 8)
+
+
+def frequency_bandwidths(frequencies):
+    """Return the width in Hz of each frequency bin, split halfway between the bin centres"""
+    edges = np.empty(len(frequencies) + 1)
+    edges[1:-1] = (frequencies[1:] + frequencies[:-1]) / 2
+    edges[0] = frequencies[0] - (edges[1] - frequencies[0])
+    edges[-1] = frequencies[-1] + (frequencies[-1] - edges[-2])
+    return np.diff(edges)
+
+
+def _interpolation_matrix(source, target):
+    """Return W so that values @ W.T maps densities at source frequencies onto target frequencies"""
+    return np.stack([np.interp(target, source, unit, left=0.0, right=0.0) for unit in np.eye(len(source))], axis=1)
+
+
+class Spectra:
+    """Spectral wave energy density of a station, one row per observation time
+
+    density is a (time x frequency) float32 array in m^2/Hz with NaN for missing
+    rows, frequencies the bin centres in Hz and separation the swell / wind sea
+    separation frequency NDBC reported for each row (NaN if it did not).
+    """
+    def __init__(self, times, frequencies, density, separation):
+        self.times = times
+        self.frequencies = frequencies
+        self.density = density
+        self.separation = separation
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def nbytes(self):
+        return self.density.nbytes + self.frequencies.nbytes + self.separation.nbytes + self.times.nbytes
+
+    def partitions(self):
+        """Return the swell, wind sea and total wave height and peak period of every row
+
+        Columns use the names of NDBC's .spec summary: SwH, SwP, WWH, WWP, WVHT
+        and DPD, heights in metres and periods in seconds. Wave heights are the
+        spectral significant height 4 * sqrt(m0) of each partition, where the
+        spectrum is split at the row's separation frequency.
+        """
+        energy = self.density * frequency_bandwidths(self.frequencies)
+        separation = np.where(np.isnan(self.separation), DEFAULT_SEPARATION, self.separation)
+        swell = self.frequencies < separation[:, np.newaxis]
+        columns = {}
+        for height, period, mask in (('SwH', 'SwP', swell), ('WWH', 'WWP', ~swell), ('WVHT', 'DPD', None)):
+            part_energy = energy if mask is None else np.where(mask, energy, 0.0)
+            part_density = self.density if mask is None else np.where(mask, self.density, -np.inf)
+            m0 = part_energy.sum(axis=1)
+            peak = 1 / self.frequencies[np.argmax(np.nan_to_num(part_density, nan=-np.inf), axis=1)]
+            columns[height] = (4 * np.sqrt(m0)).astype(np.float32)
+            columns[period] = np.where(m0 > 0, peak, np.nan).astype(np.float32)
+        columns['SepF'] = separation.astype(np.float32)
+        return pd.DataFrame(columns, index=self.times)
+
+    def band_energy(self, period_edges=PERIOD_BANDS):
+        """Return the wave energy m0 in m^2 of each period band, longest periods first"""
+        edges = np.concatenate([[0.0], 1 / np.asarray(period_edges, dtype=np.float64), [np.inf]])
+        names = [f">{period_edges[0]} s"]
+        names += [f"{short}-{long} s" for long, short in zip(period_edges, period_edges[1:])]
+        names += [f"<{period_edges[-1]} s"]
+        bands = np.searchsorted(edges, self.frequencies, side='right') - 1
+        membership = np.zeros((len(self.frequencies), len(names)))
+        membership[np.arange(len(self.frequencies)), bands] = 1.0
+        energy = (self.density * frequency_bandwidths(self.frequencies)) @ membership
+        return pd.DataFrame(energy.astype(np.float32), index=self.times, columns=names)
+
+
+def parse_data_spec(file):
+    """Parse an NDBC realtime2 .data_spec file of spectral energy density into Spectra
+
+    Each row holds the date, the separation frequency and then pairs of
+    "density (frequency)". Rows with the same frequency bins are converted to
+    numbers in one pass; rows whose bins differ from the newest row's are
+    interpolated onto the newest bins. Rows keep NDBC's newest first order.
+    Missing values, 'MM' or the 9.999 / 999.00 sentinels, are NaN. file is a
+    path or a text buffer.
+    """
+    if hasattr(file, 'readline'):
+        lines = [line for line in file if not line.startswith('#') and line.strip()]
+    else:
+        with open(file) as f:
+            lines = [line for line in f if not line.startswith('#') and line.strip()]
+    if not lines:
+        empty = pd.DatetimeIndex([], dtype='datetime64[ns, UTC]', name='datetime')
+        return Spectra(empty, np.empty(0), np.empty((0, 0), np.float32), np.empty(0, np.float32))
+    by_bins = defaultdict(list)
+    for row, line in enumerate(lines):
+        by_bins[line.count('(')].append(row)
+    brackets = str.maketrans('()', '  ')
+    frequencies = None
+    dates = np.empty((len(lines), len(SPEC_DATE_COLUMNS)), np.int64)
+    separation = np.empty(len(lines))
+    blocks = []
+    for bins, rows in by_bins.items():
+        text = ''.join(lines[row] for row in rows).translate(brackets).replace(MISSING_TOKEN, 'nan')
+        values = np.fromstring(text, sep=' ').reshape(len(rows), 6 + 2 * bins)
+        dates[rows] = values[:, :5]
+        separation[rows] = values[:, 5]
+        block_frequencies = values[:, 7::2]
+        # Normally every row shares its bins, only sort out the groups when they do not
+        if (block_frequencies == block_frequencies[0]).all():
+            unique, which = block_frequencies[:1], np.zeros(len(rows), np.intp)
+        else:
+            unique, which = np.unique(block_frequencies, axis=0, return_inverse=True)
+        for group, group_frequencies in enumerate(unique):
+            members = np.flatnonzero(which.ravel() == group)
+            blocks.append((np.asarray(rows)[members], group_frequencies, values[members, 6::2]))
+            if 0 in blocks[-1][0]:
+                frequencies = group_frequencies
+    density = np.empty((len(lines), len(frequencies)), np.float32)
+    for rows, block_frequencies, block_density in blocks:
+        block_density[block_density >= MISSING_DENSITY] = np.nan
+        if not np.array_equal(block_frequencies, frequencies):
+            block_density = block_density @ _interpolation_matrix(block_frequencies, frequencies).T
+        density[rows] = block_density
+    separation[separation >= MISSING_SEPARATION] = np.nan
+    times = observation_times(pd.DataFrame(dates, columns=SPEC_DATE_COLUMNS), SPEC_DATE_COLUMNS)
+    return Spectra(times, frequencies, density, separation.astype(np.float32))
@@ -0,0 +1,144 @@
+"""Local stand-in for the NOAA microservice, serving buoy files from a fixture directory
+
+Consumes buoy ids from the To_Microservice queue like the real microservice and
+answers with the fixture files named after the buoy, e.g. fixtures/46026.txt,
+46026.dart, 46026.spec and 46026.data_spec. Requests accepting file_transfer
+replies get the files compressed inside the message; others get the old
+comma separated list of paths on To_Main_Program. Nothing is downloaded, so the
+dashboard can be run and profiled without network access.
+
+Usage: python stand_in_service.py --fixtures fixtures [--host localhost] [--codec gzip] [--delay 0.5]
+"""
+import argparse
+import functools
+import os
+import time
+from concurrent.futures import Future
+from threading import Event, Timer
+import pika
+from buoy_rpc import LEGACY_REPLY_QUEUE, REQUEST_QUEUE
+from file_transfer import CONTENT_TYPE, LEGACY_NO_FILES, STATUS_ERROR, STATUS_NO_FILES, encode_files, encode_status
+from parse_worker import FILE_KINDS
+
+
+class StandInService:
+    """Answers buoy data requests with fixture files
+
+    delay seconds are slept before each reply to stand in for the download time.
+    connection_factory returns a pika style blocking connection, by default one
+    to the RabbitMQ server on host.
+    """
+    def __init__(self, fixtures='fixtures', host='localhost', connection_factory=None, codec=None, delay=0.0,
+                 poll_interval=0.25):
+        if connection_factory is None:
+            connection_factory = functools.partial(pika.BlockingConnection, pika.ConnectionParameters(host=host))
+        self.fixtures = fixtures
+        self.connection_factory = connection_factory
+        self.codec = codec
+        self.delay = delay
+        self.poll_interval = poll_interval
+        self.requests_served = 0
+        self._stop = Event()
+
+    def fixture_paths(self, buoy_id):
+        """Return the paths of the fixture files for a buoy"""
+        paths = []
+        for extension in FILE_KINDS:
+            path = os.path.join(self.fixtures, f"{buoy_id}{extension}")
+            if os.path.exists(path):
+                paths.append(os.path.abspath(path))
+        return paths
+
+    def reply_body(self, buoy_id, accept=None):
+        """Return the reply to a request for buoy_id, in the format the request accepts"""
+        paths = self.fixture_paths(buoy_id)
+        if accept != CONTENT_TYPE:
+            return (', '.join(paths) if paths else LEGACY_NO_FILES).encode('utf-8')
+        if not paths:
+            return encode_status(buoy_id, STATUS_NO_FILES)
+        try:
+            files = {}
+            for path in paths:
+                with open(path, 'rb') as file:
+                    files[os.path.basename(path)] = file.read()
+        except OSError as error:
+            return encode_status(buoy_id, STATUS_ERROR, str(error))
+        return encode_files(buoy_id, files, self.codec)
+
+    def on_request(self, channel, method, properties, body):
+        buoy_id = body.decode('utf-8')
+        print(f"Request for {buoy_id}")
+        if self.delay:
+            time.sleep(self.delay)
+        headers = (properties.headers if properties is not None else None) or {}
+        reply = self.reply_body(buoy_id, headers.get('accept'))
+        reply_to = properties.reply_to if properties is not None else None
+        if reply_to:
+            channel.basic_publish(exchange='', routing_key=reply_to, body=reply,
+                                  properties=pika.BasicProperties(correlation_id=properties.correlation_id))
+        else:
+            channel.basic_publish(exchange='', routing_key=LEGACY_REPLY_QUEUE, body=reply)
+        self.requests_served += 1
+
+    def serve_forever(self):
+        """Answer requests until stop() is called"""
+        connection = self.connection_factory()
+        try:
+            channel = connection.channel()
+            channel.queue_declare(queue=REQUEST_QUEUE)
+            channel.queue_declare(queue=LEGACY_REPLY_QUEUE)
+            channel.basic_consume(queue=REQUEST_QUEUE, auto_ack=True, on_message_callback=self.on_request)
+            print(f"Serving {self.fixtures} on {REQUEST_QUEUE}")
+            while not self._stop.is_set():
+                connection.process_data_events(time_limit=self.poll_interval)
+        finally:
+            connection.close()
+
+    def stop(self):
+        self._stop.set()
+
+
+class StandInClient:
+    """BuoyRpcClient replacement answering from a StandInService in process, without a broker
+
+    Replies are the ones a request accepting file_transfer replies would get,
+    resolved after the service's delay.
+    """
+    def __init__(self, service):
+        self.service = service
+        self.requests_sent = 0
+
+    def request(self, buoy_id, timeout=None):
+        """Return a Future of the reply body for buoy_id"""
+        self.requests_sent += 1
+        future = Future()
+
+        def reply():
+            try:
+                future.set_result(self.service.reply_body(buoy_id, CONTENT_TYPE))
+            except Exception as error:
+                future.set_exception(error)
+        if self.service.delay:
+            Timer(self.service.delay, reply).start()
+        else:
+            reply()
+        return future
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fixtures', default='fixtures', help="directory holding <buoy id>.<extension> files")
+    parser.add_argument('--host', default='localhost', help="RabbitMQ host")
+    parser.add_argument('--codec', choices=('zstd', 'gzip', 'none'), default=None,
+                        help="reply compression, zstd when installed and gzip otherwise")
+    parser.add_argument('--delay', type=float, default=0.0, help="seconds to wait before each reply")
+    args = parser.parse_args()
+    service = StandInService(args.fixtures, args.host, codec=args.codec, delay=args.delay)
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        service.stop()
+
+
+if __name__ == '__main__':
+    main()
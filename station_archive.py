@@ -0,0 +1,133 @@
+import json
+import os
+from threading import Lock
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Station attribute archived for each kind of data
+ARCHIVED_FRAMES = {'weather': 'weather_data', 'tide': 'tide_data', 'swell': 'swell_data'}
+TIME_COLUMN = 'datetime'
+# Parquet schema metadata key holding the column units
+UNITS_KEY = b'ndbc_units'
+
+
+class StationArchive:
+    """Parquet archive of buoy observations, one file per buoy, kind of data and month
+
+    Files live at root/<buoy id>/<kind>/<YYYY-MM>.parquet. Appending only adds
+    rows newer than the newest stored observation, which is remembered after
+    the first append, and rewrites just the months those rows fall in. Reads
+    pick the month files overlapping the requested time range, then let Arrow
+    skip row groups outside it and read only the requested columns.
+    """
+    def __init__(self, root='archive', row_group_size=4096):
+        self.root = root
+        self.row_group_size = row_group_size
+        self._newest = {}
+        self._lock = Lock()
+
+    def _directory(self, buoy_id, kind):
+        return os.path.join(self.root, str(buoy_id), kind)
+
+    def months(self, buoy_id, kind):
+        """Return the archived months of a buoy's data, oldest first, as 'YYYY-MM' strings"""
+        try:
+            names = os.listdir(self._directory(buoy_id, kind))
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-len('.parquet')] for name in names if name.endswith('.parquet'))
+
+    def last_timestamp(self, buoy_id, kind):
+        """Return the newest archived observation time, or None if nothing is archived"""
+        months = self.months(buoy_id, kind)
+        if not months:
+            return None
+        path = os.path.join(self._directory(buoy_id, kind), months[-1] + '.parquet')
+        times = pq.read_table(path, columns=[TIME_COLUMN]).column(TIME_COLUMN)
+        return pd.Timestamp(pc.max(times).as_py())
+
+    def units(self, buoy_id, kind):
+        """Return the column units stored with a buoy's newest archived month"""
+        months = self.months(buoy_id, kind)
+        if not months:
+            return {}
+        metadata = pq.read_schema(os.path.join(self._directory(buoy_id, kind), months[-1] + '.parquet')).metadata
+        return json.loads(metadata.get(UNITS_KEY, b'{}'))
+
+    def append(self, buoy_id, kind, data, units=None):
+        """Archive the rows of data newer than the newest stored one, returning how many were added"""
+        with self._lock:
+            key = (str(buoy_id), kind)
+            if key not in self._newest:
+                self._newest[key] = self.last_timestamp(buoy_id, kind)
+            last = self._newest[key]
+            if last is not None:
+                data = data[data.index > last]
+            if len(data) == 0:
+                return 0
+            data = data.sort_index()
+            directory = self._directory(buoy_id, kind)
+            os.makedirs(directory, exist_ok=True)
+            months = data.index.tz_convert(None).strftime('%Y-%m')
+            for month in np.unique(months):
+                rows = data[months == month]
+                path = os.path.join(directory, month + '.parquet')
+                table = pa.Table.from_pandas(rows.rename_axis(TIME_COLUMN).reset_index(), preserve_index=False)
+                if os.path.exists(path):
+                    table = pa.concat_tables([pq.read_table(path), table.cast(pq.read_schema(path))])
+                if units is not None:
+                    table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                                           UNITS_KEY: json.dumps(units).encode()})
+                temporary = path + '.tmp'
+                pq.write_table(table, temporary, row_group_size=self.row_group_size)
+                os.replace(temporary, path)
+            self._newest[key] = data.index[-1]
+            return len(data)
+
+    def append_station(self, buoy_id, station):
+        """Archive the new rows of every frame a Station holds, returning rows added per kind"""
+        added = {}
+        for kind, attribute in ARCHIVED_FRAMES.items():
+            data = getattr(station, attribute, None)
+            if data is not None:
+                units = station.weather_units if kind == 'weather' else None
+                added[kind] = self.append(buoy_id, kind, data, units)
+        return added
+
+    def read(self, buoy_id, kind, start=None, end=None, columns=None):
+        """Return the archived rows with start <= time <= end, oldest first, limited to columns
+
+        start and end are anything pandas.Timestamp accepts, naive times are UTC.
+        Columns the archived files do not have are left out.
+        """
+        start = None if start is None else _utc(start)
+        end = None if end is None else _utc(end)
+        months = self.months(buoy_id, kind)
+        if start is not None:
+            months = [month for month in months if month >= start.strftime('%Y-%m')]
+        if end is not None:
+            months = [month for month in months if month <= end.strftime('%Y-%m')]
+        if not months:
+            return pd.DataFrame(columns=columns or [], index=pd.DatetimeIndex([], tz='UTC', name=TIME_COLUMN))
+        directory = self._directory(buoy_id, kind)
+        dataset = ds.dataset([os.path.join(directory, month + '.parquet') for month in months], format='parquet')
+        if columns is not None:
+            # A buoy's files need not report every column asked for
+            columns = [column for column in columns if column in dataset.schema.names]
+        condition = None
+        if start is not None:
+            condition = ds.field(TIME_COLUMN) >= start
+        if end is not None:
+            upper = ds.field(TIME_COLUMN) <= end
+            condition = upper if condition is None else condition & upper
+        table = dataset.to_table(columns=None if columns is None else [TIME_COLUMN, *columns], filter=condition)
+        return table.to_pandas().set_index(TIME_COLUMN)
+
+
+def _utc(time):
+    time = pd.Timestamp(time)
+    return time.tz_localize('UTC') if time.tzinfo is None else time.tz_convert('UTC')
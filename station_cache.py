@@ -0,0 +1,104 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+# NDBC publishes realtime2 observations once an hour, some minutes after they are taken
+UPDATE_INTERVAL = 60 * 60
+PUBLISH_DELAY = 25 * 60
+MIN_TTL = 5 * 60
+
+
+def station_size(station):
+    """Return the approximate number of bytes held by a Station's data frames and spectra"""
+    return station.nbytes
+
+
+def newest_observation(station):
+    """Return the POSIX time of the newest weather or tide observation in a Station, or None"""
+    times = [newest for newest in (station.newest_time('weather'), station.newest_time('tide')) if newest is not None]
+    if not times:
+        return None
+    return max(times).timestamp()
+
+
+class StationCache:
+    """LRU cache of parsed Station objects keyed by buoy id
+
+    Entries are evicted least recently used first once either max_entries or
+    max_bytes is exceeded. An entry is fresh until the next realtime2 update is
+    expected, an update interval plus publishing delay after its newest
+    observation, bounded by MIN_TTL and ttl after it was fetched. Stale entries
+    are still returned so the caller can show them while it revalidates.
+    """
+    def __init__(self, max_entries=32, max_bytes=256 * 1024 * 1024, ttl=UPDATE_INTERVAL, revalidate=True,
+                 clock=time.time):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.revalidate = revalidate
+        self.clock = clock
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, buoy_id):
+        return buoy_id in self._entries
+
+    def get(self, buoy_id):
+        """Return (station, fresh) for a buoy id, or (None, False) on a miss"""
+        with self._lock:
+            entry = self._entries.get(buoy_id)
+            if entry is None:
+                self.misses += 1
+                return None, False
+            self._entries.move_to_end(buoy_id)
+            station, expires_at, _ = entry
+            fresh = self.clock() < expires_at
+            if fresh:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+            return station, fresh
+
+    def put(self, buoy_id, station):
+        """Store a freshly fetched Station, evicting old entries to stay within budget"""
+        size = station_size(station)
+        now = self.clock()
+        expires_at = now + self.ttl
+        observed = newest_observation(station)
+        if observed is not None:
+            expires_at = min(expires_at, max(now + MIN_TTL, observed + UPDATE_INTERVAL + PUBLISH_DELAY))
+        with self._lock:
+            previous = self._entries.pop(buoy_id, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[buoy_id] = (station, expires_at, size)
+            self._bytes += size
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, buoy_id=None):
+        """Drop one buoy, or every buoy if no id is given"""
+        with self._lock:
+            if buoy_id is None:
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                entry = self._entries.pop(buoy_id, None)
+                if entry is not None:
+                    self._bytes -= entry[2]
+
+    def stats(self):
+        """Return the cache counters and current size"""
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'hits': self.hits,
+                    'stale_hits': self.stale_hits, 'misses': self.misses, 'evictions': self.evictions}
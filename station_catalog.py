@@ -0,0 +1,148 @@
+import json
+import os
+import time
+import xml.etree.ElementTree as eT
+import zipfile
+from threading import Lock
+import requests
+from station_index import StationIndex
+from station_table import StationTable, load_station_table
+
+STATION_LIST_URL = "http://www.ndbc.noaa.gov/activestations.xml"
+
+
+def parse_xml(xml_file):
+    """Parse input xml file"""
+    tree = eT.parse(xml_file)
+    root = tree.getroot()
+    station_list = []
+    for child in root:
+        station = child.attrib
+        station_list.append(station)
+    return station_list
+
+
+class StationCatalog:
+    """Cached copy of the NOAA active station list shared by every buoy search
+
+    The xml is kept on disk next to a small metadata file holding the ETag and
+    Last-Modified headers of the last response. Within the TTL the parsed copy
+    in memory is returned as is; once it expires the server is asked for the
+    file with a conditional GET and a 304 only refreshes the timestamps. Each
+    downloaded file is parsed once and its columns saved to an .npz file, which
+    later loads read instead of parsing the xml again.
+    """
+    def __init__(self, url=STATION_LIST_URL, cache_path='activestations.xml', ttl=24 * 60 * 60,
+                 session=None, timeout=30):
+        self.url = url
+        self.cache_path = cache_path
+        self.meta_path = os.path.splitext(cache_path)[0] + '.meta.json'
+        self.columns_path = os.path.splitext(cache_path)[0] + '.npz'
+        self.ttl = ttl
+        self.timeout = timeout
+        self.session = session if session is not None else requests.Session()
+        self._stations = None
+        self._index = None
+        self._checked_at = None
+        self._lock = Lock()
+
+    def stations(self):
+        """Return the StationTable of active stations, revalidating it if the TTL has expired"""
+        with self._lock:
+            if self._stations is not None and not self._expired(self._checked_at):
+                return self._stations
+            meta = self._read_meta()
+            if self._stations is None and os.path.exists(self.cache_path) \
+                    and not self._expired(meta.get('checked_at')):
+                # Disk copy is still fresh, e.g. after a restart
+                self._load_from_disk(meta.get('checked_at'))
+                return self._stations
+            try:
+                self._revalidate(meta)
+            except requests.RequestException as error:
+                if not os.path.exists(self.cache_path):
+                    raise
+                # Serve the stale copy rather than failing the search
+                print(f"Station list refresh failed, using cached copy: {error}")
+                if self._stations is None:
+                    self._load_from_disk(time.time())
+                self._checked_at = time.time()
+            return self._stations
+
+    def index(self):
+        """Return a spatial index over the current station list, built once per download"""
+        stations = self.stations()
+        index = self._index
+        if index is None or index.stations is not stations:
+            index = self._index = StationIndex.from_table(stations)
+        return index
+
+    def invalidate(self):
+        """Forget the in-memory copy so the next call revalidates with the server"""
+        with self._lock:
+            self._stations = None
+            self._checked_at = None
+
+    def _expired(self, checked_at):
+        return checked_at is None or time.time() - checked_at >= self.ttl
+
+    def _revalidate(self, meta):
+        headers = {}
+        if os.path.exists(self.cache_path):
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        response = self.session.get(self.url, headers=headers, timeout=self.timeout)
+        now = time.time()
+        if response.status_code == 304:
+            meta['checked_at'] = now
+            self._write_meta(meta)
+            if self._stations is None:
+                self._load_from_disk(now)
+            self._checked_at = now
+            return
+        response.raise_for_status()
+        tmp_path = self.cache_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(response.content)
+        os.replace(tmp_path, self.cache_path)
+        self._write_meta({'etag': response.headers.get('ETag'),
+                          'last_modified': response.headers.get('Last-Modified'),
+                          'checked_at': now})
+        self._load_from_disk(now)
+
+    def _load_from_disk(self, checked_at):
+        stat = os.stat(self.cache_path)
+        # Columns saved from this exact file, matched by modification time and size
+        source = (stat.st_mtime_ns, stat.st_size)
+        self._stations = self._read_columns(source)
+        if self._stations is None:
+            self._stations = load_station_table(self.cache_path)
+            self._write_columns(self._stations, source)
+        self._checked_at = checked_at
+
+    def _read_columns(self, source):
+        try:
+            return StationTable.load(self.columns_path, source)
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            return None
+
+    def _write_columns(self, stations, source):
+        tmp_path = self.columns_path + '.tmp'
+        try:
+            stations.save(tmp_path, source)
+            os.replace(tmp_path, self.columns_path)
+        except OSError as error:
+            print(f"Could not save the station columns: {error}")
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self, meta):
+        with open(self.meta_path, 'w') as f:
+            json.dump(meta, f)
@@ -0,0 +1,254 @@
+import asyncio
+from functools import cached_property
+from threading import Lock
+from file_transfer import STATUS_ERROR, STATUS_NO_FILES, decode_reply
+from lazy_import import lazy_import
+
+# Imported on first use, so importing the dashboard stays fast
+pd = lazy_import('pandas')
+conditions = lazy_import('conditions')
+ndbc_parser = lazy_import('ndbc_parser')
+parse_worker = lazy_import('parse_worker')
+spectral = lazy_import('spectral')
+station_archive = lazy_import('station_archive')
+
+
+def _chunked_frame(kind):
+    """Station data frame attribute kept as newest first chunks, joined into one frame when it is read
+
+    Merging new observations only puts a chunk in front, so the copy pd.concat
+    makes is paid by the next reader of the frame, not by every refresh.
+    """
+    def read(station):
+        with station._lock:
+            chunks = station._chunks[kind]
+            if len(chunks) > 1:
+                chunks = station._chunks[kind] = [pd.concat(chunks)]
+        return chunks[0] if chunks else None
+
+    def write(station, data):
+        with station._lock:
+            station._chunks[kind] = [] if data is None else [data]
+
+    return property(read, write)
+
+
+class Station:
+    """Contains parsed data from a NOAA buoy station"""
+    tide_data = _chunked_frame('tide')
+    weather_data = _chunked_frame('weather')
+    filtered_wave_data = _chunked_frame('waves')
+    swell_data = _chunked_frame('swell')
+
+    def __init__(self, file_list):
+        self._chunks = {}
+        self._lock = Lock()
+        self.tide_data = None
+        self.weather_data = None
+        self.weather_units = None
+        self.filtered_wave_data = None
+        self.swell_data = None
+        self.spectra = None
+        for file in file_list:
+            if '.dart' in file:
+                self._create_tide_data(file)
+            if '.txt' in file:
+                self._create_weather_data(file)
+            if '.spec' in file:
+                self._create_swell_data(file)
+            if '.data_spec' in file:
+                self._create_spectral_data(file)
+
+    @classmethod
+    def from_parsed(cls, parsed_files):
+        """Build a Station from the arrays parse_worker.parse_file returned for its files"""
+        station = cls([])
+        for parsed in parsed_files:
+            if parsed['kind'] == 'spectra':
+                station.spectra = parse_worker.spectra_from_arrays(parsed)
+                continue
+            data = parse_worker.frame_from_arrays(parsed)
+            if parsed['kind'] == 'tide':
+                station._set_tide_data(data)
+            elif parsed['kind'] == 'weather':
+                station._set_weather_data(data, parsed['units'])
+            elif parsed['kind'] == 'swell':
+                station.swell_data = data
+        return station
+
+    @classmethod
+    def from_archive(cls, archive, buoy_id, start=None, end=None, columns=None):
+        """Build a Station from the observations a StationArchive holds between start and end
+
+        columns maps each kind of data to read, 'weather', 'tide' or 'swell', to
+        the columns read of it, None for all of them. By default every column of
+        every kind is read.
+        """
+        station = cls([])
+        if columns is None:
+            columns = dict.fromkeys(station_archive.ARCHIVED_FRAMES)
+        for kind, kind_columns in columns.items():
+            data = archive.read(buoy_id, kind, start, end, kind_columns)
+            if len(data) == 0:
+                continue
+            data = data[::-1]   # archives are oldest first, realtime2 frames newest first
+            if kind == 'weather':
+                station._set_weather_data(data, archive.units(buoy_id, 'weather'))
+            elif kind == 'tide':
+                station.tide_data = data
+            elif kind == 'swell':
+                station.swell_data = data
+        return station
+
+    def _create_tide_data(self, file):
+        """Process dart data into format for plotting the tide"""
+        self._set_tide_data(ndbc_parser.parse_realtime(file)[0])
+
+    def _set_tide_data(self, data):
+        self.tide_data = data.drop(columns=['T'])
+
+    def _create_weather_data(self, file):
+        """Process weather summary data into usable formats"""
+        self._set_weather_data(*ndbc_parser.parse_realtime(file))
+
+    def _set_weather_data(self, data, units):
+        self.weather_data, self.weather_units = data, units
+        self.filtered_wave_data = self.weather_data.dropna(subset=["WVHT", "DPD", "MWD"])
+
+    def _create_swell_data(self, file):
+        """Process the spectral wave summary"""
+        self.swell_data, _ = ndbc_parser.parse_realtime(file)
+
+    def _create_spectral_data(self, file):
+        """Process the spectral energy density into a time x frequency array"""
+        self.spectra = spectral.parse_data_spec(file)
+
+    @cached_property
+    def swell_partitions(self):
+        """Swell, wind sea and total height and peak period of every spectrum, or None without spectra"""
+        if self.spectra is None:
+            return None
+        return self.spectra.partitions()
+
+    @property
+    def nbytes(self):
+        """Approximate number of bytes held by the weather, tide and swell frames and the spectra"""
+        with self._lock:
+            frames = [chunk for kind in ('weather', 'tide', 'swell') for chunk in self._chunks[kind]]
+        size = sum(int(frame.memory_usage(index=True).sum()) for frame in frames)
+        if self.spectra is not None:
+            size += self.spectra.nbytes
+        return size
+
+    def newest_time(self, kind):
+        """Return the time of the newest 'weather', 'tide' or 'swell' row, or None if there are none"""
+        with self._lock:
+            chunks = self._chunks[kind]
+        return chunks[0].index[0] if chunks and len(chunks[0]) else None
+
+    def append_observations(self, kind, data, units=None):
+        """Merge rows newer than a frame's newest onto its top, returning the rows as stored or None if none
+
+        The rows are kept as a chunk in front of the frame, see _chunked_frame.
+        The conditions snapshot is updated from the new rows alone, keeping the
+        older value of any field they do not report.
+        """
+        if len(data) == 0:
+            return None
+        if kind == 'tide':
+            data = data.drop(columns=['T'])
+        elif kind == 'weather':
+            new_wave_data = data.dropna(subset=["WVHT", "DPD", "MWD"])
+            if len(new_wave_data):
+                self._prepend('waves', new_wave_data)
+            if 'conditions' in self.__dict__:
+                newer = conditions.Conditions.from_weather_data(data, units or self.weather_units, new_wave_data)
+                self.__dict__['conditions'] = newer.combine(self.__dict__['conditions'])
+        self._prepend(kind, data)
+        return data
+
+    def _prepend(self, kind, data):
+        with self._lock:
+            self._chunks[kind] = [data, *self._chunks[kind]]
+
+    @cached_property
+    def conditions(self):
+        """Snapshot of the current conditions, computed once from the weather data"""
+        if self.weather_data is None:
+            return None
+        return conditions.Conditions.from_weather_data(self.weather_data, self.weather_units, self.filtered_wave_data)
+
+    def air_temperature(self):
+        """Return current air temperature"""
+        return self.conditions.get('air_temperature')
+
+    def air_temperature_unit(self):
+        """Return air temperature unit"""
+        return self.conditions.units['air_temperature']
+
+    def water_temperature(self):
+        """Return current water temperature"""
+        return self.conditions.get('water_temperature')
+
+    def water_temperature_unit(self):
+        """Return water temperature unit"""
+        return self.conditions.units['water_temperature']
+
+    def significant_wave_height(self):
+        """Return current significant wave height"""
+        return self.conditions.get('wave_height')
+
+    def wave_height_unit(self):
+        """Return wave height unit"""
+        return self.conditions.units['wave_height']
+
+    def swell_period(self):
+        """Return current dominant swell period"""
+        return self.conditions.get('swell_period')
+
+    def swell_direction(self):
+        """Return current dominant swell direction"""
+        return self.conditions.get('swell_direction')
+
+    def wind_speed(self):
+        """Return current wind speed"""
+        return self.conditions.get('wind_speed')
+
+    def wind_speed_unit(self):
+        """Return wind speed unit"""
+        return self.conditions.units['wind_speed']
+
+    def wind_direction(self):
+        """Return wind direction"""
+        return self.conditions.get('wind_direction')
+
+
+async def request_station(controller, buoy_id):
+    """Request buoy data from the NOAA microservice, parse the files it sends back and cache the Station
+
+    Uses the rpc_client, parse_pool, station_cache and tracer entries of
+    controller. Returns None when the microservice found no files for the buoy.
+    """
+    loop = asyncio.get_running_loop()
+    tracer = controller['tracer']
+    with tracer.span('rpc', request=buoy_id):
+        future = await loop.run_in_executor(None, controller['rpc_client'].request, buoy_id)
+        reply = decode_reply(await asyncio.wrap_future(future))
+    if reply.status == STATUS_NO_FILES:
+        print(f"No files downloaded for {buoy_id}")
+        return None
+    if reply.status == STATUS_ERROR:
+        raise RuntimeError(f"NOAA microservice failed for {buoy_id}: {reply.message}")
+    with tracer.span('parse', request=buoy_id):
+        # Files are parsed in parallel worker processes, only finished arrays come back to this process
+        if reply.files:
+            print(f"Received Files: {list(reply.files)}")
+            parsed = await parse_worker.parse_reply(reply, controller['parse_pool'])
+        else:
+            # Older microservices reply with the paths they downloaded to
+            print(f"Received Files: {reply.paths}")
+            parsed = await parse_worker.parse_files(reply.paths, controller['parse_pool'])
+        station = Station.from_parsed(parsed)
+        station.conditions     # compute the snapshot here, not on the Tk thread
+    controller['station_cache'].put(buoy_id, station)
+    return station
@@ -0,0 +1,123 @@
+import math
+import numpy as np
+
+EARTH_RADIUS_MILES = 3958.8
+
+
+def haversine_miles(lat, lon, latitudes, longitudes):
+    """Great-circle distance in miles from one point to arrays of points given in degrees"""
+    lat1 = math.radians(lat)
+    lat2 = np.radians(latitudes)
+    d_lat = lat2 - lat1
+    d_lon = np.radians(longitudes) - math.radians(lon)
+    a = np.sin(d_lat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(d_lon / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def _angular_extent(lat, radius_miles):
+    """Return the latitude and longitude half-widths in degrees of a search circle"""
+    angular = radius_miles / EARTH_RADIUS_MILES
+    d_lat = math.degrees(angular)
+    cos_lat = math.cos(math.radians(lat))
+    if lat + d_lat >= 90 or lat - d_lat <= -90 or math.sin(angular) >= cos_lat:
+        # Circle contains a pole, every longitude is in range
+        return d_lat, 180.0
+    return d_lat, math.degrees(math.asin(math.sin(angular) / cos_lat))
+
+
+def bounding_box(lat, lon, radius_miles):
+    """Return the (top left, bottom right) corners of the box enclosing a search circle"""
+    d_lat, d_lon = _angular_extent(lat, radius_miles)
+    return ((min(lat + d_lat, 85.0), max(lon - d_lon, -180.0)),
+            (max(lat - d_lat, -85.0), min(lon + d_lon, 180.0)))
+
+
+class StationIndex:
+    """Grid bucketed index of station coordinates for radius and nearest neighbour search
+
+    Stations are sorted by the lat/lon cell they fall in so each cell is a contiguous
+    slice of the coordinate arrays. A query only gathers the cells overlapping the
+    search circle and then filters them by exact haversine distance.
+    """
+    def __init__(self, latitudes, longitudes, stations=None, cell_size=1.0):
+        self.stations = stations
+        self.cell_size = cell_size
+        self.n_rows = int(math.ceil(180 / cell_size))
+        self.n_cols = int(math.ceil(360 / cell_size))
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = (np.asarray(longitudes, dtype=np.float64) + 180) % 360 - 180
+        rows = np.clip(((latitudes + 90) // cell_size).astype(np.int64), 0, self.n_rows - 1)
+        cols = ((longitudes + 180) // cell_size).astype(np.int64) % self.n_cols
+        cells = rows * self.n_cols + cols
+        self._order = np.argsort(cells, kind='stable')
+        self._latitudes = latitudes[self._order]
+        self._longitudes = longitudes[self._order]
+        self._cell_starts = np.searchsorted(cells[self._order], np.arange(self.n_rows * self.n_cols + 1))
+
+    @classmethod
+    def from_stations(cls, stations, cell_size=1.0):
+        """Build an index from a list of station attribute dicts"""
+        latitudes = np.fromiter((float(station.get('lat')) for station in stations), np.float64, len(stations))
+        longitudes = np.fromiter((float(station.get('lon')) for station in stations), np.float64, len(stations))
+        return cls(latitudes, longitudes, stations=stations, cell_size=cell_size)
+
+    @classmethod
+    def from_table(cls, table, cell_size=1.0):
+        """Build an index from the coordinate columns of a StationTable"""
+        return cls(table.latitudes, table.longitudes, stations=table, cell_size=cell_size)
+
+    def __len__(self):
+        return len(self._order)
+
+    def _candidates(self, lat, lon, radius_miles):
+        """Return positions in the sorted arrays of stations in cells touching the circle"""
+        d_lat, d_lon = _angular_extent(lat, radius_miles)
+        row_start = max(int((lat - d_lat + 90) // self.cell_size), 0)
+        row_stop = min(int((lat + d_lat + 90) // self.cell_size), self.n_rows - 1)
+        col_start = int((lon - d_lon + 180) // self.cell_size)
+        col_stop = int((lon + d_lon + 180) // self.cell_size)
+        if col_stop - col_start + 1 >= self.n_cols:
+            col_ranges = [(0, self.n_cols - 1)]
+        else:
+            col_start %= self.n_cols
+            col_stop %= self.n_cols
+            if col_start <= col_stop:
+                col_ranges = [(col_start, col_stop)]
+            else:
+                # Circle crosses the dateline
+                col_ranges = [(col_start, self.n_cols - 1), (0, col_stop)]
+        slices = []
+        for row in range(row_start, row_stop + 1):
+            for first, last in col_ranges:
+                start = self._cell_starts[row * self.n_cols + first]
+                stop = self._cell_starts[row * self.n_cols + last + 1]
+                if stop > start:
+                    slices.append(np.arange(start, stop))
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(slices)
+
+    def radius(self, lat, lon, radius_miles):
+        """Return (station indices, distances in miles) within radius_miles, nearest first"""
+        candidates = self._candidates(lat, lon, radius_miles)
+        distances = haversine_miles(lat, lon, self._latitudes[candidates], self._longitudes[candidates])
+        inside = distances <= radius_miles
+        candidates = candidates[inside]
+        distances = distances[inside]
+        nearest_first = np.argsort(distances, kind='stable')
+        return self._order[candidates[nearest_first]], distances[nearest_first]
+
+    def nearest(self, lat, lon, k=1):
+        """Return (station indices, distances in miles) of the k stations nearest to a point"""
+        k = min(k, len(self))
+        radius_miles = self.cell_size * 69.0
+        while True:
+            indices, distances = self.radius(lat, lon, radius_miles)
+            if len(indices) >= k or radius_miles >= math.pi * EARTH_RADIUS_MILES:
+                return indices[:k], distances[:k]
+            radius_miles *= 2
+
+    def search(self, lat, lon, radius_miles):
+        """Return the station attribute dicts within radius_miles of a point, nearest first"""
+        indices, _ = self.radius(lat, lon, radius_miles)
+        return [self.stations[i] for i in indices]
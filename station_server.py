@@ -0,0 +1,409 @@
+"""Headless HTTP/JSON API serving buoy data to many dashboards from one process
+
+Routes:
+    GET /stations?lat=&lon=&radius=     active stations within radius miles of a point, nearest first
+    GET /buoys/{id}/conditions          the newest observations of a buoy
+    GET /buoys/{id}/tide?from=&to=      tide heights between two times, oldest first
+    GET /stats                          cache and microservice request counters
+
+Stations are fetched and parsed with station_data, the same code the dashboard
+uses, and shared by every client through one StationCache. Concurrent requests for a buoy that is
+not cached wait on a single microservice request. Encoded responses are kept
+until the data behind them changes, carry an ETag for conditional requests and
+are sent gzip compressed to clients that accept it.
+
+Usage: python station_server.py [--host 127.0.0.1] [--port 8361] [--rabbitmq localhost]
+       python station_server.py --fixtures fixtures     serve fixture files through the stand-in microservice
+"""
+import argparse
+import asyncio
+import functools
+import gzip
+import hashlib
+import json
+import re
+import weakref
+from collections import OrderedDict
+from http import HTTPStatus
+from time import monotonic
+from urllib.parse import parse_qs, urlsplit
+import numpy as np
+import pandas as pd
+import parse_worker
+from buoy_rpc import BuoyRpcClient
+from station_data import request_station
+from station_cache import StationCache
+from station_catalog import StationCatalog
+from tracing import Tracer
+
+DEFAULT_PORT = 8361
+# Responses smaller than this are not worth compressing
+GZIP_MIN_SIZE = 1024
+MAX_HEADER_BYTES = 16 * 1024
+# Seconds an idle keep-alive connection is held open
+KEEP_ALIVE_TIMEOUT = 15
+# Most buoys requested from the microservice at a time
+FETCH_CONCURRENCY = 20
+# Seconds a buoy the microservice has no data for is answered 404 without asking it again
+MISSING_TTL = 60
+MAX_RADIUS_MILES = 5000
+# Unit of the HEIGHT column of realtime2 .dart files
+TIDE_UNIT = 'm'
+ROUTES = ((re.compile(r'/stations'), 'stations'),
+          (re.compile(r'/buoys/(?P<buoy_id>[A-Za-z0-9]{1,16})/conditions'), 'conditions'),
+          (re.compile(r'/buoys/(?P<buoy_id>[A-Za-z0-9]{1,16})/tide'), 'tide'),
+          (re.compile(r'/stats'), 'stats'))
+
+
+class HTTPError(Exception):
+    """An error response with a status code and a message for the client"""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = HTTPStatus(status)
+        self.message = message
+
+
+class Response:
+    """An encoded JSON response, its ETag and, once asked for, its gzip compressed body"""
+    def __init__(self, body, status=HTTPStatus.OK):
+        self.status = HTTPStatus(status)
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        self._gzipped = None
+
+    @classmethod
+    def json(cls, data, status=HTTPStatus.OK):
+        return cls(json.dumps(data, separators=(',', ':')).encode(), status)
+
+    def gzipped(self):
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=5)
+        return self._gzipped
+
+
+def _float_parameter(query, name, low, high):
+    try:
+        value = float(query[name][0])
+    except (KeyError, ValueError):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"{name} must be a number") from None
+    if not low <= value <= high:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"{name} must be between {low} and {high}")
+    return value
+
+
+def _time_parameter(query, name):
+    if name not in query:
+        return None
+    try:
+        time = pd.Timestamp(query[name][0])
+    except ValueError:
+        time = pd.NaT
+    if time is pd.NaT:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"{name} must be an ISO 8601 time")
+    return time.tz_localize('UTC') if time.tzinfo is None else time.tz_convert('UTC')
+
+
+class StationService:
+    """Buoy data shared by every client of a StationServer
+
+    Stations come from station_cache, or from the microservice through
+    station_data.request_station when they are missing or stale. A stale
+    Station is served while it is revalidated in the background, and a buoy
+    the microservice has no data for is not asked for again for missing_ttl
+    seconds. Responses are kept in an LRU of at most response_cache_size
+    entries and response_cache_bytes of bodies, each valid while the Station
+    or station index it was built from is still current. Entries hold that
+    source by a weak reference, so a Station evicted from station_cache is
+    freed rather than kept alive by its responses.
+    """
+    def __init__(self, rpc_client, parse_pool, catalog=None, station_cache=None, tracer=None,
+                 fetch_concurrency=FETCH_CONCURRENCY, response_cache_size=1024,
+                 response_cache_bytes=64 * 1024 * 1024, missing_ttl=MISSING_TTL, clock=monotonic):
+        self.catalog = catalog if catalog is not None else StationCatalog()
+        self.controller = {'rpc_client': rpc_client,
+                           'parse_pool': parse_pool,
+                           'station_cache': station_cache if station_cache is not None else StationCache(),
+                           'tracer': tracer if tracer is not None else Tracer()}
+        self.fetch_concurrency = fetch_concurrency
+        self.response_cache_size = response_cache_size
+        self.response_cache_bytes = response_cache_bytes
+        self.missing_ttl = missing_ttl
+        self.clock = clock
+        self.fetches = 0
+        self.coalesced = 0
+        self.missing_hits = 0
+        self.response_hits = 0
+        self.response_misses = 0
+        self._fetch_limit = None
+        self._in_flight = {}
+        self._missing = OrderedDict()
+        self._responses = OrderedDict()
+        self._response_bytes = 0
+
+    async def station(self, buoy_id):
+        """Return the Station of a buoy, or None if the microservice has no data for it"""
+        station, fresh = self.controller['station_cache'].get(buoy_id)
+        if station is not None and (fresh or not self.controller['station_cache'].revalidate):
+            return station
+        if self._recently_missing(buoy_id):
+            self.missing_hits += 1
+            return station
+        task = self._in_flight.get(buoy_id)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(buoy_id))
+            self._in_flight[buoy_id] = task
+            task.add_done_callback(functools.partial(self._fetch_done, buoy_id))
+        else:
+            self.coalesced += 1
+        if station is not None:
+            return station
+        # One waiting client disconnecting must not cancel the fetch the others wait on
+        return await asyncio.shield(task)
+
+    def _recently_missing(self, buoy_id):
+        """Return whether the microservice had no data for a buoy within the last missing_ttl seconds"""
+        expires_at = self._missing.get(buoy_id)
+        if expires_at is None:
+            return False
+        if self.clock() < expires_at:
+            return True
+        del self._missing[buoy_id]
+        return False
+
+    def _fetch_done(self, buoy_id, task):
+        self._in_flight.pop(buoy_id, None)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            print(f"Fetching {buoy_id} failed: {task.exception()!r}")
+        elif task.result() is None:
+            self._missing[buoy_id] = self.clock() + self.missing_ttl
+            self._missing.move_to_end(buoy_id)
+            while len(self._missing) > self.response_cache_size:
+                self._missing.popitem(last=False)
+        else:
+            self._missing.pop(buoy_id, None)
+
+    async def _fetch(self, buoy_id):
+        if self._fetch_limit is None:
+            self._fetch_limit = asyncio.Semaphore(self.fetch_concurrency)
+        async with self._fetch_limit:
+            self.fetches += 1
+            return await request_station(self.controller, buoy_id)
+
+    def _cached(self, key, source, build):
+        """Return the response cached for key if it was built from source, otherwise build and cache it"""
+        entry = self._responses.pop(key, None)
+        if entry is not None:
+            self._response_bytes -= len(entry[1].body)
+            if entry[0]() is source:
+                self.response_hits += 1
+                self._store_response(key, entry)
+                return entry[1]
+        self.response_misses += 1
+        response = build()
+        self._store_response(key, (weakref.ref(source), response))
+        return response
+
+    def _store_response(self, key, entry):
+        """Put an entry at the recent end of the response LRU, evicting old ones to stay within budget"""
+        self._responses[key] = entry
+        self._response_bytes += len(entry[1].body)
+        while len(self._responses) > 1 and (len(self._responses) > self.response_cache_size
+                                            or self._response_bytes > self.response_cache_bytes):
+            _, (_, evicted) = self._responses.popitem(last=False)
+            self._response_bytes -= len(evicted.body)
+
+    async def stations(self, query):
+        latitude = _float_parameter(query, 'lat', -90, 90)
+        longitude = _float_parameter(query, 'lon', -180, 180)
+        radius = _float_parameter(query, 'radius', 0, MAX_RADIUS_MILES)
+        loop = asyncio.get_running_loop()
+        index = await loop.run_in_executor(None, self.catalog.index)
+
+        def build():
+            indices, distances = index.radius(latitude, longitude, radius)
+            stations = [{**index.stations[i], 'distance_miles': round(float(distance), 2)}
+                        for i, distance in zip(indices, distances)]
+            return Response.json({'lat': latitude, 'lon': longitude, 'radius': radius, 'stations': stations})
+        return self._cached(('stations', latitude, longitude, radius), index, build)
+
+    async def _station_or_404(self, buoy_id):
+        try:
+            station = await self.station(buoy_id)
+        except asyncio.TimeoutError:
+            raise HTTPError(HTTPStatus.GATEWAY_TIMEOUT, f"No reply from the NOAA microservice for {buoy_id}")
+        except (ConnectionError, RuntimeError) as error:
+            raise HTTPError(HTTPStatus.BAD_GATEWAY, str(error))
+        if station is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No data for buoy {buoy_id}")
+        return station
+
+    async def conditions(self, buoy_id, query):
+        station = await self._station_or_404(buoy_id)
+
+        def build():
+            conditions = station.conditions
+            if conditions is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"No weather observations for buoy {buoy_id}")
+            return Response.json({'buoy_id': buoy_id, **conditions.as_dict()})
+        return self._cached(('conditions', buoy_id), station, build)
+
+    async def tide(self, buoy_id, query):
+        start = _time_parameter(query, 'from')
+        end = _time_parameter(query, 'to')
+        station = await self._station_or_404(buoy_id)
+        if station.tide_data is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No tide observations for buoy {buoy_id}")
+
+        def build():
+            # Rows are newest first, reversed the index is ascending and can be sliced by time
+            data = station.tide_data.iloc[::-1]
+            data = data.loc[start:end] if start is not None or end is not None else data
+            times = np.char.add(np.datetime_as_string(data.index.tz_convert(None).to_numpy(), unit='s'), 'Z')
+            heights = np.round(data['HEIGHT'].to_numpy(dtype=np.float64), 3)
+            heights = np.where(np.isnan(heights), None, heights)
+            return Response.json({'buoy_id': buoy_id, 'unit': TIDE_UNIT, 'times': times.tolist(),
+                                  'heights': heights.tolist()})
+        return self._cached(('tide', buoy_id, start, end), station, build)
+
+    async def stats(self, query):
+        return Response.json({'fetches': self.fetches, 'coalesced': self.coalesced, 'in_flight': len(self._in_flight),
+                              'missing_hits': self.missing_hits, 'response_hits': self.response_hits,
+                              'response_misses': self.response_misses,
+                              'station_cache': self.controller['station_cache'].stats()})
+
+
+def _etag_matches(if_none_match, etag):
+    if if_none_match is None:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    return '*' in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class StationServer:
+    """Minimal asyncio HTTP/1.1 server for a StationService, with keep-alive connections
+
+    Only GET and HEAD are served; request bodies are not read.
+    """
+    def __init__(self, service, host='127.0.0.1', port=DEFAULT_PORT):
+        self.service = service
+        self.host = host
+        self.port = port
+        self.requests_handled = 0
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self.handle_connection, self.host, self.port,
+                                                  limit=MAX_HEADER_BYTES, backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self._server
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        print(f"Serving buoy data on http://{self.host}:{self.port}")
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEP_ALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, asyncio.LimitOverrunError,
+                        ConnectionError):
+                    return
+                keep_alive = await self.handle_request(head, writer)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, head, writer):
+        """Answer one request, returning whether the connection stays open"""
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ')
+        except ValueError:
+            self._write(writer, Response.json({'error': "Malformed request line"}, HTTPStatus.BAD_REQUEST),
+                        {}, send_body=True, keep_alive=False)
+            return False
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+        self.requests_handled += 1
+        if method not in ('GET', 'HEAD'):
+            response = Response.json({'error': f"{method} is not supported"}, HTTPStatus.METHOD_NOT_ALLOWED)
+        else:
+            response = await self.dispatch(target)
+        self._write(writer, response, headers, send_body=method != 'HEAD', keep_alive=keep_alive)
+        return keep_alive
+
+    async def dispatch(self, target):
+        """Return the Response to a GET of target"""
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        for pattern, name in ROUTES:
+            match = pattern.fullmatch(url.path)
+            if match is None:
+                continue
+            try:
+                return await getattr(self.service, name)(*match.groups(), query)
+            except HTTPError as error:
+                return Response.json({'error': error.message}, error.status)
+            except Exception as error:
+                print(f"{target} failed: {error!r}")
+                return Response.json({'error': "Internal server error"}, HTTPStatus.INTERNAL_SERVER_ERROR)
+        return Response.json({'error': f"No route for {url.path}"}, HTTPStatus.NOT_FOUND)
+
+    @staticmethod
+    def _write(writer, response, headers, send_body, keep_alive):
+        status = response.status
+        body = response.body
+        extra = [f"ETag: {response.etag}", "Cache-Control: no-cache", "Vary: Accept-Encoding"]
+        if status == HTTPStatus.OK and _etag_matches(headers.get('if-none-match'), response.etag):
+            status, body = HTTPStatus.NOT_MODIFIED, b''
+        elif len(body) >= GZIP_MIN_SIZE and 'gzip' in headers.get('accept-encoding', ''):
+            body = response.gzipped()
+            extra.append("Content-Encoding: gzip")
+        head = [f"HTTP/1.1 {status.value} {status.phrase}",
+                "Content-Type: application/json",
+                f"Content-Length: {len(body) if status != HTTPStatus.NOT_MODIFIED else 0}",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}",
+                *extra]
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+        if send_body and body:
+            writer.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--rabbitmq', default='localhost', help="RabbitMQ host of the NOAA microservice")
+    parser.add_argument('--fixtures', help="answer from this fixture directory instead of the microservice")
+    parser.add_argument('--delay', type=float, default=0.0, help="stand-in reply delay in seconds, with --fixtures")
+    args = parser.parse_args()
+    if args.fixtures:
+        from stand_in_service import StandInClient, StandInService
+        rpc_client = StandInClient(StandInService(args.fixtures, connection_factory=lambda: None, delay=args.delay))
+    else:
+        rpc_client = BuoyRpcClient(args.rabbitmq)
+    with parse_worker.worker_pool() as parse_pool:
+        server = StationServer(StationService(rpc_client, parse_pool), args.host, args.port)
+        try:
+            asyncio.run(server.serve_forever())
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+import functools
+import operator
+import sys
+from itertools import repeat
+from xml.parsers import expat
+import numpy as np
+
+# Bit flags for the y/n capability attributes of a station
+MET = 1
+CURRENTS = 2
+WATER_QUALITY = 4
+DART = 8
+FLAG_ATTRIBUTES = (('met', MET), ('currents', CURRENTS), ('waterquality', WATER_QUALITY), ('dart', DART))
+# Free text attributes kept as they are and only returned when a station has them
+TEXT_ATTRIBUTES = ('elev', 'owner', 'pgm')
+COLUMN_ATTRIBUTES = ('id', 'lat', 'lon', 'name', 'type', *TEXT_ATTRIBUTES, *(name for name, _ in FLAG_ATTRIBUTES))
+# Attribute names of an ordered expat attribute list [name, value, name, value, ...]
+_ATTRIBUTE_NAMES = operator.itemgetter(slice(0, None, 2))
+
+
+class StationTable:
+    """Compact column store of the NOAA active station list
+
+    Coordinates are float32 arrays, station types are small integer codes into
+    type_names and the met/currents/waterquality/dart attributes are packed into
+    one byte of bit flags per station. Indexing a row returns an attribute dict
+    with the keys parse_xml produced. Its values are the same strings, except
+    'lat' and 'lon', which are floats read back from the float32 columns and
+    rounded to 5 decimals; search and map code passes them through float().
+    """
+    def __init__(self, ids, latitudes, longitudes, type_codes, type_names, flags, names, text_columns=None):
+        self.ids = ids
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.type_codes = type_codes
+        self.type_names = type_names
+        self.flags = flags
+        self.names = names
+        self.text_columns = text_columns if text_columns is not None else {}
+        self._rows_by_id = {station_id: i for i, station_id in enumerate(ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        station = {'id': self.ids[i],
+                   'lat': round(float(self.latitudes[i]), 5),
+                   'lon': round(float(self.longitudes[i]), 5),
+                   'name': self.names[i],
+                   'type': self.type_names[self.type_codes[i]]}
+        for attribute, column in self.text_columns.items():
+            if column[i]:
+                station[attribute] = column[i]
+        for attribute, flag in FLAG_ATTRIBUTES:
+            station[attribute] = 'y' if self.flags[i] & flag else 'n'
+        return station
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def row(self, station_id):
+        """Return the row number of a station id, or None if it is not active"""
+        return self._rows_by_id.get(station_id)
+
+    def get(self, station_id):
+        """Return the attribute dict of a station id, or None if it is not active"""
+        i = self.row(station_id)
+        return None if i is None else self[i]
+
+    def has(self, flag):
+        """Return a boolean mask of the stations with the given capability flag"""
+        return (self.flags & flag) != 0
+
+    def save(self, path, source=()):
+        """Write the columns to an uncompressed .npz file, with source integers that load() checks"""
+        with open(path, 'wb') as f:
+            np.savez(f, ids=np.array(self.ids, dtype=str), names=np.array(self.names, dtype=str),
+                     latitudes=self.latitudes, longitudes=self.longitudes, type_codes=self.type_codes,
+                     type_names=np.array(self.type_names, dtype=str), flags=self.flags,
+                     source=np.array(source, dtype=np.int64),
+                     **{f'text_{attribute}': np.array(column, dtype=str)
+                        for attribute, column in self.text_columns.items()})
+
+    @classmethod
+    def load(cls, path, source=()):
+        """Read a table written by save(), or return None if it was saved with a different source"""
+        with np.load(path) as columns:
+            if columns['source'].tolist() != list(source):
+                return None
+            text_columns = {name[len('text_'):]: columns[name].tolist()
+                            for name in columns.files if name.startswith('text_')}
+            return cls(list(map(sys.intern, columns['ids'].tolist())), columns['latitudes'], columns['longitudes'],
+                       columns['type_codes'], columns['type_names'].tolist(), columns['flags'],
+                       columns['names'].tolist(), text_columns)
+
+
+class _ColumnBuilder:
+    """Expat start handler collecting station attributes, transposed into columns a batch at a time"""
+    def __init__(self):
+        self.columns = {attribute: [] for attribute in COLUMN_ATTRIBUTES}
+        self.rows = []
+
+    def start(self, tag, attributes):
+        if tag == 'station':
+            self.rows.append(attributes)
+
+    def flush(self):
+        rows = self.rows
+        if not rows:
+            return
+        names = rows[0][::2]
+        if all(map(operator.eq, map(_ATTRIBUTE_NAMES, rows), repeat(names))):
+            # NDBC writes every station with the same attributes in the same order,
+            # so a single zip turns the batch into columns without a loop per station
+            values = dict(zip(names, list(zip(*rows))[1::2]))
+            for attribute, column in self.columns.items():
+                column.extend(values.get(attribute, repeat('', len(rows))))
+        else:
+            stations = [dict(zip(row[::2], row[1::2])) for row in rows]
+            for attribute, column in self.columns.items():
+                column.extend(map(dict.get, stations, repeat(attribute), repeat('')))
+        rows.clear()
+
+    def table(self):
+        columns = self.columns
+        count = len(columns['id'])
+        type_lookup = {}
+        type_codes = np.fromiter(map(lambda name: type_lookup.setdefault(name, len(type_lookup)), columns['type']),
+                                 dtype=np.uint8, count=count)
+        flags = np.zeros(count, dtype=np.uint8)
+        for attribute, flag in FLAG_ATTRIBUTES:
+            flags[np.array(columns[attribute], dtype=str) == 'y'] |= flag
+        return StationTable(list(map(sys.intern, columns['id'])),
+                            _float32_column(columns['lat'], count),
+                            _float32_column(columns['lon'], count),
+                            type_codes,
+                            list(map(sys.intern, type_lookup)),
+                            flags,
+                            columns['name'],
+                            {attribute: columns[attribute] for attribute in TEXT_ATTRIBUTES})
+
+
+def _float32_column(values, count):
+    try:
+        return np.fromiter(map(float, values), dtype=np.float32, count=count)
+    except ValueError:
+        # A missing or malformed coordinate becomes NaN rather than failing the whole list
+        return np.array([_float_or_nan(value) for value in values], dtype=np.float32)
+
+
+def _float_or_nan(value):
+    try:
+        return float(value)
+    except ValueError:
+        return float('nan')
+
+
+def load_station_table(xml_file, chunk_size=1 << 18):
+    """Stream parse an activestations xml file into a StationTable
+
+    Expat hands each station's attributes to the builder as a list, which is
+    all the per station Python work there is; after every chunk the collected
+    lists are transposed into columns and dropped, so no element tree or
+    attribute dicts are kept.
+    """
+    builder = _ColumnBuilder()
+    parser = expat.ParserCreate()
+    parser.ordered_attributes = True
+    parser.StartElementHandler = builder.start
+    with open(xml_file, 'rb') as f:
+        for chunk in iter(functools.partial(f.read, chunk_size), b''):
+            parser.Parse(chunk)
+            builder.flush()
+    parser.Parse(b'', True)
+    builder.flush()
+    return builder.table()
@@ -0,0 +1,192 @@
+import math
+import queue
+import sqlite3
+import time
+from threading import Thread
+import requests
+from tkintermapview.utility_functions import decimal_to_osm
+
+DEFAULT_TILE_SERVER = "https://a.tile.openstreetmap.org/{z}/{x}/{y}.png"
+USER_AGENT = "Buoy-Dashboard tile prefetch"
+# The OSM tile usage policy forbids bulk downloading, so prefetching stays at
+# z16 and below, is capped per job and downloads one tile at a time, spaced out
+MAX_PREFETCH_ZOOM = 16
+MAX_TILES_PER_JOB = 100
+DOWNLOAD_INTERVAL = 0.5
+
+# tiles, server and sections match the database TkinterMapView reads with database_path,
+# tile_access is ours and records the size and last use of every tile we stored
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS server (url VARCHAR(300) PRIMARY KEY NOT NULL, max_zoom INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS tiles (zoom INTEGER NOT NULL, x INTEGER NOT NULL, y INTEGER NOT NULL,
+    server VARCHAR(300) NOT NULL, tile_image BLOB NOT NULL,
+    CONSTRAINT fk_server FOREIGN KEY (server) REFERENCES server (url),
+    CONSTRAINT pk_tiles PRIMARY KEY (zoom, x, y, server));
+CREATE TABLE IF NOT EXISTS sections (position_a VARCHAR(100) NOT NULL, position_b VARCHAR(100) NOT NULL,
+    zoom_a INTEGER NOT NULL, zoom_b INTEGER NOT NULL, server VARCHAR(300) NOT NULL,
+    CONSTRAINT fk_server FOREIGN KEY (server) REFERENCES server (url),
+    CONSTRAINT pk_tiles PRIMARY KEY (position_a, position_b, zoom_a, zoom_b, server));
+CREATE TABLE IF NOT EXISTS tile_access (zoom INTEGER NOT NULL, x INTEGER NOT NULL, y INTEGER NOT NULL,
+    server VARCHAR(300) NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL,
+    PRIMARY KEY (zoom, x, y, server));
+CREATE INDEX IF NOT EXISTS tile_access_accessed ON tile_access (accessed);
+"""
+
+
+def tile_range(position_top_left, position_bottom_right, zoom):
+    """Return the inclusive x and y tile ranges covering a bounding box at a zoom level"""
+    last = 2 ** zoom - 1
+    left, top = decimal_to_osm(*position_top_left, zoom)
+    right, bottom = decimal_to_osm(*position_bottom_right, zoom)
+    clamp = lambda value: min(max(int(math.floor(value)), 0), last)  # noqa: E731
+    return range(clamp(left), clamp(right) + 1), range(clamp(top), clamp(bottom) + 1)
+
+
+def fitting_zoom(position_top_left, position_bottom_right, width, height, tile_size=256, min_zoom=0, max_zoom=19):
+    """Return the zoom level TkinterMapView.fit_bounding_box picks for a map of width x height pixels"""
+    zoom = min_zoom
+    for level in range(min_zoom, max_zoom + 1):
+        left, top = decimal_to_osm(*position_top_left, level)
+        right, bottom = decimal_to_osm(*position_bottom_right, level)
+        if (right - left) * tile_size > width or (bottom - top) * tile_size > height:
+            break
+        zoom = level
+    return zoom
+
+
+class TileCache:
+    """Size bounded SQLite store of map tiles, filled by a background prefetch worker
+
+    The database uses TkinterMapView's offline format, so passing path as the
+    map's database_path makes it draw stored tiles from disk and only go to the
+    network for tiles that are missing. Prefetch jobs download the tiles of a
+    bounding box at its zoom level and the neighbouring ones, no deeper than
+    max_prefetch_zoom and no more than max_tiles_per_job of them. A single
+    worker downloads them in turn, at least download_interval seconds apart,
+    and a 429 from the server ends the job. When the stored tiles exceed
+    max_bytes the least recently prefetched ones are evicted.
+    """
+    def __init__(self, path='map_tiles.db', tile_server=DEFAULT_TILE_SERVER, max_zoom=19,
+                 max_bytes=200 * 1024 * 1024, max_tiles_per_job=MAX_TILES_PER_JOB,
+                 max_prefetch_zoom=MAX_PREFETCH_ZOOM, download_interval=DOWNLOAD_INTERVAL, session=None, timeout=10):
+        self.path = path
+        self.tile_server = tile_server
+        self.max_zoom = max_zoom
+        self.max_bytes = max_bytes
+        self.max_tiles_per_job = max_tiles_per_job
+        self.max_prefetch_zoom = min(max_prefetch_zoom, max_zoom)
+        self.download_interval = download_interval
+        self.timeout = timeout
+        if session is None:
+            # the OSM tile usage policy asks for an identifying User-Agent
+            session = requests.Session()
+            session.headers['User-Agent'] = USER_AGENT
+        self.session = session
+        self._jobs = queue.Queue()
+        self._worker = None
+        self._next_download = 0.0
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+            connection.execute("INSERT OR IGNORE INTO server (url, max_zoom) VALUES (?, ?)",
+                               (self.tile_server, self.max_zoom))
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        return connection
+
+    def prefetch(self, position_top_left, position_bottom_right, zoom, neighbours=1):
+        """Queue a bounding box to be downloaded at zoom and neighbours levels above and below"""
+        zoom = int(round(zoom))
+        zooms = [zoom] + [level for step in range(1, neighbours + 1) for level in (zoom - step, zoom + step)]
+        zooms = [level for level in zooms if 0 <= level <= self.max_prefetch_zoom]
+        if not zooms:
+            return
+        self._jobs.put((position_top_left, position_bottom_right, zooms))
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = Thread(target=self._run, name='tile-prefetch', daemon=True)
+            self._worker.start()
+
+    def wait(self):
+        """Block until every queued prefetch job has finished"""
+        self._jobs.join()
+
+    def size(self):
+        """Return (tile count, bytes) of the tiles stored by prefetching"""
+        with self._connect() as connection:
+            count, total = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM tile_access").fetchone()
+        return count, total
+
+    def _run(self):
+        connection = self._connect()
+        try:
+            while True:
+                try:
+                    job = self._jobs.get(timeout=5)
+                except queue.Empty:
+                    return
+                try:
+                    self._prefetch(connection, *job)
+                    self._evict(connection)
+                except Exception as error:
+                    print(f"Tile prefetch failed: {error}")
+                finally:
+                    self._jobs.task_done()
+        finally:
+            connection.close()
+
+    def _prefetch(self, connection, position_top_left, position_bottom_right, zooms):
+        remaining = self.max_tiles_per_job
+        for zoom in zooms:
+            xs, ys = tile_range(position_top_left, position_bottom_right, zoom)
+            for x in xs:
+                for y in ys:
+                    if remaining <= 0:
+                        return
+                    remaining -= 1
+                    self._fetch_tile(connection, zoom, x, y)
+
+    def _fetch_tile(self, connection, zoom, x, y):
+        """Store one tile unless it is already present, and mark it as recently used"""
+        now = time.time()
+        key = (zoom, x, y, self.tile_server)
+        stored = connection.execute("SELECT length(tile_image) FROM tiles WHERE zoom=? AND x=? AND y=? AND server=?",
+                                    key).fetchone()
+        if stored is None:
+            url = self.tile_server.replace("{x}", str(x)).replace("{y}", str(y)).replace("{z}", str(zoom))
+            delay = self._next_download - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            # network errors propagate and end the job, there is no point trying the other tiles offline
+            response = self.session.get(url, timeout=self.timeout)
+            self._next_download = time.monotonic() + self.download_interval
+            if response.status_code == 429:
+                raise RuntimeError("tile server asked to slow down (429), stopping this prefetch")
+            if response.status_code != 200 or not response.content:
+                return
+            image = response.content
+            connection.execute("INSERT OR REPLACE INTO tiles (zoom, x, y, server, tile_image) VALUES (?, ?, ?, ?, ?)",
+                               (*key, image))
+            size = len(image)
+        else:
+            size = stored[0]
+        connection.execute("INSERT OR REPLACE INTO tile_access (zoom, x, y, server, size, accessed) "
+                           "VALUES (?, ?, ?, ?, ?, ?)", (*key, size, now))
+        connection.commit()
+
+    def _evict(self, connection):
+        """Delete the least recently used tiles until the store fits in max_bytes"""
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM tile_access").fetchone()[0]
+        while total > self.max_bytes:
+            oldest = connection.execute("SELECT zoom, x, y, server, size FROM tile_access "
+                                        "ORDER BY accessed LIMIT 100").fetchall()
+            if not oldest:
+                break
+            for zoom, x, y, server, size in oldest:
+                connection.execute("DELETE FROM tiles WHERE zoom=? AND x=? AND y=? AND server=?", (zoom, x, y, server))
+                connection.execute("DELETE FROM tile_access WHERE zoom=? AND x=? AND y=? AND server=?",
+                                   (zoom, x, y, server))
+                total -= size
+                if total <= self.max_bytes:
+                    break
+            connection.commit()
@@ -1,19 +1,20 @@
-import requests
+from functools import cached_property
 import urllib.parse
 import xml.etree.ElementTree as et
 import tkinter as tk
 from tkinter import ttk
-from tkintermapview import TkinterMapView
-import pika
 from threading import Thread
-import pandas as pd
-import windrose
-import matplotlib
-import matplotlib.pyplot as plt
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import (FigureCanvasTkAgg, NavigationToolbar2Tk)
+from lazy_import import lazy_import
 
-matplotlib.use('agg')
+# Imported on first use, when the map and panels are built or a station is parsed
+requests = lazy_import('requests')
+pika = lazy_import('pika')
+matplotlib = lazy_import('matplotlib')
+tkintermapview = lazy_import('tkintermapview')
+conditions = lazy_import('conditions')
+ndbc_parser = lazy_import('ndbc_parser')
+plot_panels = lazy_import('plot_panels')
+spectral = lazy_import('spectral')
 
 
 class Station:
@@ -23,6 +24,7 @@ class Station:
         self.weather_units = None
         self.filtered_wave_data = None
         self.swell_data = None
+        self.spectra = None
         for file in file_list:
             if '.dart' in file:
                 self._create_tide_data(file)
@@ -30,69 +32,67 @@ class Station:
                 self._create_weather_data(file)
             if '.spec' in file:
                 self._create_swell_data(file)
+            if '.data_spec' in file:
+                self._create_spectral_data(file)
 
     def _create_tide_data(self, file):
-        self.tide_data = pd.read_csv(file, header=0, delimiter=r"\s+")
-        self.tide_data.drop(columns=['T', 'ss'], inplace=True)
-        self.tide_data.drop(0, inplace=True)
-        self.tide_data['date'] = self.tide_data[['#YY', 'MM', 'DD']].agg('-'.join, axis=1)
-        self.tide_data['time'] = self.tide_data[['hh', 'mm']].agg(':'.join, axis=1)
-        self.tide_data['datetime'] = self.tide_data['date'] + ' ' + self.tide_data['time']
-        self.tide_data['HEIGHT'] = self.tide_data['HEIGHT'].astype(float)
+        self.tide_data, _ = ndbc_parser.parse_realtime(file)
+        self.tide_data.drop(columns=['T'], inplace=True)
 
     def _create_weather_data(self, file):
-        self.weather_data = pd.read_csv(file, header=0, delimiter=r"\s+", index_col=False)
-        self.weather_units = self.weather_data.loc[0].copy(deep=True)
-        self.weather_data.drop(0, inplace=True)
-        self.filtered_wave_data = self.weather_data[
-            (self.weather_data["WVHT"] != 'MM') & (self.weather_data["DPD"] != 'MM') & (
-                    self.weather_data["MWD"] != 'MM')]
+        self.weather_data, self.weather_units = ndbc_parser.parse_realtime(file)
+        self.filtered_wave_data = self.weather_data.dropna(subset=["WVHT", "DPD", "MWD"])
 
     def _create_swell_data(self, file):
-        x = 1
+        self.swell_data, _ = ndbc_parser.parse_realtime(file)
+
+    def _create_spectral_data(self, file):
+        self.spectra = spectral.parse_data_spec(file)
+
+    @cached_property
+    def swell_partitions(self):
+        if self.spectra is None:
+            return None
+        return self.spectra.partitions()
+
+    @cached_property
+    def conditions(self):
+        if self.weather_data is None:
+            return None
+        return conditions.Conditions.from_weather_data(self.weather_data, self.weather_units, self.filtered_wave_data)
 
     def air_temperature(self):
-        search_air_temp = self.weather_data[self.weather_data["ATMP"] != "MM"]
-        if len(search_air_temp) == 0:
-            air_temperature = "N/A"
-        else:
-            air_temperature = search_air_temp['ATMP'].head(1).values[0]
-        return air_temperature
+        return self.conditions.get('air_temperature')
 
     def air_temperature_unit(self):
-        return self.weather_units.loc['ATMP']
+        return self.conditions.units['air_temperature']
 
     def water_temperature(self):
-        search_water_temp = self.weather_data[self.weather_data["WTMP"] != 'MM']
-        if len(search_water_temp) == 0:
-            water_temperature = "N/A"
-        else:
-            water_temperature = search_water_temp['WTMP'].head(1).values[0]
-        return water_temperature
+        return self.conditions.get('water_temperature')
 
     def water_temperature_unit(self):
-        return self.weather_units.loc['WTMP']
+        return self.conditions.units['water_temperature']
 
     def significant_wave_height(self):
-        return self.filtered_wave_data["WVHT"].head(1).values[0]
+        return self.conditions.get('wave_height')
 
     def wave_height_unit(self):
-        return self.weather_units.loc["WVHT"]
+        return self.conditions.units['wave_height']
 
     def swell_period(self):
-        return self.filtered_wave_data["DPD"].head(1).values[0]
+        return self.conditions.get('swell_period')
 
     def swell_direction(self):
-        return self.filtered_wave_data["MWD"].head(1).values[0]
+        return self.conditions.get('swell_direction')
 
     def wind_speed(self):
-        return self.weather_data.loc[1, "WDIR"]
+        return self.conditions.get('wind_speed')
 
     def wind_speed_unit(self):
-        return self.weather_units.loc["WSPD"]
+        return self.conditions.units['wind_speed']
 
     def wind_direction(self):
-        return self.weather_data.loc[1, "WDIR"]
+        return self.conditions.get('wind_direction')
 
 
 class App(tk.Tk):
@@ -169,9 +169,10 @@ class BuoySearch(ttk.Frame):
         super().__init__(parent)
         self.parent = parent
         self.controller = controller
-        self.buoy_map = TkinterMapView(self.parent, width=400, height=400)
-        self.weather_frame = ttk.Frame(self.parent)
-        self.tide_frame = ttk.Frame(self.parent)
+        matplotlib.use('agg')   # required for use with tkinter
+        self.buoy_map = tkintermapview.TkinterMapView(self.parent, width=400, height=400)
+        self.weather_frame = plot_panels.ConditionsPanel(self.parent, title="Conditions Summary")
+        self.tide_frame = plot_panels.TidePanel(self.parent)
         self.create_widgets()
 
     def create_widgets(self):
@@ -271,34 +272,10 @@ class BuoySearch(ttk.Frame):
                 self.tide_plot(self.controller['buoy_data'])
 
     def tide_plot(self, station):
-        fig = Figure(figsize=(4, 4), dpi=100)
-        ax = fig.add_subplot(111)
-        station.tide_data.plot(x='datetime', y='HEIGHT', kind='line', legend=None, ax=ax,
-                               ylabel='Height [m]', title='Tide', xlim=(0, 150))
-        canvas = FigureCanvasTkAgg(fig, master=self.tide_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack()
+        self.tide_frame.update_plot(station.tide_data)
 
     def summary_weather(self, station):
-        tk.Label(master=self.weather_frame, justify='center', text="Conditions Summary").grid(column=0, row=0)
-        tk.Label(master=self.weather_frame, justify='right', text="Air").grid(column=0, row=1, sticky='W')
-        tk.Label(master=self.weather_frame, justify='right',
-                 text=f"{station.air_temperature()} {station.air_temperature_unit()}").grid(column=1, row=1, sticky='W')
-
-        tk.Label(master=self.weather_frame, justify='right', text="Water").grid(column=0, row=2, sticky='W')
-        tk.Label(master=self.weather_frame, justify='right',
-                 text=f"{station.water_temperature()} "
-                      f"{station.water_temperature_unit()}").grid(column=1, row=2, sticky='W')
-
-        tk.Label(master=self.weather_frame, justify='right', text="Waves").grid(column=0, row=3, sticky='W')
-        tk.Label(master=self.weather_frame, justify='right',
-                 text=f"{station.significant_wave_height()} {station.wave_height_unit()} @ {station.swell_period()}"
-                      f" s {station.swell_direction()} \N{DEGREE SIGN}").grid(column=1, row=3, sticky='W')
-
-        tk.Label(master=self.weather_frame, justify='right', text="Wind").grid(column=0, row=4, sticky='W')
-        tk.Label(master=self.weather_frame, justify='right',
-                 text=f"{station.wind_speed()} {station.wind_speed_unit()} "
-                      f"{station.wind_direction()} \N{DEGREE SIGN}").grid(column=1, row=4, sticky='W')
+        self.weather_frame.update_conditions(station.conditions)
 
 
 class ResultPlots(ttk.Frame):
@@ -308,10 +285,10 @@ class ResultPlots(ttk.Frame):
         self.parent = parent
         self.master.grid_forget()
         self.master.grid(column=1, row=1)
-        self.weather_frame = ttk.Frame(self.parent, padding='5')
+        self.weather_frame = plot_panels.ConditionsPanel(self.parent, padding='5')
         self.weather_frame.grid_forget()
         self.weather_frame.grid(column=0, row=0)
-        self.tide_frame = ttk.Frame(self.parent, padding='5')
+        self.tide_frame = plot_panels.TidePanel(self.parent, padding='5')
         self.weather_frame.grid_forget()
         self.tide_frame.grid(column=0, row=1)
         self.display_data()
@@ -329,33 +306,10 @@ class ResultPlots(ttk.Frame):
                 self.tide_plot(self.controller['buoy_data'])
 
     def tide_plot(self, station):
-        fig = Figure(figsize=(4, 4), dpi=100)
-        ax = fig.add_subplot(111)
-        station.tide_data.plot(x='datetime', y='HEIGHT', kind='line', legend=None, ax=ax,
-                               ylabel='Height [m]', title='Tide', xlim=(0, 150))
-        canvas = FigureCanvasTkAgg(fig, master=self.tide_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack()
+        self.tide_frame.update_plot(station.tide_data)
 
     def summary_weather(self, station):
-        tk.Label(master=self.weather_frame, justify='right', text="Air").grid(column=0, row=0, sticky='W')
-        tk.Label(master=self.weather_frame, justify='right',
-                 text=f"{station.air_temperature()} {station.air_temperature_unit()}").grid(column=1, row=0, sticky='W')
-
-        tk.Label(master=self.weather_frame, justify='right', text="Water").grid(column=0, row=1, sticky='W')
-        tk.Label(master=self.weather_frame, justify='right',
-                 text=f"{station.water_temperature()} "
-                      f"{station.water_temperature_unit()}").grid(column=1, row=1, sticky='W')
-
-        tk.Label(master=self.weather_frame, justify='right', text="Waves").grid(column=0, row=2, sticky='W')
-        tk.Label(master=self.weather_frame, justify='right',
-                 text=f"{station.significant_wave_height()} {station.wave_height_unit()} @ {station.swell_period()}"
-                      f" s {station.swell_direction()} \N{DEGREE SIGN}").grid(column=1, row=2, sticky='W')
-
-        tk.Label(master=self.weather_frame, justify='right', text="Wind").grid(column=0, row=3, sticky='W')
-        tk.Label(master=self.weather_frame, justify='right',
-                 text=f"{station.wind_speed()} {station.wind_speed_unit()} "
-                      f"{station.wind_direction()} \N{DEGREE SIGN}").grid(column=1, row=3, sticky='W')
+        self.weather_frame.update_conditions(station.conditions)
 
 
 def main():
@@ -0,0 +1,143 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+
+
+class Span:
+    """One timed step, ended by leaving its with block or by calling end()
+
+    Times are time.perf_counter_ns() readings. request names the buoy request
+    the step belongs to, so the steps of one request share a timeline row.
+    """
+    __slots__ = ('tracer', 'name', 'request', 'args', 'thread', 'start', 'end_time')
+
+    def __init__(self, tracer, name, request=None, args=None):
+        self.tracer = tracer
+        self.name = name
+        self.request = request
+        self.args = args
+        self.thread = threading.current_thread().name
+        self.start = time.perf_counter_ns()
+        self.end_time = None
+
+    def end(self):
+        """Record the span, may be called from any thread; only the first call counts"""
+        if self.end_time is None:
+            self.end_time = time.perf_counter_ns()
+            self.tracer._record(self)
+
+    @property
+    def duration_ms(self):
+        return (self.end_time - self.start) / 1e6
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is not None:
+            self.args = {**(self.args or {}), 'error': repr(exc)}
+        self.end()
+        return False
+
+
+class _NullSpan:
+    """Stands in for a Span while tracing is disabled"""
+    __slots__ = ()
+
+    def end(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+def percentile(ordered, fraction):
+    """Nearest rank percentile of an ascending list"""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+class Tracer:
+    """Collects timed spans of the dashboard's steps, such as geocode, rpc, parse and render
+
+    While disabled span() returns a shared do-nothing span, so
+    instrumented code only pays for a method call. The newest max_spans ended
+    spans are kept and can be summarised per step or exported as JSON or in
+    the Chrome trace event format read by chrome://tracing and Perfetto.
+    """
+    def __init__(self, enabled=False, max_spans=10000):
+        self.enabled = enabled
+        self._spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+
+    def span(self, name, request=None, **args):
+        """Start a span, ended by a with block around the step or later with end(), e.g. from a callback"""
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, request, args or None)
+
+    def _record(self, span):
+        with self._lock:
+            self._spans.append(span)
+
+    def spans(self):
+        """Return the recorded spans, oldest first"""
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+    def latencies(self):
+        """Return {step name: (count, p50 ms, p95 ms)} over the recorded spans"""
+        durations = {}
+        for span in self.spans():
+            durations.setdefault(span.name, []).append(span.duration_ms)
+        summary = {}
+        for name, values in durations.items():
+            values.sort()
+            summary[name] = (len(values), percentile(values, 0.5), percentile(values, 0.95))
+        return summary
+
+    def to_json(self):
+        """Return the recorded spans as plain dicts, times in ms since the tracer was created"""
+        return [{'name': span.name, 'request': span.request, 'thread': span.thread,
+                 'start_ms': (span.start - self._origin) / 1e6, 'duration_ms': span.duration_ms,
+                 'args': span.args or {}} for span in self.spans()]
+
+    def to_chrome_trace(self):
+        """Return the recorded spans as a Chrome trace, one row per buoy request or thread"""
+        pid = os.getpid()
+        rows = {}
+        events = []
+        for span in self.spans():
+            row = f"request {span.request}" if span.request is not None else span.thread
+            if row not in rows:
+                rows[row] = len(rows) + 1
+                events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': rows[row],
+                               'args': {'name': row}})
+            events.append({'name': span.name, 'cat': 'dashboard', 'ph': 'X', 'pid': pid, 'tid': rows[row],
+                           'ts': (span.start - self._origin) / 1e3, 'dur': (span.end_time - span.start) / 1e3,
+                           'args': {'thread': span.thread, **(span.args or {})}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export(self, path):
+        """Write the spans to path, in the Chrome trace format unless path ends in .jsonl"""
+        with open(path, 'w') as f:
+            if path.endswith('.jsonl'):
+                for span in self.to_json():
+                    f.write(json.dumps(span) + '\n')
+            else:
+                json.dump(self.to_chrome_trace(), f)